@@ -1,26 +1,101 @@
 import os
-from datetime import datetime, timedelta
-from flask import Flask, jsonify, request, g
+from datetime import datetime, timedelta, timezone
+from flask import Flask, jsonify, request, g, Response, stream_with_context
 from flask_cors import CORS
 import hashlib
 import secrets
+import json
+import csv
+import io
 import jwt
 from dotenv import load_dotenv
 from functools import wraps
+import click
 
 from database import db, init_app
 from models import User, Event, Venue, Booking, Notification, UserRole, EventType, NotificationType, EventStatus
-from models import EventMedia
+from models import EventMedia, EventInventory, BackgroundJob, EventBookingStats, UserBookingStats, SeatHold
+from models import VenueSection
+from inventory import (
+    available_seats_column, create_inventory, reserve_seats, release_seats,
+    resize_inventory, get_remaining_seats, lock_inventory, lock_inventories, reserve_seats_batch
+)
+from pagination import get_page_limit, keyset_page, encode_cursor, decode_cursor, InvalidCursor
+from cache import response_cache, cached_response, add_cache_tags
+from search import get_search_engine, index_events
+from token_cache import token_cache, revoke_user_tokens, TokenRevoked
+from notification_bus import notification_bus, notify_users
+from cancellation import (
+    CANCELLATION_SYNC_LIMIT, count_confirmed_bookings, cancel_event_bookings,
+    cancellation_steps, insert_booking_notifications, release_user_bookings
+)
+from jobs import create_job, submit_job, serialize_job, job_kind, ensure_job_sweeper
+from notification_counters import (
+    add_unread, get_unread_count, forget_user, rebuild_unread_counters
+)
+from stats import (
+    record_booking_created, record_bookings_created, record_status_change, record_bookings_deleted, forget_event,
+    record_user_created, record_user_deleted, record_role_change, maybe_compact, rebuild_stats,
+    booking_status_totals, daily_booking_counts, top_booked, monthly_signups, user_role_totals
+)
+from seatmap import (
+    InvalidSeat, SeatsTaken, NotEnoughSeats, reserve_seat_labels, reserve_any_seats, assign_booking_seats,
+    confirm_hold_seats, release_booking_seats, booking_seat_labels, drop_seat_maps, rebuild_seat_maps,
+    seat_availability, replace_sections, stadium_sections
+)
+from holds import (
+    hold_expires_at, claim_hold, finish_holds, ensure_hold_sweeper, serialize_hold
+)
+from idempotency import idempotent
+from event_import import IMPORT_FORMATS, import_events
+from availability import availability_snapshot
+from cache_bus import ensure_cache_listener
+from outbox import enqueue_notification, ensure_outbox_workers, run_outbox_worker
+from metrics import metrics, init_metrics
+from query_guard import init_query_guard
+from serializers import Projection, FastJSONProvider
+from replicas import read_replica, init_replicas, ensure_replica_monitor
 
 # Загрузка переменных окружения
 load_dotenv()
 
 app = Flask(__name__)
+# jsonify через orjson, даты и перечисления кодируются без ручного strftime
+app.json = FastJSONProvider(app)
 CORS(app)
 
 # Инициализация приложения с базой данных
 init_app(app)
 
+# Метрики запросов, SQL и пула соединений (GET /metrics)
+init_metrics(app, db)
+
+# Поиск N+1 и медленных SQL при разработке и в тестах (QUERY_GUARD=log|raise).
+# Бюджеты SQL-операторов горячих эндпоинтов не зависят от числа строк ответа
+# и равны операторам обработчика на основном пути; служебные операторы
+# (синхронизация отзывов токенов, Idempotency-Key) в бюджет не входят
+app.config['QUERY_BUDGETS'] = {
+    'get_events': 2,
+    'get_event': 3,
+    'create_booking': 8,
+    'get_user_notifications': 4,
+}
+init_query_guard(app)
+
+# Чтение каталога, площадок, статистики и уведомлений с реплик (DATABASE_REPLICA_URLS)
+init_replicas(app, db)
+
+# Фоновая очистка истёкших удержаний мест, обработка outbox, возобновление
+# брошенных фоновых задач, проверка реплик и приём сбросов кэша других воркеров:
+# потоки стартуют в каждом воркере при первом запросе, после fork - заново
+@app.before_request
+def start_background_workers():
+    ensure_hold_sweeper(app)
+    ensure_outbox_workers(app)
+    ensure_job_sweeper(app)
+    ensure_replica_monitor(app)
+    ensure_cache_listener()
+
 # Секретный ключ для JWT
 SECRET_KEY = os.getenv("SECRET_KEY", "quicket_default_secret")
 JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", "quicket_jwt_secret")
@@ -28,46 +103,85 @@ JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", "quicket_jwt_secret")
 # Соль для хеширования паролей
 SALT = os.getenv("SALT", "quicket_salt")
 
+# Максимальное число мероприятий в одном пакетном бронировании
+BATCH_BOOKING_MAX_ITEMS = int(os.getenv("BATCH_BOOKING_MAX_ITEMS", "20"))
+
+# Максимальное число мероприятий в одном запросе остатков мест
+AVAILABILITY_MAX_IDS = int(os.getenv("AVAILABILITY_MAX_IDS", "100"))
+
+# Максимальная глубина выдачи полнотекстового поиска
+SEARCH_MAX_RESULTS = int(os.getenv("SEARCH_MAX_RESULTS", "1000"))
+
+# Токен для GET /metrics (пусто - без проверки, доступ ограничивается сетью)
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+# Поток уведомлений (SSE): интервал heartbeat и время жизни одного соединения
+NOTIFICATION_STREAM_HEARTBEAT = float(os.getenv("NOTIFICATION_STREAM_HEARTBEAT", "15"))
+NOTIFICATION_STREAM_MAX_DURATION = float(os.getenv("NOTIFICATION_STREAM_MAX_DURATION", "300"))
+
+# Экспорт журнала уведомлений: строк на одну выборку из серверного курсора
+NOTIFICATION_EXPORT_BATCH_SIZE = int(os.getenv("NOTIFICATION_EXPORT_BATCH_SIZE", "1000"))
+
 def hash_password(password):
     """Хеширование пароля с солью"""
     return hashlib.sha256((password + SALT).encode()).hexdigest()
 
 def generate_jwt_token(user_id, role):
     """Генерация JWT токена"""
+    issued_at = datetime.utcnow()
     payload = {
         'user_id': user_id,
         'role': role.value if isinstance(role, UserRole) else role,
-        'exp': datetime.utcnow() + timedelta(days=1)
+        # Дробный iat: отзыв токенов сравнивается с точностью до микросекунд
+        'iat': issued_at.replace(tzinfo=timezone.utc).timestamp(),
+        'exp': issued_at + timedelta(days=1)
     }
     return jwt.encode(payload, JWT_SECRET_KEY, algorithm='HS256')
 
-def token_required(f):
-    @wraps(f)
-    def decorated(*args, **kwargs):
-        token = None
-        # Проверяем наличие токена в заголовке Authorization
-        if 'Authorization' in request.headers:
-            auth_header = request.headers['Authorization']
-            if auth_header.startswith('Bearer '):
-                token = auth_header.split(' ')[1]
-        
-        if not token:
-            return jsonify({'success': False, 'message': 'Токен не предоставлен'}), 401
-        
+def authenticate_request(allow_query_token=False):
+    """Проверка Bearer-токена текущего запроса.
+
+    Заполняет g.user_id и g.role; возвращает ответ с ошибкой или None.
+    Повторные запросы с тем же токеном обслуживаются из token_cache без
+    jwt.decode. allow_query_token разрешает ?token= для EventSource,
+    который не умеет передавать заголовки.
+    """
+    token = None
+    # Проверяем наличие токена в заголовке Authorization
+    auth_header = request.headers.get('Authorization', '')
+    if auth_header.startswith('Bearer '):
+        token = auth_header[7:]
+    elif allow_query_token:
+        token = request.args.get('token')
+    
+    if not token:
+        return jsonify({'success': False, 'message': 'Токен не предоставлен'}), 401
+    
+    token_cache.sync()
+    cached = token_cache.get(token)
+    if cached is None:
         try:
             # Декодируем токен
             payload = jwt.decode(token, JWT_SECRET_KEY, algorithms=['HS256'])
-            user_id = payload['user_id']
-            role = payload['role']
-            
-            # Добавляем информацию о пользователе в контекст запроса
-            g.user_id = user_id
-            g.role = role
-            
+            token_cache.put(token, payload)
+            cached = payload['user_id'], payload['role']
         except jwt.ExpiredSignatureError:
             return jsonify({'success': False, 'message': 'Токен истек'}), 401
-        except jwt.InvalidTokenError:
+        except TokenRevoked:
+            return jsonify({'success': False, 'message': 'Токен отозван, войдите снова'}), 401
+        except (jwt.InvalidTokenError, KeyError):
             return jsonify({'success': False, 'message': 'Неверный токен'}), 401
+    
+    # Добавляем информацию о пользователе в контекст запроса
+    g.user_id, g.role = cached
+    return None
+
+def token_required(f):
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        error = authenticate_request()
+        if error is not None:
+            return error
         
         return f(*args, **kwargs)
     
@@ -76,13 +190,13 @@ def token_required(f):
 def admin_required(f):
     @wraps(f)
     def decorated(*args, **kwargs):
-        # Сначала проверяем наличие токена
-        token_result = token_required(lambda: None)()
-        if isinstance(token_result, tuple) and token_result[1] != 200:
-            return token_result
+        # Сначала проверяем токен (один раз на запрос)
+        error = authenticate_request()
+        if error is not None:
+            return error
         
         # Проверяем роль пользователя
-        if g.role != UserRole.admin.value and g.role != 'admin':
+        if g.role != UserRole.admin.value:
             return jsonify({'success': False, 'message': 'Требуются права администратора'}), 403
         
         return f(*args, **kwargs)
@@ -134,16 +248,16 @@ def register():
             role=UserRole.user
         )
         db.session.add(new_user)
-        db.session.commit()
-        
-        # Создаем приветственное уведомление
-        welcome_notification = Notification(
-            user_id=new_user.id,
-            title="Добро пожаловать в Quicket!",
-            message="Спасибо за регистрацию в нашем сервисе. Теперь вы можете бронировать билеты на различные мероприятия.",
-            notification_type=NotificationType.SYSTEM_MESSAGE
+        db.session.flush()
+        record_user_created(new_user)
+        
+        # Приветственное уведомление создаётся из outbox после коммита
+        enqueue_notification(
+            new_user.id,
+            "Добро пожаловать в Quicket!",
+            "Спасибо за регистрацию в нашем сервисе. Теперь вы можете бронировать билеты на различные мероприятия.",
+            NotificationType.SYSTEM_MESSAGE
         )
-        db.session.add(welcome_notification)
         db.session.commit()
         
         return jsonify({'success': True, 'message': 'Пользователь успешно зарегистрирован'})
@@ -151,116 +265,275 @@ def register():
         db.session.rollback()
         return jsonify({'success': False, 'message': f'Ошибка регистрации: {str(e)}'}), 400
 
+def invalidate_event_cache(event_id, *venue_ids):
+    """Сброс кэша каталога после изменения мероприятия администратором"""
+    response_cache.invalidate('events', f'event:{event_id}', *(f'venue:{venue_id}' for venue_id in venue_ids))
+
+def load_cover_images(events):
+    """Обложки для списка карточек мероприятий одним запросом.
+
+    Карточкам без image_url подставляется первое изображение из EventMedia,
+    вместо ленивой загрузки event.media на каждой строке.
+    """
+    missing = [event['id'] for event in events if not event['image_url']]
+    covers = {}
+    if missing:
+        media_rows = db.session.query(
+            EventMedia.event_id,
+            EventMedia.media_url
+        ).filter(
+            EventMedia.event_id.in_(missing),
+            EventMedia.media_type == 'image'
+        ).order_by(
+            EventMedia.event_id, EventMedia.id
+        ).all()
+        for event_id, media_url in media_rows:
+            covers.setdefault(event_id, media_url)
+    for event in events:
+        if not event['image_url']:
+            event['image_url'] = covers.get(event['id'])
+
+# Карточка мероприятия для списков; описание - только по ?include=description
+EVENT_SUMMARY = Projection(
+    ('id', Event.id),
+    ('title', Event.title),
+    ('type', Event.type, 'enum'),
+    ('venue_id', Event.venue_id),
+    ('venue_name', Venue.name),
+    ('date', Event.date, 'date'),
+    ('time', Event.time),
+    ('duration', Event.duration),
+    ('total_seats', Event.total_seats),
+    ('available_seats', available_seats_column()),
+    ('price', Event.price),
+    ('status', Event.status, 'enum'),
+    ('image_url', Event.image_url),
+    ('event_subtype', Event.event_subtype),
+    ('organizer', Event.organizer),
+    ('featured', Event.featured)
+)
+EVENT_SUMMARY_WITH_DESCRIPTION = EVENT_SUMMARY.extend(('description', Event.description))
+
+def event_summary_projection():
+    """Проекция карточек по ?include=; ValueError с сообщением при ошибке"""
+    include = {value.strip() for value in request.args.get('include', '').split(',') if value.strip()}
+    unknown = include - {'description'}
+    if unknown:
+        raise ValueError(f'Неизвестные поля include: {", ".join(sorted(unknown))}')
+    return EVENT_SUMMARY_WITH_DESCRIPTION if include else EVENT_SUMMARY
+
+def serialize_event_summaries(projection, rows):
+    """Карточки мероприятий с обложками; страница сбрасывается из кэша при
+    создании мероприятий и при изменении любого из показанных"""
+    result = projection.serialize_all(rows)
+    load_cover_images(result)
+    add_cache_tags('events')
+    add_cache_tags(*(f'event:{item["id"]}' for item in result))
+    add_cache_tags(*(f'venue:{item["venue_id"]}' for item in result))
+    return result
+
 @app.route('/api/events', methods=['GET'])
+@read_replica
+@cached_response
 def get_events():
-    events_query = db.session.query(
-        Event, 
-        Venue.name.label('venue_name'),
-        db.func.count(Booking.id).filter(Booking.status == 'confirmed').label('booked_seats')
-    ).join(
+    try:
+        projection = event_summary_projection()
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    
+    # Только столбцы карточки: без ORM-объектов и описания
+    events_query = db.session.query(*projection.columns).select_from(Event).join(
         Venue, Event.venue_id == Venue.id
     ).outerjoin(
-        Booking, Event.id == Booking.event_id
-    ).group_by(
-        Event.id, Venue.name
-    ).order_by(
-        Event.date, Event.time
+        EventInventory, Event.id == EventInventory.event_id
     )
     
     # Фильтрация по типу мероприятия (если указан)
     event_type = request.args.get('type')
     if event_type:
-        events_query = events_query.filter(Event.type == event_type)
+        try:
+            events_query = events_query.filter(Event.type == EventType(event_type.lower()))
+        except ValueError:
+            return jsonify({'success': False, 'message': f'Неверный тип мероприятия: {event_type}'}), 400
     
     # Фильтрация по статусу мероприятия (если указан)
     status = request.args.get('status')
     if status:
-        events_query = events_query.filter(Event.status == status)
+        try:
+            events_query = events_query.filter(Event.status == EventStatus(status.lower()))
+        except ValueError:
+            return jsonify({'success': False, 'message': f'Неверный статус мероприятия: {status}'}), 400
+    
+    # Фильтрация по диапазону дат; по умолчанию показываем только предстоящие
+    try:
+        date_from = request.args.get('date_from')
+        if date_from:
+            events_query = events_query.filter(Event.date >= datetime.strptime(date_from, '%Y-%m-%d'))
+        elif request.args.get('upcoming', default='true').lower() == 'true':
+            today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+            events_query = events_query.filter(Event.date >= today)
+        
+        date_to = request.args.get('date_to')
+        if date_to:
+            events_query = events_query.filter(Event.date < datetime.strptime(date_to, '%Y-%m-%d') + timedelta(days=1))
+    except ValueError:
+        return jsonify({'success': False, 'message': 'Дата должна быть в формате YYYY-MM-DD'}), 400
+    
+    # Выборка конкретных мероприятий по списку ID (например, избранных)
+    ids = request.args.get('ids')
+    if ids:
+        try:
+            events_query = events_query.filter(Event.id.in_([int(i) for i in ids.split(',') if i]))
+        except ValueError:
+            return jsonify({'success': False, 'message': 'Неверный список ID мероприятий'}), 400
     
-    # Поиск по названию или месту проведения
+    # Полнотекстовый поиск (название, описание, организатор, площадка)
     search = request.args.get('search')
     if search:
-        search_term = f"%{search}%"
-        events_query = events_query.filter(
-            db.or_(
-                Event.title.ilike(search_term),
-                Venue.name.ilike(search_term)
-            )
-        )
+        events_query = get_search_engine().filter_query(events_query, search)
     
     # Получение избранных мероприятий
     featured = request.args.get('featured')
     if featured and featured.lower() == 'true':
         events_query = events_query.filter(Event.featured == True)
     
-    events_result = events_query.all()
+    # Keyset-пагинация по (date, time, id): стоимость страницы не зависит от её номера
+    limit = get_page_limit(default=20, maximum=100)
+    try:
+        events_result, next_cursor = keyset_page(
+            events_query,
+            (Event.date, Event.time, Event.id),
+            lambda row: (row.date, row.time, row.id),
+            limit
+        )
+    except InvalidCursor:
+        return jsonify({'success': False, 'message': 'Неверный курсор пагинации'}), 400
     
-    result = []
-    for event, venue_name, booked_seats in events_result:
-        available_seats = event.total_seats - booked_seats
-        
-        # Получаем URL первого медиафайла (изображения) для мероприятия, если есть
-        image_url = event.image_url
-        if not image_url and event.media:
-            for media in event.media:
-                if media.media_type == 'image':
-                    image_url = media.media_url
-                    break
-        
-        result.append({
-            'id': event.id,
-            'title': event.title,
-            'type': event.type.value,
-            'venue_id': event.venue_id,
-            'venue_name': venue_name,
-            'date': event.date.strftime('%Y-%m-%d'),
-            'time': event.time,
-            'duration': event.duration,
-            'total_seats': event.total_seats,
-            'available_seats': available_seats,
-            'price': event.price,
-            'description': event.description,
-            'status': event.status.value,
-            'image_url': image_url,
-            'event_subtype': event.event_subtype,
-            'organizer': event.organizer,
-            'featured': event.featured
-        })
+    result = serialize_event_summaries(projection, events_result)
 
-    return jsonify(result)
+    return jsonify({
+        'success': True,
+        'events': result,
+        'next_cursor': next_cursor,
+        'limit': limit
+    })
+
+# Полнотекстовый поиск мероприятий с сортировкой по релевантности
+@app.route('/api/events/search', methods=['GET'])
+@read_replica
+@cached_response
+def search_events():
+    text = request.args.get('q', '').strip()
+    if not text:
+        return jsonify({'success': False, 'message': 'Параметр q обязателен'}), 400
+    try:
+        projection = event_summary_projection()
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    
+    events_query = db.session.query(*projection.columns).select_from(Event).join(
+        Venue, Event.venue_id == Venue.id
+    ).outerjoin(
+        EventInventory, Event.id == EventInventory.event_id
+    )
+    
+    event_type = request.args.get('type')
+    if event_type:
+        try:
+            events_query = events_query.filter(Event.type == EventType(event_type.lower()))
+        except ValueError:
+            return jsonify({'success': False, 'message': f'Неверный тип мероприятия: {event_type}'}), 400
+    
+    if request.args.get('upcoming', default='true').lower() == 'true':
+        today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+        events_query = events_query.filter(Event.date >= today)
+    
+    # Результаты упорядочены по релевантности, поэтому курсор хранит смещение;
+    # глубина выдачи ограничена SEARCH_MAX_RESULTS
+    limit = get_page_limit(default=20, maximum=100)
+    offset = 0
+    cursor = request.args.get('cursor')
+    if cursor:
+        try:
+            offset, = decode_cursor(cursor, [int])
+        except InvalidCursor:
+            return jsonify({'success': False, 'message': 'Неверный курсор пагинации'}), 400
+    if offset < 0 or offset >= SEARCH_MAX_RESULTS:
+        return jsonify({'success': True, 'events': [], 'next_cursor': None, 'limit': limit})
+    
+    rows = get_search_engine().search(events_query, text, limit + 1, offset)
+    next_cursor = None
+    if len(rows) > limit and offset + limit < SEARCH_MAX_RESULTS:
+        next_cursor = encode_cursor([offset + limit])
+    rows = rows[:limit]
+    
+    result = serialize_event_summaries(projection, [row for row, _ in rows])
+    for item, (_, rank) in zip(result, rows):
+        item['rank'] = round(rank, 6)
+    
+    return jsonify({
+        'success': True,
+        'events': result,
+        'next_cursor': next_cursor,
+        'limit': limit
+    })
+
+# Остатки мест и статусы сразу нескольких мероприятий для опроса со страниц списков
+@app.route('/api/events/availability', methods=['GET'])
+def get_events_availability():
+    try:
+        event_ids = list(dict.fromkeys(
+            int(value) for value in request.args.get('ids', '').split(',') if value.strip()
+        ))
+    except ValueError:
+        return jsonify({'success': False, 'message': 'ids - список ID мероприятий через запятую'}), 400
+    if not event_ids:
+        return jsonify({'success': False, 'message': 'Параметр ids обязателен'}), 400
+    if len(event_ids) > AVAILABILITY_MAX_IDS:
+        return jsonify({'success': False, 'message': f'Не больше {AVAILABILITY_MAX_IDS} мероприятий в запросе'}), 400
+    
+    snapshot = availability_snapshot.get_many(event_ids)
+    response = jsonify({
+        'success': True,
+        'events': [
+            {'id': event_id, 'available_seats': snapshot[event_id][0], 'status': snapshot[event_id][1].value}
+            for event_id in event_ids if event_id in snapshot
+        ]
+    })
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
 
 @app.route('/api/events/<int:event_id>', methods=['GET'])
+@read_replica
+@cached_response
 def get_event(event_id):
     event_data = db.session.query(
         Event, 
         Venue,
-        db.func.count(Booking.id).filter(Booking.status == 'confirmed').label('booked_seats')
+        available_seats_column().label('available_seats')
     ).join(
         Venue, Event.venue_id == Venue.id
     ).outerjoin(
-        Booking, Event.id == Booking.event_id
+        EventInventory, Event.id == EventInventory.event_id
     ).filter(
         Event.id == event_id
-    ).group_by(
-        Event.id, Venue.id
     ).first()
     
     if not event_data:
         return jsonify({'success': False, 'message': 'Мероприятие не найдено'}), 404
     
-    event, venue, booked_seats = event_data
-    available_seats = event.total_seats - booked_seats
+    event, venue, available_seats = event_data
+    add_cache_tags(f'event:{event.id}', f'venue:{venue.id}')
     
     # Получаем все медиафайлы для мероприятия
     media_files = []
-    if event.media:
-        for media in event.media:
-            media_files.append({
-                'id': media.id,
-                'type': media.media_type,
-                'url': media.media_url,
-                'description': media.description
-            })
+    for media in EventMedia.query.filter_by(event_id=event.id).order_by(EventMedia.id):
+        media_files.append({
+            'id': media.id,
+            'type': media.media_type,
+            'url': media.media_url,
+            'description': media.description
+        })
     
     result = {
         'id': event.id,
@@ -289,8 +562,26 @@ def get_event(event_id):
 
     return jsonify(result)
 
+@app.route('/api/events/<int:event_id>/seats', methods=['GET'])
+@read_replica
+@cached_response
+def get_event_seats(event_id):
+    event = Event.query.get(event_id)
+    if not event:
+        return jsonify({'success': False, 'message': 'Мероприятие не найдено'}), 404
+    
+    add_cache_tags(f'event:{event.id}', f'venue:{event.venue_id}')
+    
+    return jsonify({
+        'success': True,
+        'event_id': event.id,
+        'venue_id': event.venue_id,
+        'sections': seat_availability(event.id, event.venue_id)
+    })
+
 @app.route('/api/events', methods=['POST'])
 @admin_required
+@idempotent
 def create_event():
     data = request.json
 
@@ -326,6 +617,7 @@ def create_event():
             featured=data.get('featured', False),
             status=EventStatus.UPCOMING
         )
+        create_inventory(new_event)
         
         db.session.add(new_event)
         db.session.commit()
@@ -342,7 +634,9 @@ def create_event():
                 )
                 db.session.add(media)
         
+        index_events([new_event.id])
         db.session.commit()
+        invalidate_event_cache(new_event.id, new_event.venue_id)
         
         return jsonify({
             'success': True,
@@ -353,6 +647,45 @@ def create_event():
         db.session.rollback()
         return jsonify({'success': False, 'message': f'Ошибка при создании мероприятия: {str(e)}'}), 500
 
+def start_event_cancellation(event, total=None):
+    """Отмена бронирований отменённого мероприятия (в текущей транзакции).
+
+    До CANCELLATION_SYNC_LIMIT бронирований всё выполняется сразу массовыми
+    запросами; иначе создаётся фоновая задача, которую нужно запустить через
+    event_cancellation_accepted после коммита. Возвращает задачу или None.
+    """
+    lock_inventory(event.id)
+    if total is None:
+        total = count_confirmed_bookings(event.id)
+    if total <= CANCELLATION_SYNC_LIMIT:
+        cancel_event_bookings(event.id, event.title)
+        return None
+    job = create_job('event_cancellation', target_id=event.id, total=total)
+    db.session.flush()
+    return job
+
+@job_kind('event_cancellation')
+def event_cancellation_steps(job):
+    """Шаги отмены по записи задачи: при запуске и при возобновлении после
+    перезапуска воркера"""
+    event = db.session.get(Event, job.target_id)
+    if event is None:
+        return lambda job: iter(())
+    event_id = event.id
+    return cancellation_steps(
+        event_id, event.title, on_chunk=lambda: response_cache.invalidate(f'event:{event_id}')
+    )
+
+def event_cancellation_accepted(event, job):
+    """Запуск фоновой отмены и ответ 202 с id задачи для отслеживания прогресса"""
+    submit_job(job.id)
+    return jsonify({
+        'success': True,
+        'message': 'Мероприятие отменено, бронирования отменяются в фоне',
+        'job_id': job.id,
+        'total_bookings': job.total
+    }), 202
+
 @app.route('/api/events/<int:event_id>', methods=['PUT'])
 @admin_required
 def update_event(event_id):
@@ -361,6 +694,8 @@ def update_event(event_id):
     event = Event.query.get(event_id)
     if not event:
         return jsonify({'success': False, 'message': 'Мероприятие не найдено'}), 404
+    old_venue_id = event.venue_id
+    job = None
     
     try:
         # Обновляем поля мероприятия, если они указаны
@@ -374,8 +709,19 @@ def update_event(event_id):
             except KeyError:
                 return jsonify({'success': False, 'message': f'Неверный тип мероприятия: {data["type"]}'}), 400
         
-        if 'venue_id' in data:
+        if 'venue_id' in data and data['venue_id'] != old_venue_id:
             event.venue_id = data['venue_id']
+            # Номера мест старой схемы не подходят новой площадке: под блокировкой
+            # остатка места бронирований и удержаний назначаются заново
+            lock_inventory(event_id)
+            try:
+                rebuild_seat_maps(event_id, event.venue_id)
+            except NotEnoughSeats:
+                db.session.rollback()
+                return jsonify({
+                    'success': False,
+                    'message': 'В схеме новой площадки меньше мест, чем уже забронировано'
+                }), 400
         
         if 'date' in data:
             event.date = datetime.strptime(data['date'], '%Y-%m-%d')
@@ -387,13 +733,12 @@ def update_event(event_id):
             event.duration = data['duration']
         
         if 'total_seats' in data:
-            # Проверяем, не меньше ли новое количество мест, чем уже забронировано
-            booked_seats = db.session.query(db.func.count(Booking.id)).filter(
-                Booking.event_id == event_id, 
-                Booking.status == 'confirmed'
-            ).scalar()
-            
-            if data['total_seats'] < booked_seats:
+            # Сдвигаем остаток на разницу; условный UPDATE не даст опустить
+            # количество мест ниже уже забронированного
+            delta = data['total_seats'] - event.total_seats
+            if delta and not resize_inventory(event_id, delta):
+                db.session.rollback()
+                booked_seats = event.total_seats - (get_remaining_seats(event_id) or 0)
                 return jsonify({
                     'success': False, 
                     'message': f'Новое количество мест ({data["total_seats"]}) меньше, чем уже забронировано ({booked_seats})'
@@ -427,26 +772,9 @@ def update_event(event_id):
                 status_str = data['status'].upper()
                 event.status = EventStatus[status_str]
                 
-                # Если статус изменился на CANCELLED, отправляем уведомления всем, кто забронировал
+                # Если статус изменился на CANCELLED, отменяем бронирования и уведомляем пользователей
                 if event.status == EventStatus.CANCELLED:
-                    # Получаем всех пользователей, у которых есть активные бронирования
-                    bookings = Booking.query.filter(
-                        Booking.event_id == event_id,
-                        Booking.status == 'confirmed'
-                    ).all()
-                    
-                    for booking in bookings:
-                        notification = Notification(
-                            user_id=booking.user_id,
-                            title="Мероприятие отменено",
-                            message=f"Мероприятие '{event.title}' было отменено. Ваше бронирование будет автоматически отменено.",
-                            notification_type=NotificationType.EVENT_CANCELLED,
-                            related_id=event_id
-                        )
-                        db.session.add(notification)
-                        
-                        # Отменяем бронирование
-                        booking.status = 'cancelled'
+                    job = start_event_cancellation(event)
             except KeyError:
                 return jsonify({'success': False, 'message': f'Неверный статус мероприятия: {data["status"]}'}), 400
         
@@ -468,26 +796,24 @@ def update_event(event_id):
                     )
                     db.session.add(media)
         
+        db.session.flush()
+        index_events([event_id])
         db.session.commit()
+        invalidate_event_cache(event_id, old_venue_id, event.venue_id)
+        
+        if job is not None:
+            return event_cancellation_accepted(event, job)
         
         # Отправляем уведомления о обновлении мероприятия всем, кто забронировал (если статус не CANCELLED)
         if event.status != EventStatus.CANCELLED and 'notify_users' in data and data['notify_users']:
-            bookings = Booking.query.filter(
-                Booking.event_id == event_id,
-                Booking.status == 'confirmed'
-            ).all()
-            
-            for booking in bookings:
-                notification = Notification(
-                    user_id=booking.user_id,
-                    title="Обновление мероприятия",
-                    message=f"Мероприятие '{event.title}' было обновлено. Проверьте детали вашего бронирования.",
-                    notification_type=NotificationType.EVENT_UPDATED,
-                    related_id=event_id,
-                    action_link=f"/events/{event_id}"
-                )
-                db.session.add(notification)
-            
+            insert_booking_notifications(
+                (Booking.event_id == event_id) & (Booking.status == 'confirmed'),
+                title="Обновление мероприятия",
+                message=f"Мероприятие '{event.title}' было обновлено. Проверьте детали вашего бронирования.",
+                notification_type=NotificationType.EVENT_UPDATED,
+                related_id=event_id,
+                action_link=f"/events/{event_id}"
+            )
             db.session.commit()
         
         return jsonify({
@@ -507,35 +833,17 @@ def delete_event(event_id):
     
     try:
         # Проверяем, есть ли активные бронирования
-        active_bookings = Booking.query.filter(
-            Booking.event_id == event_id,
-            Booking.status == 'confirmed'
-        ).count()
+        active_bookings = count_confirmed_bookings(event_id)
         
         if active_bookings > 0:
             # Вместо удаления меняем статус на CANCELLED и отправляем уведомления
             event.status = EventStatus.CANCELLED
-            
-            # Получаем всех пользователей, у которых есть активные бронирования
-            bookings = Booking.query.filter(
-                Booking.event_id == event_id,
-                Booking.status == 'confirmed'
-            ).all()
-            
-            for booking in bookings:
-                notification = Notification(
-                    user_id=booking.user_id,
-                    title="Мероприятие отменено",
-                    message=f"Мероприятие '{event.title}' было отменено. Ваше бронирование будет автоматически отменено.",
-                    notification_type=NotificationType.EVENT_CANCELLED,
-                    related_id=event_id
-                )
-                db.session.add(notification)
-                
-                # Отменяем бронирование
-                booking.status = 'cancelled'
-            
+            job = start_event_cancellation(event, active_bookings)
             db.session.commit()
+            invalidate_event_cache(event_id, event.venue_id)
+            
+            if job is not None:
+                return event_cancellation_accepted(event, job)
             
             return jsonify({
                 'success': True,
@@ -543,8 +851,14 @@ def delete_event(event_id):
             })
         else:
             # Если нет активных бронирований, удаляем мероприятие
+            venue_id = event.venue_id
+            record_bookings_deleted(Booking.event_id == event_id)
+            forget_event(event_id)
+            drop_seat_maps(event_id)
+            SeatHold.query.filter_by(event_id=event_id).delete(synchronize_session=False)
             db.session.delete(event)
             db.session.commit()
+            invalidate_event_cache(event_id, venue_id)
             
             return jsonify({
                 'success': True,
@@ -554,70 +868,391 @@ def delete_event(event_id):
         db.session.rollback()
         return jsonify({'success': False, 'message': f'Ошибка при удалении мероприятия: {str(e)}'}), 500
 
-# API для бронирования места на мероприятии
-@app.route('/api/bookings', methods=['POST'])
-@token_required
-def create_booking():
-    data = request.json
-    user_id = g.user_id  # Получаем ID пользователя из JWT токена
+def parse_booking_request(data):
+    """(event, seats, seat_numbers, None) из тела запроса бронирования или
+    удержания мест, либо (None, None, None, ответ с ошибкой)"""
     event_id = data.get('event_id')
     seats = data.get('seats', 1)
+    seat_numbers = data.get('seat_numbers')
     
     if not event_id:
-        return jsonify({'success': False, 'message': 'ID мероприятия обязателен'}), 400
+        return None, None, None, (jsonify({'success': False, 'message': 'ID мероприятия обязателен'}), 400)
     
-    # Проверяем наличие свободных мест
-    event_data = db.session.query(
-        Event,
-        db.func.count(Booking.id).filter(Booking.status == 'confirmed').label('booked_seats')
-    ).outerjoin(
-        Booking, Event.id == Booking.event_id
-    ).filter(
-        Event.id == event_id
-    ).group_by(
-        Event.id
-    ).first()
+    if not isinstance(seats, int) or isinstance(seats, bool) or seats < 1:
+        return None, None, None, (jsonify({'success': False, 'message': 'Количество мест должно быть положительным числом'}), 400)
     
-    if not event_data:
-        return jsonify({'success': False, 'message': 'Мероприятие не найдено'}), 404
+    if seat_numbers is not None and (not isinstance(seat_numbers, list) or len(seat_numbers) != seats):
+        return None, None, None, (jsonify({'success': False, 'message': 'Список мест должен совпадать с количеством мест'}), 400)
     
-    event, booked_seats = event_data
-    available_seats = event.total_seats - booked_seats
+    event = Event.query.get(event_id)
+    if not event:
+        return None, None, None, (jsonify({'success': False, 'message': 'Мероприятие не найдено'}), 404)
     
-    if available_seats < seats:
-        return jsonify({'success': False, 'message': f'Недостаточно мест. Доступно: {available_seats}'}), 400
+    if event.status in (EventStatus.CANCELLED, EventStatus.FINISHED):
+        return None, None, None, (jsonify({'success': False, 'message': 'Бронирование на это мероприятие закрыто'}), 400)
     
+    return event, seats, seat_numbers, None
+
+def reserve_event_seats(event, seats, seat_numbers):
+    """Резерв мест в остатке и, если переданы номера, в картах секторов
+    (в текущей транзакции). Возвращает (positions, None) или (None, ответ
+    с ошибкой) после отката транзакции."""
+    # Проверяем наличие свободных мест и резервируем их одним оператором
+    if not reserve_seats(event.id, seats):
+        db.session.rollback()
+        available_seats = get_remaining_seats(event.id) or 0
+        return None, (jsonify({'success': False, 'message': f'Недостаточно мест. Доступно: {available_seats}'}), 400)
+    
+    # Резерв мог ждать блокировку отмены или смены площадки - перечитываем
+    # статус и площадку вместе с признаком схемы секторов
+    status, venue_id, has_sections = db.session.execute(
+        db.select(
+            Event.status, Event.venue_id,
+            db.select(VenueSection.id).where(VenueSection.venue_id == Event.venue_id).exists()
+        ).where(Event.id == event.id)
+    ).one()
+    if status in (EventStatus.CANCELLED, EventStatus.FINISHED):
+        db.session.rollback()
+        return None, (jsonify({'success': False, 'message': 'Бронирование на это мероприятие закрыто'}), 400)
+    
+    # Конкретные места - только для площадок со схемой секторов; без номеров
+    # места схемы назначаются по порядку, чтобы карты не расходились с остатком
+    if not has_sections:
+        if seat_numbers:
+            db.session.rollback()
+            return None, (jsonify({'success': False, 'message': 'У площадки нет схемы мест, номера мест не принимаются'}), 400)
+        return None, None
     try:
+        if not seat_numbers:
+            return reserve_any_seats(event.id, venue_id, seats), None
+        return reserve_seat_labels(event.id, venue_id, seat_numbers), None
+    except NotEnoughSeats:
+        db.session.rollback()
+        return None, (jsonify({'success': False, 'message': 'Недостаточно свободных мест в схеме площадки'}), 400)
+    except InvalidSeat as e:
+        db.session.rollback()
+        return None, (jsonify({'success': False, 'message': f'Неверный номер места: {e}'}), 400)
+    except SeatsTaken as e:
+        db.session.rollback()
+        return None, (jsonify({
+            'success': False,
+            'message': f'Места уже заняты: {e}',
+            'taken_seats': e.labels
+        }), 409)
+
+def notify_booking_created(booking, event):
+    """Уведомление о созданном бронировании через outbox (в транзакции бронирования)"""
+    enqueue_notification(
+        booking.user_id,
+        "Бронирование создано",
+        f"Вы успешно забронировали {booking.seats} мест на мероприятие '{event.title}'.",
+        NotificationType.BOOKING_CREATED,
+        related_id=booking.id,
+        action_link="/bookings"
+    )
+
+# API для бронирования места на мероприятии
+@app.route('/api/bookings', methods=['POST'])
+@token_required
+@idempotent
+def create_booking():
+    user_id = g.user_id  # Получаем ID пользователя из JWT токена
+    event, seats, seat_numbers, error = parse_booking_request(request.json)
+    if error:
+        return error
+    
+    try:
+        positions, error = reserve_event_seats(event, seats, seat_numbers)
+        if error:
+            return error
+        
         new_booking = Booking(
             user_id=user_id,
-            event_id=event_id,
+            event_id=event.id,
             seats=seats,
             status='confirmed'
         )
         db.session.add(new_booking)
+        db.session.flush()
+        assign_booking_seats(new_booking.id, event.id, positions)
+        record_booking_created(new_booking)
+        notify_booking_created(new_booking, event)
+        # id читаются до коммита: после него объекты истекают и перечитывались бы из базы
+        booking_id, event_id = new_booking.id, event.id
         db.session.commit()
+        response_cache.invalidate(f'event:{event_id}')
         
-        # Создаем уведомление о бронировании
-        notification = Notification(
-            user_id=user_id,
-            title="Бронирование создано",
-            message=f"Вы успешно забронировали {seats} мест на мероприятие '{event.title}'.",
-            notification_type=NotificationType.BOOKING_CREATED,
-            related_id=new_booking.id,
-            action_link=f"/bookings"
+        return jsonify({
+            'success': True,
+            'message': 'Бронирование успешно создано',
+            'booking_id': booking_id
+        })
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': f'Ошибка при создании бронирования: {str(e)}'}), 500
+
+def parse_batch_items(data):
+    """([{'event_id', 'seats'}, ...], None) из тела пакетного бронирования
+    или (None, ответ с ошибкой)"""
+    items = (data or {}).get('items')
+    if not isinstance(items, list) or not items:
+        return None, (jsonify({'success': False, 'message': 'Список items обязателен'}), 400)
+    if len(items) > BATCH_BOOKING_MAX_ITEMS:
+        return None, (jsonify({
+            'success': False,
+            'message': f'Не больше {BATCH_BOOKING_MAX_ITEMS} мероприятий в одном бронировании'
+        }), 400)
+    
+    errors = []
+    seen = set()
+    for index, item in enumerate(items):
+        event_id = item.get('event_id') if isinstance(item, dict) else None
+        seats = item.get('seats', 1) if isinstance(item, dict) else None
+        if not isinstance(event_id, int) or isinstance(event_id, bool):
+            errors.append({'index': index, 'event_id': event_id, 'message': 'ID мероприятия обязателен'})
+        elif not isinstance(seats, int) or isinstance(seats, bool) or seats < 1:
+            errors.append({'index': index, 'event_id': event_id, 'message': 'Количество мест должно быть положительным числом'})
+        elif event_id in seen:
+            errors.append({'index': index, 'event_id': event_id, 'message': 'Мероприятие указано повторно'})
+        seen.add(event_id)
+    if errors:
+        return None, (jsonify({'success': False, 'message': 'Ошибки в списке бронирования', 'errors': errors}), 400)
+    return [{'event_id': item['event_id'], 'seats': item.get('seats', 1)} for item in items], None
+
+# API для пакетного бронирования нескольких мероприятий (групповая покупка, абонемент)
+@app.route('/api/bookings/batch', methods=['POST'])
+@token_required
+@idempotent
+def create_booking_batch():
+    """Все позиции бронируются одной транзакцией с фиксированным числом
+    операторов (независимо от числа позиций; мероприятия на площадках со
+    схемой секторов добавляют запросы назначения мест) или ни одна, с
+    причиной по каждой непрошедшей позиции."""
+    items, error = parse_batch_items(request.json)
+    if error:
+        return error
+    seats_by_event = {item['event_id']: item['seats'] for item in items}
+    
+    try:
+        # Сначала блокировки остатков в порядке event_id, затем статусы:
+        # отмена мероприятия держит ту же блокировку, пока меняет статус
+        remaining = lock_inventories(list(seats_by_event))
+        events = {
+            row.id: row for row in db.session.execute(
+                db.select(
+                    Event.id, Event.title, Event.status, Event.venue_id,
+                    db.select(VenueSection.id).where(VenueSection.venue_id == Event.venue_id).exists()
+                    .label('has_sections')
+                ).where(Event.id.in_(list(seats_by_event)))
+            )
+        }
+        
+        errors = []
+        for index, item in enumerate(items):
+            event = events.get(item['event_id'])
+            if event is None or item['event_id'] not in remaining:
+                message = 'Мероприятие не найдено'
+            elif event.status in (EventStatus.CANCELLED, EventStatus.FINISHED):
+                message = 'Бронирование на это мероприятие закрыто'
+            elif remaining[item['event_id']] < item['seats']:
+                message = f'Недостаточно мест. Доступно: {remaining[item["event_id"]]}'
+            else:
+                continue
+            errors.append({'index': index, 'event_id': item['event_id'], 'message': message})
+        if errors or not reserve_seats_batch(seats_by_event):
+            db.session.rollback()
+            return jsonify({
+                'success': False,
+                'message': 'Бронирование не выполнено: не все мероприятия доступны',
+                'errors': errors
+            }), 409
+        
+        # Один INSERT ... RETURNING на все позиции; порядок строк RETURNING не
+        # гарантирован, а event_id в пакете уникальны - сопоставляем по ним
+        created_at = datetime.utcnow()
+        rows = db.session.execute(
+            db.insert(Booking).returning(
+                Booking.id, Booking.user_id, Booking.event_id, Booking.seats, Booking.status, Booking.created_at
+            ),
+            [
+                {'user_id': g.user_id, 'event_id': item['event_id'], 'seats': item['seats'],
+                 'status': 'confirmed', 'created_at': created_at}
+                for item in items
+            ]
+        ).all()
+        by_event = {row.event_id: row for row in rows}
+        bookings = [by_event[item['event_id']] for item in items]
+        
+        # На площадках со схемой секторов места назначаются по порядку, как в
+        # одиночном бронировании (по запросу на такое мероприятие)
+        for index, item in enumerate(items):
+            event = events[item['event_id']]
+            if not event.has_sections:
+                continue
+            try:
+                positions = reserve_any_seats(event.id, event.venue_id, item['seats'])
+            except NotEnoughSeats:
+                db.session.rollback()
+                return jsonify({
+                    'success': False,
+                    'message': 'Бронирование не выполнено: не все мероприятия доступны',
+                    'errors': [{'index': index, 'event_id': event.id, 'message': 'Недостаточно свободных мест в схеме площадки'}]
+                }), 409
+            assign_booking_seats(by_event[event.id].id, event.id, positions)
+        record_bookings_created(bookings)
+        
+        # Одно уведомление на всю покупку
+        total_seats = sum(seats_by_event.values())
+        titles = ', '.join(f"'{events[item['event_id']].title}'" for item in items)
+        enqueue_notification(
+            g.user_id,
+            "Бронирование создано",
+            f"Вы успешно забронировали {total_seats} мест на мероприятия ({len(items)}): {titles}.",
+            NotificationType.BOOKING_CREATED,
+            related_id=bookings[0].id,
+            action_link="/bookings"
         )
-        db.session.add(notification)
         db.session.commit()
+        response_cache.invalidate(*(f'event:{event_id}' for event_id in seats_by_event))
         
         return jsonify({
             'success': True,
             'message': 'Бронирование успешно создано',
-            'booking_id': new_booking.id
+            'bookings': [
+                {'booking_id': booking.id, 'event_id': booking.event_id, 'seats': booking.seats}
+                for booking in bookings
+            ]
         })
     except Exception as e:
         db.session.rollback()
         return jsonify({'success': False, 'message': f'Ошибка при создании бронирования: {str(e)}'}), 500
 
+# API для удержания мест на время оплаты
+@app.route('/api/holds', methods=['POST'])
+@token_required
+@idempotent
+def create_hold():
+    event, seats, seat_numbers, error = parse_booking_request(request.json)
+    if error:
+        return error
+    
+    try:
+        positions, error = reserve_event_seats(event, seats, seat_numbers)
+        if error:
+            return error
+        
+        hold = SeatHold(
+            user_id=g.user_id,
+            event_id=event.id,
+            seats=seats,
+            status='active',
+            expires_at=hold_expires_at()
+        )
+        db.session.add(hold)
+        db.session.flush()
+        assign_booking_seats(None, event.id, positions, hold_id=hold.id)
+        db.session.commit()
+        response_cache.invalidate(f'event:{event.id}')
+        
+        return jsonify({
+            'success': True,
+            'message': 'Места удержаны',
+            'hold': serialize_hold(hold)
+        })
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': f'Ошибка при удержании мест: {str(e)}'}), 500
+
+# API для подтверждения удержания: удержанные места становятся бронированием
+@app.route('/api/holds/<int:hold_id>/confirm', methods=['POST'])
+@token_required
+@idempotent
+def confirm_hold(hold_id):
+    hold = SeatHold.query.get(hold_id)
+    if not hold or hold.user_id != g.user_id:
+        return jsonify({'success': False, 'message': 'Удержание не найдено'}), 404
+    
+    try:
+        if not claim_hold(hold_id, g.user_id):
+            db.session.rollback()
+            # Истёкшее удержание освобождаем сразу, не дожидаясь фоновой очистки
+            if finish_holds(SeatHold.id == hold_id, 'expired'):
+                db.session.commit()
+                response_cache.invalidate(f'event:{hold.event_id}')
+                return jsonify({'success': False, 'message': 'Время удержания мест истекло'}), 410
+            db.session.rollback()
+            return jsonify({'success': False, 'message': 'Удержание уже завершено'}), 400
+        
+        event = Event.query.get(hold.event_id)
+        if event.status in (EventStatus.CANCELLED, EventStatus.FINISHED):
+            db.session.rollback()
+            finish_holds(SeatHold.id == hold_id, 'released')
+            db.session.commit()
+            response_cache.invalidate(f'event:{hold.event_id}')
+            return jsonify({'success': False, 'message': 'Бронирование на это мероприятие закрыто'}), 400
+        
+        # Места уже списаны из остатка при создании удержания
+        new_booking = Booking(
+            user_id=hold.user_id,
+            event_id=hold.event_id,
+            seats=hold.seats,
+            status='confirmed'
+        )
+        db.session.add(new_booking)
+        db.session.flush()
+        confirm_hold_seats(hold_id, new_booking.id)
+        SeatHold.query.filter_by(id=hold_id).update({'booking_id': new_booking.id}, synchronize_session=False)
+        record_booking_created(new_booking)
+        notify_booking_created(new_booking, event)
+        db.session.commit()
+        
+        return jsonify({
+            'success': True,
+            'message': 'Бронирование успешно создано',
+            'booking_id': new_booking.id
+        })
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': f'Ошибка при подтверждении удержания: {str(e)}'}), 500
+
+# API для отказа от удержания (закрытие окна оплаты)
+@app.route('/api/holds/<int:hold_id>', methods=['DELETE'])
+@token_required
+def release_hold(hold_id):
+    hold = SeatHold.query.get(hold_id)
+    if not hold or hold.user_id != g.user_id:
+        return jsonify({'success': False, 'message': 'Удержание не найдено'}), 404
+    
+    try:
+        released = finish_holds(SeatHold.id == hold_id, 'released')
+        db.session.commit()
+        if not released:
+            return jsonify({'success': False, 'message': 'Удержание уже завершено'}), 400
+        response_cache.invalidate(f'event:{hold.event_id}')
+        
+        return jsonify({
+            'success': True,
+            'message': 'Места освобождены'
+        })
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': f'Ошибка при освобождении мест: {str(e)}'}), 500
+
+# Бронирование в списке пользователя; номера мест добавляются отдельным запросом
+USER_BOOKING = Projection(
+    ('id', Booking.id),
+    ('event_id', Booking.event_id),
+    ('event_title', Event.title),
+    ('event_date', Event.date, 'date'),
+    ('event_time', Event.time),
+    ('venue_name', Venue.name),
+    ('seats', Booking.seats),
+    ('status', Booking.status),
+    ('total_price', Booking.seats * Event.price),
+    ('created_at', Booking.created_at, 'datetime'),
+    ('event_image', Event.image_url)
+)
+
 # API для получения бронирований пользователя
 @app.route('/api/users/<int:user_id>/bookings', methods=['GET'])
 @token_required
@@ -626,11 +1261,7 @@ def get_user_bookings(user_id):
     if g.user_id != user_id and g.role != UserRole.admin.value and g.role != 'admin':
         return jsonify({'success': False, 'message': 'Нет доступа'}), 403
     
-    bookings = db.session.query(
-        Booking,
-        Event,
-        Venue
-    ).join(
+    rows = db.session.query(*USER_BOOKING.columns).select_from(Booking).join(
         Event, Booking.event_id == Event.id
     ).join(
         Venue, Event.venue_id == Venue.id
@@ -640,27 +1271,17 @@ def get_user_bookings(user_id):
         Event.date, Event.time
     ).all()
     
-    result = []
-    for booking, event, venue in bookings:
-        result.append({
-            'id': booking.id,
-            'event_id': booking.event_id,
-            'event_title': event.title,
-            'event_date': event.date.strftime('%Y-%m-%d'),
-            'event_time': event.time,
-            'venue_name': venue.name,
-            'seats': booking.seats,
-            'status': booking.status,
-            'total_price': booking.seats * event.price,
-            'created_at': booking.created_at.strftime('%Y-%m-%d %H:%M:%S'),
-            'event_image': event.image_url
-        })
+    result = USER_BOOKING.serialize_all(rows)
+    seat_numbers = booking_seat_labels([booking['id'] for booking in result])
+    for booking in result:
+        booking['seat_numbers'] = seat_numbers.get(booking['id'], [])
     
     return jsonify(result)
 
 # API для отмены бронирования
 @app.route('/api/bookings/<int:booking_id>/cancel', methods=['PUT'])
 @token_required
+@idempotent
 def cancel_booking(booking_id):
     booking = Booking.query.get(booking_id)
     
@@ -671,23 +1292,33 @@ def cancel_booking(booking_id):
     if g.user_id != booking.user_id and g.role != UserRole.admin.value and g.role != 'admin':
         return jsonify({'success': False, 'message': 'У вас нет прав для отмены этого бронирования'}), 403
     
+    if booking.status != 'confirmed':
+        return jsonify({'success': False, 'message': 'Бронирование уже отменено'}), 400
+    
     try:
-        booking.status = 'cancelled'
-        db.session.commit()
+        # Условный UPDATE защищает от повторного возврата мест при параллельной отмене
+        cancelled = Booking.query.filter_by(id=booking_id, status='confirmed').update(
+            {'status': 'cancelled'}, synchronize_session=False
+        )
+        if not cancelled:
+            db.session.rollback()
+            return jsonify({'success': False, 'message': 'Бронирование уже отменено'}), 400
         
-        # Получаем информацию о мероприятии для уведомления
-        event = Event.query.get(booking.event_id)
+        release_seats(booking.event_id, booking.seats)
+        release_booking_seats([booking_id])
+        record_status_change([booking.created_at], 'confirmed', 'cancelled')
         
-        # Создаем уведомление об отмене бронирования
-        notification = Notification(
-            user_id=booking.user_id,
-            title="Бронирование отменено",
-            message=f"Ваше бронирование на мероприятие '{event.title}' было отменено.",
-            notification_type=NotificationType.BOOKING_CANCELLED,
+        # Уведомление об отмене создаётся из outbox после коммита
+        event = Event.query.get(booking.event_id)
+        enqueue_notification(
+            booking.user_id,
+            "Бронирование отменено",
+            f"Ваше бронирование на мероприятие '{event.title}' было отменено.",
+            NotificationType.BOOKING_CANCELLED,
             related_id=booking.id
         )
-        db.session.add(notification)
         db.session.commit()
+        response_cache.invalidate(f'event:{booking.event_id}')
         
         return jsonify({
             'success': True,
@@ -699,8 +1330,11 @@ def cancel_booking(booking_id):
 
 # API для получения всех спортивных объектов
 @app.route('/api/venues', methods=['GET'])
+@read_replica
+@cached_response
 def get_venues():
     venues = Venue.query.order_by(Venue.name).all()
+    add_cache_tags('venues')
     
     result = []
     for venue in venues:
@@ -718,6 +1352,8 @@ def get_venues():
 
 # API для получения информации о конкретном спортивном объекте
 @app.route('/api/venues/<int:venue_id>', methods=['GET'])
+@read_replica
+@cached_response
 def get_venue(venue_id):
     venue = Venue.query.get(venue_id)
     
@@ -727,24 +1363,24 @@ def get_venue(venue_id):
     # Получаем все мероприятия, проводимые на данном объекте
     events = db.session.query(
         Event, 
-        db.func.count(Booking.id).filter(Booking.status == 'confirmed').label('booked_seats')
+        available_seats_column().label('available_seats')
     ).outerjoin(
-        Booking, Event.id == Booking.event_id
+        EventInventory, Event.id == EventInventory.event_id
     ).filter(
         Event.venue_id == venue_id
-    ).group_by(
-        Event.id
     ).all()
     
+    add_cache_tags(f'venue:{venue_id}', *(f'event:{event.id}' for event, _ in events))
+    
     events_data = []
-    for event, booked_seats in events:
+    for event, available_seats in events:
         events_data.append({
             'id': event.id,
             'title': event.title,
             'type': event.type.value,
             'date': event.date.strftime('%Y-%m-%d'),
             'time': event.time,
-            'available_seats': event.total_seats - booked_seats,
+            'available_seats': available_seats,
             'total_seats': event.total_seats,
             'price': event.price
         })
@@ -765,6 +1401,7 @@ def get_venue(venue_id):
 # API для создания спортивного объекта (только для админов)
 @app.route('/api/venues', methods=['POST'])
 @admin_required
+@idempotent
 def create_venue():
     data = request.json
     
@@ -787,6 +1424,7 @@ def create_venue():
         
         db.session.add(venue)
         db.session.commit()
+        response_cache.invalidate('venues')
         
         return jsonify({
             'success': True,
@@ -829,7 +1467,13 @@ def update_venue(venue_id):
         if 'longitude' in data:
             venue.longitude = data['longitude']
         
+        # Название и адрес площадки входят в поисковые документы её мероприятий
+        if 'name' in data or 'address' in data:
+            db.session.flush()
+            index_events(venue_id=venue_id)
+        
         db.session.commit()
+        response_cache.invalidate('venues', f'venue:{venue_id}')
         
         return jsonify({
             'success': True,
@@ -839,6 +1483,37 @@ def update_venue(venue_id):
         db.session.rollback()
         return jsonify({'success': False, 'message': f'Ошибка при обновлении спортивного объекта: {str(e)}'}), 500
 
+# API для замены схемы секторов площадки
+@app.route('/api/venues/<int:venue_id>/sections', methods=['PUT'])
+@admin_required
+def update_venue_sections(venue_id):
+    data = request.json or {}
+    
+    venue = Venue.query.get(venue_id)
+    if not venue:
+        return jsonify({'success': False, 'message': 'Спортивный объект не найден'}), 404
+    
+    sections = stadium_sections() if data.get('preset') == 'stadium' else data.get('sections')
+    if not isinstance(sections, list):
+        return jsonify({'success': False, 'message': 'Поле sections должно быть списком'}), 400
+    
+    try:
+        replace_sections(venue_id, sections)
+        db.session.commit()
+        response_cache.invalidate(f'venue:{venue_id}')
+        
+        return jsonify({
+            'success': True,
+            'message': 'Схема площадки обновлена',
+            'sections': len(sections)
+        })
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': f'Ошибка при обновлении схемы площадки: {str(e)}'}), 500
+
 # API для удаления спортивного объекта
 @app.route('/api/venues/<int:venue_id>', methods=['DELETE'])
 @admin_required
@@ -859,6 +1534,7 @@ def delete_venue(venue_id):
     try:
         db.session.delete(venue)
         db.session.commit()
+        response_cache.invalidate('venues', f'venue:{venue_id}')
         
         return jsonify({
             'success': True,
@@ -872,6 +1548,7 @@ def delete_venue(venue_id):
 # API для создания уведомления администратором
 @app.route('/api/notifications', methods=['POST'])
 @admin_required
+@idempotent
 def create_notification():
     data = request.json
     
@@ -917,75 +1594,140 @@ def create_notification():
         return jsonify({'success': False, 'message': f'Ошибка при создании уведомления: {str(e)}'}), 500
 
 
+# Уведомление в списке и потоке пользователя
+NOTIFICATION = Projection(
+    ('id', Notification.id),
+    ('title', Notification.title),
+    ('message', Notification.message),
+    ('notification_type', Notification.notification_type, 'enum'),
+    ('read', Notification.read),
+    ('action_link', Notification.action_link),
+    ('related_id', Notification.related_id),
+    ('created_at', Notification.created_at, 'datetime')
+)
+
+# Поток уведомлений пользователя (Server-Sent Events)
+@app.route('/api/users/<int:user_id>/notifications/stream', methods=['GET'])
+def stream_notifications(user_id):
+    error = authenticate_request(allow_query_token=True)
+    if error is not None:
+        return error
+    
+    # Проверяем права
+    if g.user_id != user_id and g.role != UserRole.admin.value:
+        return jsonify({'success': False, 'message': 'Нет доступа'}), 403
+    
+    # Продолжение с Last-Event-ID после переподключения, иначе - только новые
+    last_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    try:
+        last_id = int(last_id) if last_id else None
+    except ValueError:
+        return jsonify({'success': False, 'message': 'Неверный Last-Event-ID'}), 400
+    if last_id is None:
+        last_id = db.session.query(db.func.max(Notification.id)).filter_by(user_id=user_id).scalar() or 0
+    db.session.close()
+    
+    subscription = notification_bus.subscribe(user_id)
+    if subscription is None:
+        response = jsonify({'success': False, 'message': 'Слишком много открытых соединений, попробуйте позже'})
+        response.status_code = 503
+        response.headers['Retry-After'] = '30'
+        return response
+    
+    def fetch_changes(after_id):
+        rows = db.session.query(*NOTIFICATION.columns).filter(
+            Notification.user_id == user_id,
+            Notification.id > after_id
+        ).order_by(Notification.id).limit(100).all()
+        payload = NOTIFICATION.serialize_all(rows)
+        count = get_unread_count(user_id)
+        # Соединение возвращается в пул до следующего изменения
+        db.session.close()
+        return payload, count
+    
+    def generate():
+        nonlocal last_id
+        try:
+            yield 'retry: 5000\n\n'
+            deadline = datetime.utcnow() + timedelta(seconds=NOTIFICATION_STREAM_MAX_DURATION)
+            changed = True
+            while datetime.utcnow() < deadline:
+                if changed:
+                    notifications, count = fetch_changes(last_id)
+                    for notification in notifications:
+                        last_id = notification['id']
+                        yield f"id: {last_id}\nevent: notification\ndata: {json.dumps(notification, ensure_ascii=False)}\n\n"
+                    yield f"event: unread_count\ndata: {json.dumps({'count': count})}\n\n"
+                    # Если новых уведомлений больше страницы, дочитываем сразу
+                    changed = len(notifications) == 100
+                    if changed:
+                        continue
+                changed = subscription.wait(NOTIFICATION_STREAM_HEARTBEAT)
+                if not changed:
+                    yield ': heartbeat\n\n'
+        finally:
+            notification_bus.unsubscribe(subscription)
+    
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
 # Получение уведомлений пользователя
 @app.route('/api/users/<int:user_id>/notifications', methods=['GET'])
 @token_required
+@read_replica
 def get_user_notifications(user_id):
     # Проверяем права
     if g.user_id != user_id and g.role != UserRole.admin.value and g.role != 'admin':
         return jsonify({'success': False, 'message': 'Нет доступа'}), 403
     
     # Параметры запроса
-    limit = request.args.get('limit', default=None, type=int)
-    page = request.args.get('page', default=1, type=int)
-    per_page = request.args.get('per_page', default=10, type=int)
     unread_only = request.args.get('unread_only', default='false').lower() == 'true'
     
-    # Базовый запрос
-    query = Notification.query.filter_by(user_id=user_id)
+    # Базовый запрос: только столбцы ответа
+    query = db.session.query(*NOTIFICATION.columns).filter(Notification.user_id == user_id)
     
     # Применяем фильтры
     if unread_only:
-        query = query.filter_by(read=False)
-    
-    # Сортировка по дате создания (сначала новые)
-    query = query.order_by(Notification.created_at.desc())
+        query = query.filter(Notification.read == False)
     
-    # Если задан предел, используем его, иначе используем пагинацию
-    if limit:
-        notifications = query.limit(limit).all()
-        total = min(limit, query.count())
-    else:
-        # Пагинация
-        offset = (page - 1) * per_page
-        notifications = query.offset(offset).limit(per_page).all()
-        total = query.count()
+    # Keyset-пагинация от новых к старым по (created_at, id) по составному индексу;
+    # общее количество не считается, непрочитанные берутся из счётчика
+    limit = get_page_limit(default=20, maximum=100)
+    try:
+        rows, next_cursor = keyset_page(
+            query,
+            (Notification.created_at, Notification.id),
+            lambda row: (row.created_at, row.id),
+            limit,
+            descending=True
+        )
+    except InvalidCursor:
+        return jsonify({'success': False, 'message': 'Неверный курсор пагинации'}), 400
     
-    result = []
-    for notification in notifications:
-        result.append({
-            'id': notification.id,
-            'title': notification.title,
-            'message': notification.message,
-            'notification_type': notification.notification_type.value,
-            'read': notification.read,
-            'action_link': notification.action_link,
-            'related_id': notification.related_id,
-            'created_at': notification.created_at.strftime('%Y-%m-%d %H:%M:%S')
-        })
+    result = NOTIFICATION.serialize_all(rows)
     
     return jsonify({
         'success': True,
         'notifications': result,
-        'total': total,
-        'page': page,
-        'per_page': per_page,
-        'total_pages': (total + per_page - 1) // per_page
+        'next_cursor': next_cursor,
+        'limit': limit,
+        'unread_count': get_unread_count(user_id)
     })
 
 # Получение количества непрочитанных уведомлений
 @app.route('/api/users/<int:user_id>/notifications/unread-count', methods=['GET'])
 @token_required
+@read_replica
 def get_unread_notifications_count(user_id):
     # Проверяем права
     if g.user_id != user_id and g.role != UserRole.admin.value and g.role != 'admin':
         return jsonify({'success': False, 'message': 'Нет доступа'}), 403
     
-    count = Notification.query.filter_by(user_id=user_id, read=False).count()
-    
     return jsonify({
         'success': True,
-        'count': count
+        'count': get_unread_count(user_id)
     })
 
 # Отметить уведомление как прочитанное
@@ -1002,7 +1744,13 @@ def mark_notification_as_read(notification_id):
         return jsonify({'success': False, 'message': 'Нет доступа'}), 403
     
     try:
-        notification.read = True
+        # Условный UPDATE: повторная отметка не уменьшит счётчик дважды
+        updated = Notification.query.filter_by(id=notification_id, read=False).update(
+            {'read': True}, synchronize_session=False
+        )
+        if updated:
+            add_unread(db.session, {notification.user_id: -1})
+            notify_users(db.session, [notification.user_id])
         db.session.commit()
         
         return jsonify({
@@ -1023,7 +1771,11 @@ def mark_all_notifications_as_read(user_id):
     
     try:
         # Обновляем все непрочитанные уведомления пользователя
-        Notification.query.filter_by(user_id=user_id, read=False).update({'read': True})
+        updated = Notification.query.filter_by(user_id=user_id, read=False).update(
+            {'read': True}, synchronize_session=False
+        )
+        add_unread(db.session, {user_id: -updated})
+        notify_users(db.session, [user_id])
         db.session.commit()
         
         return jsonify({
@@ -1064,49 +1816,31 @@ def delete_notification(notification_id):
 # Получение статистики по бронированиям
 @app.route('/api/admin/stats/bookings', methods=['GET'])
 @admin_required
+@read_replica
 def get_booking_stats():
-    # Статистика по статусам бронирований
-    status_stats = db.session.query(
-        Booking.status,
-        db.func.count(Booking.id)
-    ).group_by(Booking.status).all()
+    # Все показатели читаются из агрегатов (см. stats.py), а не из bookings
+    maybe_compact()
     
-    status_data = {status: count for status, count in status_stats}
+    # Статистика по статусам бронирований
+    status_data = booking_status_totals()
     
     # Статистика по дням (последние 30 дней)
-    thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-    
-    daily_stats = db.session.query(
-        db.func.date(Booking.created_at),
-        db.func.count(Booking.id)
-    ).filter(
-        Booking.created_at >= thirty_days_ago
-    ).group_by(
-        db.func.date(Booking.created_at)
-    ).all()
-    
-    daily_data = {str(date): count for date, count in daily_stats}
+    thirty_days_ago = (datetime.utcnow() - timedelta(days=30)).date()
+    daily_data = daily_booking_counts(thirty_days_ago)
     
     # Статистика по мероприятиям (топ-5 по количеству бронирований)
-    top_events = db.session.query(
-        Event.id,
-        Event.title,
-        db.func.count(Booking.id).label('bookings_count')
-    ).join(
-        Booking, Event.id == Booking.event_id
-    ).group_by(
-        Event.id, Event.title
-    ).order_by(
-        db.desc('bookings_count')
-    ).limit(5).all()
+    top_events = top_booked(EventBookingStats)
+    titles = dict(db.session.query(Event.id, Event.title).filter(
+        Event.id.in_([event_id for event_id, _ in top_events])
+    ).all())
     
     top_events_data = [
-        {'id': id, 'title': title, 'bookings_count': count}
-        for id, title, count in top_events
+        {'id': id, 'title': titles.get(id), 'bookings_count': count}
+        for id, count in top_events
     ]
     
     # Общее количество бронирований
-    total_bookings = Booking.query.count()
+    total_bookings = sum(status_data.values())
     
     return jsonify({
         'success': True,
@@ -1119,6 +1853,7 @@ def get_booking_stats():
 # Получение статистики по мероприятиям
 @app.route('/api/admin/stats/events', methods=['GET'])
 @admin_required
+@read_replica
 def get_event_stats():
     # Статистика по типам мероприятий
     type_stats = db.session.query(
@@ -1168,75 +1903,76 @@ def get_event_stats():
 # Получение статистики по пользователям
 @app.route('/api/admin/stats/users', methods=['GET'])
 @admin_required
+@read_replica
 def get_user_stats():
-    try:
-        # Общее количество пользователей
-        total_users = User.query.count()
-        
-        # Количество администраторов
-        admin_count = User.query.filter_by(role=UserRole.admin).count()
-        
-        # Топ-5 пользователей по количеству бронирований
-        top_users = db.session.query(
-            User.id,
-            User.username,
-            db.func.count(Booking.id).label('bookings_count')
-        ).join(
-            Booking, User.id == Booking.user_id
-        ).group_by(
-            User.id, User.username
-        ).order_by(
-            db.desc('bookings_count')
-        ).limit(5).all()
-        
-        top_users_data = [
-            {'id': id, 'username': username, 'bookings_count': count}
-            for id, username, count in top_users
-        ]
-        
-        # Статистика по времени регистрации (по месяцам)
-        # Обратите внимание на изменение здесь - используем EXTRACT вместо strftime для PostgreSQL
-        monthly_stats = db.session.query(
-            db.func.to_char(User.created_at, 'YYYY-MM').label('month'),
-            db.func.count(User.id)
-        ).group_by(
-            'month'
-        ).all()
-        
-        monthly_data = {month: count for month, count in monthly_stats}
-        
-        return jsonify({
-            'success': True,
-            'total_users': total_users,
-            'admin_count': admin_count,
-            'top_users': top_users_data,
-            'monthly_stats': monthly_data
-        })
-    except Exception as e:
-        # Добавьте логирование ошибки
-        print(f"Error in get_user_stats: {str(e)}")
-        return jsonify({
-            'success': False, 
-            'message': f'Ошибка при получении статистики пользователей: {str(e)}'
-        }), 500
+    # Общее количество пользователей и администраторов из агрегата по ролям
+    role_totals = user_role_totals()
+    
+    # Топ-5 пользователей по количеству бронирований
+    top_users = top_booked(UserBookingStats)
+    usernames = dict(db.session.query(User.id, User.username).filter(
+        User.id.in_([user_id for user_id, _ in top_users])
+    ).all())
+    
+    top_users_data = [
+        {'id': id, 'username': usernames.get(id), 'bookings_count': count}
+        for id, count in top_users
+    ]
+    
+    # Статистика по времени регистрации (по месяцам) из агрегата
+    monthly_data = monthly_signups()
+    
+    return jsonify({
+        'success': True,
+        'total_users': sum(role_totals.values()),
+        'admin_count': role_totals.get(UserRole.admin.name, 0),
+        'top_users': top_users_data,
+        'monthly_stats': monthly_data
+    })
+
+# API для отслеживания фоновой задачи (например, отмены крупного мероприятия)
+@app.route('/api/admin/jobs/<int:job_id>', methods=['GET'])
+@admin_required
+def get_job(job_id):
+    job = BackgroundJob.query.get(job_id)
+    if not job:
+        return jsonify({'success': False, 'message': 'Задача не найдена'}), 404
+    
+    return jsonify({'success': True, 'job': serialize_job(job)})
+
+# API для массового импорта мероприятий из CSV или JSON Lines (тело запроса - файл)
+@app.route('/api/admin/events/import', methods=['POST'])
+@admin_required
+def import_events_route():
+    import_format = request.args.get('format')
+    if import_format is None:
+        import_format = 'csv' if request.mimetype == 'text/csv' else 'jsonl'
+    if import_format not in IMPORT_FORMATS:
+        return jsonify({'success': False, 'message': f'Неверный формат импорта: {import_format}'}), 400
+    dry_run = request.args.get('dry_run', 'false').lower() == 'true'
+    
+    # Ошибки кодировки и чтения попадают в отчёт: порции до них уже записаны
+    report = import_events(request.stream, import_format, dry_run=dry_run)
+    if report.event_ids:
+        response_cache.invalidate('events', *(f'venue:{venue_id}' for venue_id in report.venue_ids))
+    
+    return jsonify({'success': report.failed == 0, 'dry_run': dry_run, **report.as_dict()})
+
+# Пользователь в списке администратора (без хеша пароля)
+ADMIN_USER = Projection(
+    ('id', User.id),
+    ('username', User.username),
+    ('email', User.email),
+    ('role', User.role, 'enum'),
+    ('created_at', User.created_at, 'datetime')
+)
 
 # Административный API для управления пользователями
 @app.route('/api/admin/users', methods=['GET'])
 @admin_required
 def get_all_users():
-    users = User.query.all()
-    
-    result = []
-    for user in users:
-        result.append({
-            'id': user.id,
-            'username': user.username,
-            'email': user.email,
-            'role': user.role.value,
-            'created_at': user.created_at.strftime('%Y-%m-%d %H:%M:%S')
-        })
-    
-    return jsonify(result)
+    rows = db.session.query(*ADMIN_USER.columns).order_by(User.id).all()
+    return jsonify(ADMIN_USER.serialize_all(rows))
 
 # Изменение роли пользователя
 @app.route('/api/admin/users/<int:user_id>/role', methods=['PUT'])
@@ -1254,12 +1990,17 @@ def update_user_role(user_id):
     except KeyError:
         return jsonify({'success': False, 'message': f'Неверная роль: {new_role}'}), 400
     
-    user = User.query.get(user_id)
+    # Строка блокируется: параллельная смена роли не учтёт переход дважды
+    user = db.session.get(User, user_id, with_for_update=True)
     if not user:
         return jsonify({'success': False, 'message': 'Пользователь не найден'}), 404
     
     try:
-        user.role = user_role
+        if user.role != user_role:
+            record_role_change(user.role, user_role)
+            user.role = user_role
+            # Старые токены содержат прежнюю роль
+            revoke_user_tokens(user_id)
         db.session.commit()
         
         return jsonify({
@@ -1282,9 +2023,18 @@ def delete_user(user_id):
         return jsonify({'success': False, 'message': 'Пользователь не найден'}), 404
     
     try:
+        # Места бронирований и активных удержаний возвращаются до каскадного удаления
+        event_ids = release_user_bookings(user_id)
+        event_ids |= finish_holds(SeatHold.user_id == user_id, 'released')
+        
         # Удаляем связанные записи
+        record_user_deleted(user)
         db.session.delete(user)
+        forget_user(user_id)
+        revoke_user_tokens(user_id)
         db.session.commit()
+        if event_ids:
+            response_cache.invalidate(*(f'event:{event_id}' for event_id in event_ids))
         
         return jsonify({
             'success': True,
@@ -1294,42 +2044,173 @@ def delete_user(user_id):
         db.session.rollback()
         return jsonify({'success': False, 'message': f'Ошибка при удалении пользователя: {str(e)}'}), 500
     
+# Строка журнала уведомлений с именем пользователя из JOIN
+ADMIN_NOTIFICATION = Projection(
+    ('id', Notification.id),
+    ('user_id', Notification.user_id),
+    ('username', User.username),
+    ('title', Notification.title),
+    ('message', Notification.message),
+    ('notification_type', Notification.notification_type, 'enum'),
+    ('read', Notification.read),
+    ('action_link', Notification.action_link),
+    ('related_id', Notification.related_id),
+    ('created_at', Notification.created_at, 'datetime')
+)
+
+def filter_admin_notifications(query):
+    """Фильтры журнала уведомлений из параметров запроса; ValueError с сообщением при ошибке"""
+    notification_type = request.args.get('type')
+    if notification_type:
+        try:
+            query = query.filter(Notification.notification_type == NotificationType(notification_type.lower()))
+        except ValueError:
+            raise ValueError(f'Неверный тип уведомления: {notification_type}')
+    
+    user_id = request.args.get('user_id')
+    if user_id:
+        if not user_id.isdigit():
+            raise ValueError('Неверный ID пользователя')
+        query = query.filter(Notification.user_id == int(user_id))
+    
+    read = request.args.get('read')
+    if read:
+        if read.lower() not in ('true', 'false'):
+            raise ValueError('Параметр read должен быть true или false')
+        query = query.filter(Notification.read == (read.lower() == 'true'))
+    
+    try:
+        date_from = request.args.get('date_from')
+        if date_from:
+            query = query.filter(Notification.created_at >= datetime.strptime(date_from, '%Y-%m-%d'))
+        
+        date_to = request.args.get('date_to')
+        if date_to:
+            query = query.filter(Notification.created_at < datetime.strptime(date_to, '%Y-%m-%d') + timedelta(days=1))
+    except ValueError:
+        raise ValueError('Дата должна быть в формате YYYY-MM-DD')
+    
+    return query
+
+def export_admin_notifications(query, export_format):
+    """Потоковая выгрузка журнала в NDJSON или CSV.
+
+    Строки читаются серверным курсором порциями по
+    NOTIFICATION_EXPORT_BATCH_SIZE, поэтому память воркера не зависит от
+    размера таблицы.
+    """
+    rows = query.order_by(
+        Notification.created_at.desc(), Notification.id.desc()
+    ).yield_per(NOTIFICATION_EXPORT_BATCH_SIZE)
+    
+    def generate_ndjson():
+        for row in rows:
+            yield json.dumps(ADMIN_NOTIFICATION.serialize(row), ensure_ascii=False) + '\n'
+    
+    def generate_csv():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(ADMIN_NOTIFICATION.names)
+        for row in rows:
+            writer.writerow(ADMIN_NOTIFICATION.serialize(row).values())
+            if buffer.tell() >= 64 * 1024:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+    
+    if export_format == 'csv':
+        generate, mimetype = generate_csv, 'text/csv'
+    else:
+        generate, mimetype = generate_ndjson, 'application/x-ndjson'
+    
+    return Response(stream_with_context(generate()), mimetype=mimetype, headers={
+        'Content-Disposition': f'attachment; filename=notifications.{export_format}',
+        'X-Accel-Buffering': 'no'
+    })
+
 @app.route('/api/admin/notifications', methods=['GET'])
 @admin_required
+@read_replica
 def get_all_notifications():
     try:
-        # Получаем уведомления всех пользователей
-        notifications = db.session.query(
-            Notification,
-            User.username
-        ).join(
+        # Только нужные столбцы: без ORM-объектов и с именем пользователя из JOIN
+        notifications_query = db.session.query(*ADMIN_NOTIFICATION.columns).join(
             User, Notification.user_id == User.id
-        ).order_by(
-            Notification.created_at.desc()
-        ).all()
+        )
         
-        result = []
-        for notification, username in notifications:
-            result.append({
-                'id': notification.id,
-                'user_id': notification.user_id,
-                'username': username,
-                'title': notification.title,
-                'message': notification.message,
-                'notification_type': notification.notification_type.value,
-                'read': notification.read,
-                'action_link': notification.action_link,
-                'related_id': notification.related_id,
-                'created_at': notification.created_at.strftime('%Y-%m-%d %H:%M:%S')
-            })
+        try:
+            notifications_query = filter_admin_notifications(notifications_query)
+        except ValueError as e:
+            return jsonify({'success': False, 'message': str(e)}), 400
+        
+        # Выгрузка всего журнала (с учётом фильтров): ?format=ndjson или ?format=csv
+        export_format = request.args.get('format')
+        if export_format:
+            if export_format not in ('ndjson', 'csv'):
+                return jsonify({'success': False, 'message': f'Неверный формат выгрузки: {export_format}'}), 400
+            return export_admin_notifications(notifications_query, export_format)
+        
+        # Keyset-пагинация от новых к старым по (created_at, id)
+        limit = get_page_limit(default=50, maximum=200)
+        try:
+            rows, next_cursor = keyset_page(
+                notifications_query,
+                (Notification.created_at, Notification.id),
+                lambda row: (row.created_at, row.id),
+                limit,
+                descending=True
+            )
+        except InvalidCursor:
+            return jsonify({'success': False, 'message': 'Неверный курсор пагинации'}), 400
         
-        return jsonify(result)
+        return jsonify({
+            'success': True,
+            'notifications': ADMIN_NOTIFICATION.serialize_all(rows),
+            'next_cursor': next_cursor,
+            'limit': limit
+        })
     except Exception as e:
         return jsonify({'success': False, 'message': f'Ошибка при получении уведомлений: {str(e)}'}), 500
     
     
-with app.app_context():
-    db.create_all()
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Метрики всех воркеров в текстовом формате Prometheus"""
+    if METRICS_TOKEN and request.headers.get('Authorization') != f'Bearer {METRICS_TOKEN}':
+        return jsonify({'success': False, 'message': 'Доступ запрещен'}), 403
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+
+@app.cli.command('rebuild-stats')
+def rebuild_stats_command():
+    """Полный пересчёт агрегатов статистики и счётчиков непрочитанных уведомлений"""
+    rebuild_stats()
+    rebuild_unread_counters()
+    print('Statistics rebuilt')
+
+@app.cli.command('import-events')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'import_format', type=click.Choice(IMPORT_FORMATS), default=None,
+              help='По умолчанию - по расширению файла')
+@click.option('--dry-run', is_flag=True, help='Только проверка строк')
+def import_events_command(path, import_format, dry_run):
+    """Массовый импорт мероприятий из CSV или JSON Lines"""
+    if import_format is None:
+        import_format = 'csv' if path.lower().endswith('.csv') else 'jsonl'
+    with open(path, 'rb') as f:
+        report = import_events(f, import_format, dry_run=dry_run)
+    if report.event_ids:
+        response_cache.invalidate('events', *(f'venue:{venue_id}' for venue_id in report.venue_ids))
+    for error in report.errors:
+        print(f"row {error['row']}: {error['message']}")
+    print(f'Imported: {report.imported}, failed: {report.failed}')
+
+@app.cli.command('outbox-worker')
+def outbox_worker_command():
+    """Отдельный процесс обработки outbox (масштабируется независимо от API)"""
+    print('Outbox worker started')
+    run_outbox_worker(app)
 
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
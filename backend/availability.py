@@ -0,0 +1,85 @@
+import os
+import threading
+import time
+
+from sqlalchemy import select
+
+from cache import response_cache, TagGenerations
+from database import db
+from models import Event, EventInventory
+from inventory import available_seats_column
+
+
+class AvailabilitySnapshot:
+    """Остаток мест и статус мероприятий в памяти процесса с коротким TTL.
+
+    Записи сбрасываются теми же инвалидациями event:<id>, что и кэш ответов
+    (бронирования, отмены, удержания, изменения мероприятия), поэтому в своём
+    воркере данные свежие сразу после записи, а в остальных устаревают не
+    больше чем на ttl секунд. Прочитанная строка не сохраняется, только если
+    во время чтения сбросили это же мероприятие.
+    """
+
+    def __init__(self, ttl=2, max_entries=10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = {}  # event_id -> (expires_at, available_seats, status)
+        self._generation = 0
+        self._event_generations = TagGenerations(max_tags=max_entries)
+        self._lock = threading.Lock()
+
+    def get_many(self, event_ids):
+        """{event_id: (available_seats, status)}; отсутствующие в снимке
+        мероприятия читаются одним запросом, несуществующие пропускаются"""
+        now = time.monotonic()
+        result = {}
+        missing = []
+        with self._lock:
+            for event_id in event_ids:
+                entry = self._entries.get(event_id)
+                if entry is not None and entry[0] > now:
+                    result[event_id] = entry[1:]
+                else:
+                    missing.append(event_id)
+            generation = self._generation
+        if not missing:
+            return result
+
+        rows = db.session.execute(
+            select(Event.id, available_seats_column(), Event.status)
+            .outerjoin(EventInventory, EventInventory.event_id == Event.id)
+            .where(Event.id.in_(missing))
+        ).all()
+        expires_at = time.monotonic() + self.ttl
+        with self._lock:
+            if len(self._entries) + len(rows) > self.max_entries:
+                self._entries.clear()
+            for event_id, available_seats, status in rows:
+                result[event_id] = (max(available_seats, 0), status)
+                # Мероприятие сброшено во время чтения: прочитанное могло устареть
+                if not self._event_generations.changed_since((event_id,), generation):
+                    self._entries[event_id] = (expires_at, max(available_seats, 0), status)
+        return result
+
+    def invalidate(self, tags):
+        event_ids = [int(tag[len('event:'):]) for tag in tags if tag.startswith('event:')]
+        if not event_ids:
+            return
+        with self._lock:
+            self._generation += 1
+            self._event_generations.bump(event_ids, self._generation)
+            for event_id in event_ids:
+                self._entries.pop(event_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._event_generations.reset(self._generation)
+            self._entries.clear()
+
+
+availability_snapshot = AvailabilitySnapshot(
+    ttl=float(os.getenv("AVAILABILITY_TTL", "2")),
+    max_entries=int(os.getenv("AVAILABILITY_MAX_ENTRIES", "10000"))
+)
+response_cache.add_invalidation_listener(availability_snapshot.invalidate)
@@ -0,0 +1,209 @@
+"""Микробенчмарк сериализации списков: ORM-объекты, dict по полям, strftime и
+стандартный json против проекции столбцов, скомпилированной функции и orjson.
+
+Запуск (из каталога backend):
+
+    python bench_serialize.py
+    python bench_serialize.py --rows 10000 --repeat 5 --list events
+
+Скрипт заполняет отдельную базу (по умолчанию SQLite во временном каталоге,
+либо DATABASE_URL) и для каждого варианта печатает JSON-строку: лучшее из
+--repeat время выборки, сериализации и кодирования и rows/sec целиком.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def seed(rows):
+    """rows мероприятий и уведомлений в пустой базе"""
+    from database import db
+    from models import Venue, Event, EventType, EventStatus, EventInventory, User, UserRole
+    from models import Notification, NotificationType
+
+    if Event.query.count() >= rows:
+        return
+    venue = Venue(name='Bench Arena', address='Almaty', capacity=50000)
+    user = User(username='bench', email='bench@example.com', password='x', role=UserRole.user)
+    db.session.add_all([venue, user])
+    db.session.flush()
+    start = datetime.utcnow() + timedelta(days=1)
+    event_ids = db.session.execute(db.insert(Event).returning(Event.id), [
+        {
+            'title': f'Event {i}', 'type': EventType.SPORT, 'status': EventStatus.UPCOMING,
+            'venue_id': venue.id, 'date': start + timedelta(hours=i), 'time': '18:00', 'duration': 90,
+            'total_seats': 1000, 'price': 1000, 'description': 'x' * 500, 'created_at': datetime.utcnow()
+        }
+        for i in range(rows)
+    ]).scalars().all()
+    db.session.execute(db.insert(EventInventory), [
+        {'event_id': event_id, 'remaining_seats': 1000} for event_id in event_ids
+    ])
+    db.session.execute(db.insert(Notification), [
+        {
+            'user_id': user.id, 'title': f'Notification {i}', 'message': 'x' * 300,
+            'notification_type': NotificationType.SYSTEM_MESSAGE, 'read': False, 'created_at': datetime.utcnow()
+        }
+        for i in range(rows)
+    ])
+    db.session.commit()
+
+
+def legacy_events():
+    """Как get_events до проекций: ORM-объекты и dict по полям со strftime"""
+    from database import db
+    from models import Event, Venue, EventInventory
+    from inventory import available_seats_column
+
+    rows = db.session.query(
+        Event, Venue.name.label('venue_name'), available_seats_column().label('available_seats')
+    ).join(Venue, Event.venue_id == Venue.id).outerjoin(
+        EventInventory, Event.id == EventInventory.event_id
+    ).order_by(Event.date, Event.time, Event.id).all()
+
+    def serialize():
+        return [
+            {
+                'id': event.id,
+                'title': event.title,
+                'type': event.type.value,
+                'venue_id': event.venue_id,
+                'venue_name': venue_name,
+                'date': event.date.strftime('%Y-%m-%d'),
+                'time': event.time,
+                'duration': event.duration,
+                'total_seats': event.total_seats,
+                'available_seats': available_seats,
+                'price': event.price,
+                'description': event.description,
+                'status': event.status.value,
+                'image_url': event.image_url,
+                'event_subtype': event.event_subtype,
+                'organizer': event.organizer,
+                'featured': event.featured
+            }
+            for event, venue_name, available_seats in rows
+        ]
+    return serialize
+
+
+def projected_events(projection):
+    from database import db
+    from models import Event, Venue, EventInventory
+
+    rows = db.session.query(*projection.columns).select_from(Event).join(
+        Venue, Event.venue_id == Venue.id
+    ).outerjoin(
+        EventInventory, Event.id == EventInventory.event_id
+    ).order_by(Event.date, Event.time, Event.id).all()
+    return lambda: projection.serialize_all(rows)
+
+
+def legacy_notifications():
+    """Как get_user_notifications до проекций"""
+    from models import Notification
+
+    rows = Notification.query.order_by(Notification.created_at.desc(), Notification.id.desc()).all()
+
+    def serialize():
+        return [
+            {
+                'id': notification.id,
+                'title': notification.title,
+                'message': notification.message,
+                'notification_type': notification.notification_type.value,
+                'read': notification.read,
+                'action_link': notification.action_link,
+                'related_id': notification.related_id,
+                'created_at': notification.created_at.strftime('%Y-%m-%d %H:%M:%S')
+            }
+            for notification in rows
+        ]
+    return serialize
+
+
+def projected_notifications():
+    from app import NOTIFICATION
+    from database import db
+    from models import Notification
+
+    rows = db.session.query(*NOTIFICATION.columns).order_by(
+        Notification.created_at.desc(), Notification.id.desc()
+    ).all()
+    return lambda: NOTIFICATION.serialize_all(rows)
+
+
+def measure(load, encode, repeat):
+    """Лучшее из repeat: выборка, сериализация, кодирование (секунды) и число строк"""
+    from database import db
+
+    best = None
+    for _ in range(repeat):
+        db.session.remove()
+        started = time.perf_counter()
+        serialize = load()
+        loaded = time.perf_counter()
+        result = serialize()
+        serialized = time.perf_counter()
+        encode(result)
+        encoded = time.perf_counter()
+        timings = (loaded - started, serialized - loaded, encoded - serialized)
+        if best is None or sum(timings) < sum(best):
+            best = timings
+    return best, len(result)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--list', choices=['events', 'notifications', 'all'], default='all')
+    args = parser.parse_args()
+
+    if 'DATABASE_URL' not in os.environ:
+        os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.gettempdir(), 'quicket_bench_serialize.db')
+    subprocess.run([sys.executable, 'migrate.py'], cwd=BACKEND_DIR, check=True)
+
+    sys.path.insert(0, BACKEND_DIR)
+    from flask.json.provider import DefaultJSONProvider
+    from app import app, EVENT_SUMMARY, EVENT_SUMMARY_WITH_DESCRIPTION
+
+    variants = []
+    if args.list in ('events', 'all'):
+        variants += [
+            ('events', 'orm+strftime+json', legacy_events, 'default'),
+            ('events', 'projection+compiled+orjson', lambda: projected_events(EVENT_SUMMARY_WITH_DESCRIPTION), 'fast'),
+            ('events', 'projection+compiled+orjson, без description', lambda: projected_events(EVENT_SUMMARY), 'fast'),
+        ]
+    if args.list in ('notifications', 'all'):
+        variants += [
+            ('notifications', 'orm+strftime+json', legacy_notifications, 'default'),
+            ('notifications', 'projection+compiled+orjson', projected_notifications, 'fast'),
+        ]
+
+    with app.app_context():
+        seed(args.rows)
+        encoders = {'default': DefaultJSONProvider(app).dumps, 'fast': app.json.dumps}
+        for list_name, variant, load, encoder in variants:
+            (load_time, serialize_time, encode_time), rows = measure(load, encoders[encoder], args.repeat)
+            total = load_time + serialize_time + encode_time
+            print(json.dumps({
+                'list': list_name,
+                'variant': variant,
+                'rows': rows,
+                'query_ms': round(load_time * 1000, 1),
+                'serialize_ms': round(serialize_time * 1000, 1),
+                'encode_ms': round(encode_time * 1000, 1),
+                'rows_per_sec': round(rows / total),
+            }, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,167 @@
+"""Сравнение пропускной способности GET /api/events: dev-сервер Flask и gunicorn.
+
+Запуск (из каталога backend):
+
+    python bench_serving.py --mode dev
+    python bench_serving.py --mode prod --workers 4 --threads 4
+
+Скрипт заполняет отдельную базу (по умолчанию SQLite во временном каталоге,
+либо DATABASE_URL), поднимает сервер в выбранном режиме, нагружает его
+параллельными keep-alive клиентами и печатает requests/sec и задержки.
+"""
+import argparse
+import http.client
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def seed(env, events):
+    """Миграции и площадка с events мероприятиями в пустой базе"""
+    script = f"""
+from datetime import datetime, timedelta
+from app import app
+from database import db
+from models import Venue, Event, EventType, EventStatus
+from inventory import create_inventory
+from search import index_events
+with app.app_context():
+    if not Event.query.first():
+        venue = Venue(name='Bench Arena', address='Almaty', capacity=50000)
+        db.session.add(venue)
+        db.session.flush()
+        start = datetime.utcnow() + timedelta(days=1)
+        for i in range({events}):
+            event = Event(title=f'Event {{i}}', type=EventType.SPORT, status=EventStatus.UPCOMING,
+                          venue_id=venue.id, date=start + timedelta(hours=i), time='18:00',
+                          total_seats=1000, price=1000, description='x' * 500)
+            create_inventory(event)
+            db.session.add(event)
+        db.session.flush()
+        index_events()
+        db.session.commit()
+"""
+    subprocess.run([sys.executable, 'migrate.py'], cwd=BACKEND_DIR, env=env, check=True)
+    subprocess.run([sys.executable, '-c', script], cwd=BACKEND_DIR, env=env, check=True)
+
+
+def start_server(mode, env, port, workers, threads):
+    if mode == 'prod':
+        env = dict(env, GUNICORN_BIND=f'127.0.0.1:{port}', GUNICORN_WORKERS=str(workers),
+                   GUNICORN_THREADS=str(threads), GUNICORN_ACCESS_LOG='')
+        command = [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'app:app']
+    else:
+        command = [sys.executable, '-c',
+                   f"from app import app; app.run(host='127.0.0.1', port={port}, debug=True, use_reloader=False)"]
+    process = subprocess.Popen(command, cwd=BACKEND_DIR, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            connection.request('GET', '/api/venues')
+            connection.getresponse().read()
+            return process
+        except OSError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError('Сервер не запустился')
+
+
+def run_load(port, path, concurrency, duration):
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + duration
+
+    def client():
+        local = []
+        local_errors = 0
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+        while time.perf_counter() < stop_at:
+            started = time.perf_counter()
+            try:
+                connection.request('GET', path)
+                response = connection.getresponse()
+                response.read()
+                if response.status != 200:
+                    local_errors += 1
+            except (OSError, http.client.HTTPException):
+                local_errors += 1
+                connection.close()
+                connection = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+                continue
+            local.append(time.perf_counter() - started)
+        with lock:
+            latencies.extend(local)
+            errors[0] += local_errors
+
+    started = time.perf_counter()
+    workers = [threading.Thread(target=client) for _ in range(concurrency)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+
+    def percentile(p):
+        return round(latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000, 2) if latencies else None
+
+    return {
+        'requests': len(latencies),
+        'errors': errors[0],
+        'requests_per_sec': round(len(latencies) / elapsed, 1),
+        'p50_ms': percentile(0.50),
+        'p95_ms': percentile(0.95),
+        'p99_ms': percentile(0.99),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--mode', choices=['dev', 'prod'], default='prod')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=15)
+    parser.add_argument('--events', type=int, default=500)
+    parser.add_argument('--path', default='/api/events?limit=50')
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--cache', action='store_true', help='не отключать кэш ответов')
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    if 'DATABASE_URL' not in env:
+        env['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.gettempdir(), 'quicket_bench.db')
+    if not args.cache:
+        env['RESPONSE_CACHE_SIZE'] = '0'
+
+    seed(env, args.events)
+    server = start_server(args.mode, env, args.port, args.workers, args.threads)
+    try:
+        result = run_load(args.port, args.path, args.concurrency, args.duration)
+    finally:
+        server.terminate()
+        server.wait()
+
+    result.update({
+        'mode': args.mode,
+        'workers': args.workers if args.mode == 'prod' else 1,
+        'threads': args.threads if args.mode == 'prod' else 1,
+        'concurrency': args.concurrency,
+        'path': args.path,
+        'cache': args.cache,
+    })
+    print(json.dumps(result, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
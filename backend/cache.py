@@ -0,0 +1,235 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import request, g, make_response, has_request_context
+
+from replicas import DATABASE_REPLICA_URLS, REPLICA_STICKY_SECONDS, replica_in_use
+
+
+class TagGenerations:
+    """Поколение последней инвалидации каждого тега (под блокировкой владельца).
+
+    Помнит не больше max_tags тегов: самые давно сброшенные забываются, а их
+    поколение становится нижней границей, так что ответ, начатый до этой
+    границы, по-прежнему считается устаревшим.
+    """
+
+    def __init__(self, max_tags=10000):
+        self.max_tags = max_tags
+        self._generations = OrderedDict()  # tag -> поколение последнего сброса
+        self._floor = 0
+
+    def bump(self, tags, generation):
+        for tag in tags:
+            self._generations[tag] = generation
+            self._generations.move_to_end(tag)
+        while len(self._generations) > self.max_tags:
+            _, forgotten = self._generations.popitem(last=False)
+            self._floor = max(self._floor, forgotten)
+
+    def reset(self, generation):
+        """Сброс всех тегов сразу (clear)"""
+        self._generations.clear()
+        self._floor = generation
+
+    def changed_since(self, tags, generation):
+        """Сбрасывался ли какой-то из тегов после поколения generation"""
+        if self._floor > generation:
+            return True
+        return any(self._generations.get(tag, 0) > generation for tag in tags)
+
+
+class ResponseCache:
+    """Ограниченный LRU-кэш готовых ответов с TTL и инвалидацией по тегам.
+
+    Кэш живёт в памяти процесса: запись явно сбрасывается при изменениях в
+    этом же воркере, а TTL ограничивает устаревание данных в остальных.
+    recent_window - сколько секунд помнить сброшенные теги (recently_invalidated).
+
+    Поколение растёт с каждой инвалидацией и запоминается для каждого тега:
+    ответ не сохраняется, только если во время его расчёта сбросили один из
+    его собственных тегов, поэтому бронирования одного мероприятия не мешают
+    кэшировать остальные ответы.
+    """
+
+    def __init__(self, max_entries=512, ttl=10, recent_window=0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.recent_window = recent_window
+        self._recent = OrderedDict()  # tag -> время последнего сброса
+        self._cleared_at = None
+        self._entries = OrderedDict()  # key -> (expires_at, body, etag, mimetype, tags)
+        self._tags = {}  # tag -> set(keys)
+        self._generation = 0
+        self._tag_generations = TagGenerations(max_tags=max_entries * 16)
+        self._lock = threading.Lock()
+        self._listeners = []
+        self._broadcast = None
+
+    @property
+    def generation(self):
+        return self._generation
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, body, etag, mimetype, tags, generation):
+        """Сохранение ответа, если с начала его расчёта не сбрасывали его теги"""
+        with self._lock:
+            if self._tag_generations.changed_since(tags, generation):
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl, body, etag, mimetype, tags)
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def add_invalidation_listener(self, listener):
+        """listener(tags) вызывается при каждой инвалидации - для других
+        кэшей процесса, которые сбрасываются по тем же тегам"""
+        self._listeners.append(listener)
+
+    def set_broadcast(self, broadcast):
+        """broadcast(tags) рассылает сброс другим процессам-воркерам
+        (см. cache_bus.py); принятые теги сбрасываются через invalidate_local"""
+        self._broadcast = broadcast
+
+    def defer_invalidations(self):
+        """Сбросы в текущем запросе копятся до flush_deferred(): кэш
+        сбрасывается после коммита транзакции, а не внутри неё"""
+        g.deferred_invalidations = []
+
+    def flush_deferred(self):
+        tags = g.pop('deferred_invalidations', None)
+        if tags:
+            self.invalidate(*tags)
+
+    def invalidate(self, *tags):
+        if has_request_context() and g.get('deferred_invalidations') is not None:
+            g.deferred_invalidations.extend(tags)
+            return
+        self.invalidate_local(tags)
+        if self._broadcast is not None and tags:
+            self._broadcast(tags)
+
+    def invalidate_local(self, tags):
+        """Сброс тегов только в этом процессе (в том числе принятых от других воркеров)"""
+        with self._lock:
+            self._generation += 1
+            self._tag_generations.bump(tags, self._generation)
+            for tag in tags:
+                for key in self._tags.pop(tag, ()):
+                    self._remove(key)
+            if self.recent_window > 0:
+                now = time.monotonic()
+                for tag in tags:
+                    self._recent[tag] = now
+                    self._recent.move_to_end(tag)
+                while self._recent and next(iter(self._recent.values())) < now - self.recent_window:
+                    self._recent.popitem(last=False)
+        for listener in self._listeners:
+            listener(tags)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._tag_generations.reset(self._generation)
+            self._entries.clear()
+            self._tags.clear()
+            self._cleared_at = time.monotonic()
+
+    def recently_invalidated(self, tags):
+        """Сбрасывался ли какой-то из тегов за последние recent_window секунд:
+        реплика может ещё не содержать изменений, вызвавших сброс"""
+        since = time.monotonic() - self.recent_window
+        with self._lock:
+            if self._cleared_at is not None and self._cleared_at >= since:
+                return True
+            return any(self._recent.get(tag, since - 1) >= since for tag in tags)
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[4]:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+
+response_cache = ResponseCache(
+    max_entries=int(os.getenv("RESPONSE_CACHE_SIZE", "512")),
+    ttl=float(os.getenv("RESPONSE_CACHE_TTL", "10")),
+    recent_window=REPLICA_STICKY_SECONDS if DATABASE_REPLICA_URLS else 0
+)
+
+
+def add_cache_tags(*tags):
+    """Теги, по которым будет сброшен кэшированный ответ текущего запроса"""
+    g.setdefault('cache_tags', set()).update(tags)
+
+
+def make_etag(body):
+    return hashlib.sha1(body).hexdigest()
+
+
+def _etag_response(body, etag, mimetype):
+    if request.if_none_match.contains(etag):
+        response = make_response('', 304)
+    else:
+        response = make_response(body)
+        response.mimetype = mimetype
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+def cached_response(f):
+    """Read-through кэш для анонимных GET-эндпоинтов.
+
+    Ключ - эндпоинт, аргументы пути и отсортированные параметры запроса.
+    Кэшируются только ответы 200; строгий ETag позволяет клиенту получить
+    304 без тела. Ответ, прочитанный с реплики вскоре после сброса его
+    тегов, не кэшируется: реплика могла ещё не получить изменения.
+    """
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        key = (
+            request.endpoint,
+            tuple(sorted(kwargs.items())),
+            tuple(sorted(request.args.items(multi=True)))
+        )
+        entry = response_cache.get(key)
+        if entry is not None:
+            _, body, etag, mimetype, _ = entry
+            return _etag_response(body, etag, mimetype)
+
+        generation = response_cache.generation
+        response = make_response(f(*args, **kwargs))
+        if response.status_code != 200:
+            return response
+
+        body = response.get_data()
+        etag = make_etag(body)
+        tags = frozenset(g.get('cache_tags', ()))
+        if not (replica_in_use() and response_cache.recently_invalidated(tags)):
+            response_cache.set(key, body, etag, response.mimetype, tags, generation)
+        return _etag_response(body, etag, response.mimetype)
+
+    return decorated
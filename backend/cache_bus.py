@@ -0,0 +1,102 @@
+import select
+import threading
+import time
+import uuid
+
+from sqlalchemy import text
+
+from availability import availability_snapshot
+from cache import response_cache
+from database import db
+
+# Канал PostgreSQL LISTEN/NOTIFY для сброса кэшей во всех воркерах
+PG_CHANNEL = 'quicket_cache'
+# Предел полезной нагрузки NOTIFY - 8000 байт
+PG_PAYLOAD_LIMIT = 7900
+
+# Отправитель в полезной нагрузке: свой сброс воркер уже выполнил сам.
+# После fork значение задаётся заново в ensure_cache_listener
+_origin = uuid.uuid4().hex
+_listener = None
+_listener_lock = threading.Lock()
+
+
+def _payloads(tags):
+    """Теги через запятую, разбитые по пределу NOTIFY"""
+    prefix = f'{_origin}:'
+    payload = prefix
+    for tag in tags:
+        part = f'{tag},'
+        if len(payload) + len(part) > PG_PAYLOAD_LIMIT:
+            yield payload
+            payload = prefix
+        payload += part
+    yield payload
+
+
+def broadcast_invalidation(tags):
+    """Рассылка сброса тегов другим воркерам отдельным соединением.
+
+    Вызывается после коммита изменений, поэтому воркер, получивший
+    уведомление, уже читает новые данные. Ошибка рассылки не прерывает
+    запрос: устаревший ответ в других воркерах живёт не дольше
+    RESPONSE_CACHE_TTL.
+    """
+    try:
+        if db.engine.dialect.name != 'postgresql':
+            return
+        with db.engine.begin() as conn:
+            for payload in _payloads(tags):
+                conn.execute(text('SELECT pg_notify(:channel, :payload)'),
+                             {'channel': PG_CHANNEL, 'payload': payload})
+    except Exception as e:
+        print(f"Cache invalidation broadcast failed: {e}")
+
+
+def _listen(url):
+    """Фоновый поток: LISTEN на отдельном соединении с переподключением"""
+    import psycopg2
+
+    dsn = url.set(drivername='postgresql').render_as_string(hide_password=False)
+    while True:
+        try:
+            connection = psycopg2.connect(dsn)
+            connection.autocommit = True
+            with connection.cursor() as cursor:
+                cursor.execute(f'LISTEN {PG_CHANNEL}')
+            # Пока соединения не было, сбросы других воркеров могли потеряться
+            response_cache.clear()
+            availability_snapshot.clear()
+            while True:
+                if select.select([connection], [], [], 30) == ([], [], []):
+                    continue
+                connection.poll()
+                tags = set()
+                while connection.notifies:
+                    origin, _, payload = connection.notifies.pop(0).payload.partition(':')
+                    if origin != _origin:
+                        tags.update(tag for tag in payload.split(',') if tag)
+                if tags:
+                    response_cache.invalidate_local(tuple(tags))
+        except Exception as e:
+            print(f"Cache invalidation listener error: {e}")
+            time.sleep(1)
+
+
+def ensure_cache_listener():
+    """Запуск приёма сбросов кэша в текущем процессе (после fork - заново)"""
+    global _listener, _origin
+    if _listener is not None and _listener.is_alive():
+        return
+    if db.engine.dialect.name != 'postgresql':
+        return
+    url = db.engine.url
+    with _listener_lock:
+        if _listener is not None and _listener.is_alive():
+            return
+        _origin = uuid.uuid4().hex
+        _listener = threading.Thread(target=_listen, args=(url,), name='cache-listener', daemon=True)
+        _listener.start()
+
+
+response_cache.set_broadcast(broadcast_invalidation)
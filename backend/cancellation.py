@@ -0,0 +1,137 @@
+import os
+from datetime import datetime
+
+from sqlalchemy import select, update, insert, literal, Integer, String
+
+from database import db
+from models import Booking, Notification, NotificationType
+from inventory import release_seats
+from notification_bus import notify_users
+from notification_counters import add_unread
+from seatmap import release_booking_seats
+from stats import record_status_change
+
+# Отмена с большим числом бронирований уходит в фоновую задачу
+CANCELLATION_SYNC_LIMIT = int(os.getenv("CANCELLATION_SYNC_LIMIT", "2000"))
+# Размер порции бронирований, обрабатываемой одной транзакцией задачи
+CANCELLATION_CHUNK_SIZE = int(os.getenv("CANCELLATION_CHUNK_SIZE", "1000"))
+
+
+def count_confirmed_bookings(event_id):
+    return db.session.execute(
+        select(db.func.count()).select_from(Booking).where(
+            Booking.event_id == event_id,
+            Booking.status == 'confirmed'
+        )
+    ).scalar()
+
+
+def insert_booking_notifications(condition, title, message, notification_type,
+                                 related_id=None, action_link=None):
+    """Одно уведомление на каждое бронирование, подходящее под condition.
+
+    Один INSERT ... SELECT вместо создания ORM-объектов в цикле; подписчики
+    SSE получают изменения через notify_users, счётчики непрочитанных
+    увеличиваются на число уведомлений. Возвращает id пользователей.
+    """
+    per_user = dict(db.session.execute(
+        select(Booking.user_id, db.func.count()).where(condition).group_by(Booking.user_id)
+    ).all())
+    if not per_user:
+        return set()
+    db.session.execute(
+        insert(Notification).from_select(
+            ['user_id', 'title', 'message', 'notification_type', 'related_id', 'action_link',
+             'read', 'created_at'],
+            select(
+                Booking.user_id,
+                literal(title),
+                literal(message),
+                literal(notification_type, Notification.__table__.c.notification_type.type),
+                literal(related_id, Integer),
+                literal(action_link, String),
+                literal(False),
+                literal(datetime.utcnow())
+            ).where(condition).order_by(Booking.id)
+        )
+    )
+    add_unread(db.session, per_user)
+    notify_users(db.session, per_user)
+    return set(per_user)
+
+
+def cancel_event_bookings(event_id, event_title, limit=None):
+    """Отмена подтверждённых бронирований мероприятия в текущей транзакции.
+
+    Строки бронирований блокируются, затем одним INSERT ... SELECT создаются
+    уведомления и одним UPDATE меняется статус; места возвращаются в остаток
+    и в карты секторов.
+    Параллельная отмена того же бронирования ждёт блокировку и не вернёт места
+    повторно.
+    limit - размер порции (по возрастанию id), None - все бронирования.
+    Возвращает количество отменённых бронирований.
+    """
+    query = select(Booking.id, Booking.user_id, Booking.seats, Booking.created_at).where(
+        Booking.event_id == event_id,
+        Booking.status == 'confirmed'
+    ).order_by(Booking.id).with_for_update()
+    if limit is not None:
+        query = query.limit(limit)
+    rows = db.session.execute(query).all()
+    if not rows:
+        return 0
+    booking_ids = [row.id for row in rows]
+
+    insert_booking_notifications(
+        Booking.id.in_(booking_ids),
+        title="Мероприятие отменено",
+        message=f"Мероприятие '{event_title}' было отменено. Ваше бронирование будет автоматически отменено.",
+        notification_type=NotificationType.EVENT_CANCELLED,
+        related_id=event_id
+    )
+    db.session.execute(
+        update(Booking)
+        .where(Booking.id.in_(booking_ids))
+        .values(status='cancelled')
+        .execution_options(synchronize_session=False)
+    )
+    release_seats(event_id, sum(row.seats for row in rows))
+    release_booking_seats(booking_ids)
+    record_status_change([row.created_at for row in rows], 'confirmed', 'cancelled')
+    return len(rows)
+
+
+def release_user_bookings(user_id):
+    """Возврат мест подтверждённых бронирований пользователя в остаток и
+    карты секторов перед удалением пользователя (в текущей транзакции).
+
+    Бронирования блокируются, чтобы параллельная отмена не вернула места
+    второй раз. Возвращает id мероприятий, у которых освободились места.
+    """
+    rows = db.session.execute(
+        select(Booking.id, Booking.event_id, Booking.seats).where(
+            Booking.user_id == user_id,
+            Booking.status == 'confirmed'
+        ).order_by(Booking.id).with_for_update()
+    ).all()
+    seats_by_event = {}
+    for _, event_id, seats in rows:
+        seats_by_event[event_id] = seats_by_event.get(event_id, 0) + seats
+    # Строки остатков блокируются в одном порядке во всех транзакциях
+    for event_id in sorted(seats_by_event):
+        release_seats(event_id, seats_by_event[event_id])
+    release_booking_seats([row.id for row in rows])
+    return set(seats_by_event)
+
+
+def cancellation_steps(event_id, event_title, on_chunk=None):
+    """Шаги фоновой задачи отмены (см. jobs.submit_job): по порции за коммит"""
+    def steps(job):
+        while True:
+            processed = cancel_event_bookings(event_id, event_title, limit=CANCELLATION_CHUNK_SIZE)
+            if not processed:
+                return
+            yield processed
+            if on_chunk is not None:
+                on_chunk()
+    return steps
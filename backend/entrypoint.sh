@@ -10,20 +10,18 @@ done
 echo "PostgreSQL is ready!"
 
 echo "Running database migrations..."
-python -c "
-from app import app
-from database import db
-with app.app_context():
-    try:
-        db.create_all()
-        print('Database tables created successfully!')
-    except Exception as e:
-        print(f'Error creating tables: {e}')
-"
+# Миграции Alembic и заполнение производных таблиц - один раз до запуска воркеров
+python migrate.py
 
-echo "Starting Flask application..."
-python -c "
+# SERVER_MODE=prod - gunicorn (pre-fork, см. gunicorn.conf.py), иначе - dev-сервер Flask
+# exec передаёт сигналы (SIGHUP - плавный перезапуск воркеров, SIGTERM - остановка) серверу
+if [ "${SERVER_MODE:-dev}" = "prod" ]; then
+  echo "Starting gunicorn..."
+  exec gunicorn -c gunicorn.conf.py app:app
+else
+  echo "Starting Flask development server..."
+  exec python -c "
 from app import app
-if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=True)
-"
\ No newline at end of file
+app.run(host='0.0.0.0', port=5000, debug=True)
+"
+fi
\ No newline at end of file
@@ -0,0 +1,323 @@
+import codecs
+import csv
+import json
+import os
+import re
+from datetime import datetime
+
+from sqlalchemy import select, insert
+
+from database import db
+from models import Event, EventType, EventStatus, EventMedia, EventInventory, Venue
+from search import index_events
+
+# Строк на одну транзакцию импорта
+IMPORT_CHUNK_SIZE = int(os.getenv("EVENT_IMPORT_CHUNK_SIZE", "500"))
+# Сколько ошибок строк попадает в отчёт (остальные только считаются)
+IMPORT_MAX_ERRORS = int(os.getenv("EVENT_IMPORT_MAX_ERRORS", "1000"))
+
+IMPORT_FORMATS = ('csv', 'jsonl')
+REQUIRED_FIELDS = ('title', 'type', 'date', 'time', 'total_seats', 'price')
+MEDIA_TYPES = ('image', 'video', 'audio')
+TIME_FORMAT = re.compile(r'^([01]\d|2[0-3]):[0-5]\d$')
+
+
+class ImportRowError(ValueError):
+    pass
+
+
+def _decode_lines(stream, bad_lines):
+    """Строки бинарного потока в UTF-8 по мере чтения.
+
+    Строка с неверной кодировкой декодируется с заменой символов, а её номер
+    попадает в bad_lines: она становится ошибкой строки, а не всего импорта
+    (порции до неё уже записаны).
+    """
+    for line_number, raw in enumerate(stream, start=1):
+        if line_number == 1 and raw.startswith(codecs.BOM_UTF8):
+            raw = raw[len(codecs.BOM_UTF8):]
+        try:
+            yield raw.decode('utf-8')
+        except UnicodeDecodeError:
+            bad_lines.add(line_number)
+            yield raw.decode('utf-8', errors='replace')
+
+
+def read_rows(stream, import_format):
+    """(номер строки, dict или ImportRowError) из бинарного потока по мере чтения"""
+    bad_lines = set()
+    lines = _decode_lines(stream, bad_lines)
+    if import_format == 'csv':
+        reader = csv.DictReader(lines)
+        first_line = 2
+        for data in reader:
+            # Запись CSV может занимать несколько строк файла
+            if bad_lines and any(first_line <= line <= reader.line_num for line in bad_lines):
+                data = ImportRowError('Строка не в кодировке UTF-8')
+            yield reader.line_num, data
+            first_line = reader.line_num + 1
+        return
+    for line_number, line in enumerate(lines, start=1):
+        if line_number in bad_lines:
+            yield line_number, ImportRowError('Строка не в кодировке UTF-8')
+            continue
+        if not line.strip():
+            continue
+        try:
+            data = json.loads(line)
+        except ValueError as e:
+            yield line_number, ImportRowError(f'Неверный JSON: {e}')
+            continue
+        if not isinstance(data, dict):
+            yield line_number, ImportRowError('Строка должна быть JSON-объектом')
+            continue
+        yield line_number, data
+
+
+def _text(data, field, max_length=None):
+    value = data.get(field)
+    if value is None or value == '':
+        return None
+    value = str(value).strip()
+    if max_length is not None and len(value) > max_length:
+        raise ImportRowError(f'Поле {field} длиннее {max_length} символов')
+    return value
+
+
+def _number(data, field, cast, default=None, minimum=None):
+    value = data.get(field)
+    if value is None or value == '':
+        if default is None:
+            raise ImportRowError(f'Поле {field} обязательно')
+        return default
+    try:
+        if isinstance(value, bool):
+            raise ValueError
+        number = cast(value)
+    except (TypeError, ValueError):
+        raise ImportRowError(f'Поле {field} должно быть числом')
+    if minimum is not None and number < minimum:
+        raise ImportRowError(f'Поле {field} должно быть не меньше {minimum}')
+    return number
+
+
+def _flag(value):
+    if isinstance(value, bool):
+        return value
+    return str(value or '').strip().lower() in ('1', 'true', 'yes', 'да')
+
+
+def _media(value):
+    """Медиафайлы: список объектов {type, url, description}; в CSV - JSON
+    или URL изображений через |"""
+    if value is None or value == '':
+        return []
+    if isinstance(value, str):
+        value = value.strip()
+        if value.startswith('['):
+            try:
+                value = json.loads(value)
+            except ValueError as e:
+                raise ImportRowError(f'Неверный JSON в поле media: {e}')
+        else:
+            value = [{'type': 'image', 'url': url.strip()} for url in value.split('|') if url.strip()]
+    if not isinstance(value, list):
+        raise ImportRowError('Поле media должно быть списком')
+    media = []
+    for item in value:
+        if not isinstance(item, dict) or not item.get('url'):
+            raise ImportRowError('Медиафайл должен содержать url')
+        media_type = str(item.get('type') or 'image').lower()
+        if media_type not in MEDIA_TYPES:
+            raise ImportRowError(f'Неверный тип медиафайла: {media_type}')
+        media.append({
+            'media_type': media_type,
+            'media_url': _text(item, 'url', 255),
+            'description': _text(item, 'description', 255) or ''
+        })
+    return media
+
+
+def parse_event_row(data):
+    """Проверка строки импорта: (значения events без venue_id, медиафайлы, площадка)"""
+    for field in REQUIRED_FIELDS:
+        if data.get(field) in (None, ''):
+            raise ImportRowError(f'Поле {field} обязательно')
+    try:
+        event_type = EventType[str(data['type']).strip().upper()]
+    except KeyError:
+        raise ImportRowError(f'Неверный тип мероприятия: {data["type"]}')
+    try:
+        date = datetime.strptime(str(data['date']).strip(), '%Y-%m-%d')
+    except ValueError:
+        raise ImportRowError('Дата должна быть в формате YYYY-MM-DD')
+    time = str(data['time']).strip()
+    if not TIME_FORMAT.match(time):
+        raise ImportRowError('Время должно быть в формате HH:MM')
+
+    venue_id = data.get('venue_id')
+    if venue_id not in (None, ''):
+        venue = _number(data, 'venue_id', int)
+    elif _text(data, 'venue'):
+        venue = _text(data, 'venue')
+    else:
+        raise ImportRowError('Нужно указать venue_id или venue (название площадки)')
+
+    values = {
+        'title': _text(data, 'title', 255),
+        'type': event_type,
+        'status': EventStatus.UPCOMING,
+        'date': date,
+        'time': time,
+        'duration': _number(data, 'duration', int, default=60, minimum=1),
+        'total_seats': _number(data, 'total_seats', int, minimum=1),
+        'price': _number(data, 'price', float, minimum=0),
+        'description': _text(data, 'description') or '',
+        'event_subtype': _text(data, 'event_subtype', 50),
+        'image_url': _text(data, 'image_url', 255),
+        'background_music_url': _text(data, 'background_music_url', 255),
+        'organizer': _text(data, 'organizer', 100),
+        'featured': _flag(data.get('featured')),
+        'created_at': datetime.utcnow()
+    }
+    return values, _media(data.get('media')), venue
+
+
+class VenueResolver:
+    """Площадки по id или названию; недостающие дочитываются одним запросом на порцию"""
+
+    def __init__(self):
+        self._ids = {}  # id -> существует ли
+        self._names = {}  # название -> [id]
+
+    def load(self, venues):
+        venues = set(venues)
+        ids = {venue for venue in venues if isinstance(venue, int) and venue not in self._ids}
+        names = {venue for venue in venues if isinstance(venue, str) and venue not in self._names}
+        if ids:
+            found = set(db.session.execute(select(Venue.id).where(Venue.id.in_(ids))).scalars())
+            self._ids.update({venue_id: venue_id in found for venue_id in ids})
+        if names:
+            self._names.update({name: [] for name in names})
+            for venue_id, name in db.session.execute(select(Venue.id, Venue.name).where(Venue.name.in_(names))):
+                self._names[name].append(venue_id)
+
+    def resolve(self, venue):
+        if isinstance(venue, int):
+            if not self._ids.get(venue):
+                raise ImportRowError(f'Площадка {venue} не найдена')
+            return venue
+        matches = self._names.get(venue) or []
+        if not matches:
+            raise ImportRowError(f'Площадка "{venue}" не найдена')
+        if len(matches) > 1:
+            raise ImportRowError(f'Несколько площадок с названием "{venue}", укажите venue_id')
+        return matches[0]
+
+
+class ImportReport:
+    def __init__(self):
+        self.imported = 0
+        self.failed = 0
+        self.errors = []
+        self.event_ids = []
+        self.venue_ids = set()
+
+    def error(self, line_number, message):
+        self.failed += 1
+        if len(self.errors) < IMPORT_MAX_ERRORS:
+            self.errors.append({'row': line_number, 'message': message})
+
+    def as_dict(self):
+        return {
+            'imported': self.imported,
+            'failed': self.failed,
+            # Ошибки площадок находятся при записи порции, позже ошибок разбора
+            'errors': sorted(self.errors, key=lambda error: error['row']),
+            'errors_truncated': self.failed > len(self.errors)
+        }
+
+
+def _insert_chunk(rows):
+    """Мероприятия, остатки, медиафайлы и поисковые документы порции
+    многострочными INSERT; возвращает id мероприятий в порядке rows"""
+    event_ids = list(db.session.execute(
+        insert(Event).returning(Event.id, sort_by_parameter_order=True),
+        [values for _, values, _ in rows]
+    ).scalars())
+    db.session.execute(insert(EventInventory), [
+        {'event_id': event_id, 'remaining_seats': values['total_seats']}
+        for event_id, (_, values, _) in zip(event_ids, rows)
+    ])
+    media = [
+        dict(item, event_id=event_id, created_at=values['created_at'])
+        for event_id, (_, values, items) in zip(event_ids, rows) for item in items
+    ]
+    if media:
+        db.session.execute(insert(EventMedia), media)
+    index_events(event_ids)
+    return event_ids
+
+
+def _flush_chunk(parsed, resolver, report, dry_run):
+    resolver.load(venue for _, _, _, venue in parsed)
+    rows = []
+    for line_number, values, media, venue in parsed:
+        try:
+            values['venue_id'] = resolver.resolve(venue)
+        except ImportRowError as e:
+            report.error(line_number, str(e))
+            continue
+        rows.append((line_number, values, media))
+    if not rows:
+        return
+    if dry_run:
+        report.imported += len(rows)
+        return
+    try:
+        event_ids = _insert_chunk(rows)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        for line_number, _, _ in rows:
+            report.error(line_number, f'Ошибка записи порции: {e}')
+        return
+    report.imported += len(rows)
+    report.event_ids.extend(event_ids)
+    report.venue_ids.update(values['venue_id'] for _, values, _ in rows)
+
+
+def import_events(stream, import_format, dry_run=False):
+    """Потоковый импорт мероприятий из CSV или JSON Lines.
+
+    Строки проверяются по мере чтения; корректные записываются порциями по
+    IMPORT_CHUNK_SIZE, каждая порция - отдельной транзакцией. Строки с
+    ошибками пропускаются и попадают в отчёт. dry_run - только проверка.
+    Если чтение файла прервалось, записанные порции остаются, а сбой
+    попадает в отчёт строкой, на которой он произошёл.
+    """
+    report = ImportReport()
+    resolver = VenueResolver()
+    parsed = []
+    line_number = 0
+    try:
+        for line_number, data in read_rows(stream, import_format):
+            try:
+                if isinstance(data, ImportRowError):
+                    raise data
+                values, media, venue = parse_event_row(data)
+            except ImportRowError as e:
+                report.error(line_number, str(e))
+                continue
+            parsed.append((line_number, values, media, venue))
+            if len(parsed) >= IMPORT_CHUNK_SIZE:
+                chunk, parsed = parsed, []
+                _flush_chunk(chunk, resolver, report, dry_run)
+    except Exception as e:
+        db.session.rollback()
+        report.error(line_number + 1, f'Чтение файла прервано: {e}')
+    if parsed:
+        _flush_chunk(parsed, resolver, report, dry_run)
+    if dry_run:
+        db.session.rollback()
+    return report
@@ -0,0 +1,74 @@
+# backend/gunicorn.conf.py
+# Конфигурация production-сервера (SERVER_MODE=prod в entrypoint.sh)
+import multiprocessing
+import os
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:5000")
+
+# Pre-fork: несколько процессов-воркеров, в каждом - пул потоков
+workers = int(os.getenv("GUNICORN_WORKERS", multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.getenv("GUNICORN_THREADS", "4"))
+worker_class = "gthread" if threads > 1 else "sync"
+
+# SSE-поток уведомлений занимает поток воркера на всё соединение: лимит потоков
+# на воркер выводится из threads, чтобы обычным API-запросам оставалось
+# GUNICORN_STREAM_RESERVED_THREADS потоков. Задаётся до импорта приложения
+stream_reserved_threads = int(os.getenv("GUNICORN_STREAM_RESERVED_THREADS", "2"))
+stream_limit = max(threads - stream_reserved_threads, 0)
+configured_stream_limit = os.getenv("NOTIFICATION_STREAM_MAX_CONNECTIONS")
+if configured_stream_limit is None or int(configured_stream_limit) > stream_limit:
+    if configured_stream_limit is not None:
+        print(f"NOTIFICATION_STREAM_MAX_CONNECTIONS={configured_stream_limit} leaves no threads "
+              f"for API requests with {threads} threads, using {stream_limit}")
+    os.environ["NOTIFICATION_STREAM_MAX_CONNECTIONS"] = str(stream_limit)
+
+# Приложение импортируется один раз в мастер-процессе до fork
+preload_app = os.getenv("GUNICORN_PRELOAD", "true").lower() == "true"
+
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "30"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+
+# Периодический перезапуск воркеров против утечек памяти
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "10000"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "1000"))
+
+# Пустое значение отключает журнал запросов
+accesslog = os.getenv("GUNICORN_ACCESS_LOG", "-") or None
+# Формат по умолчанию без строки запроса: в ?token= потока уведомлений передаётся JWT
+access_log_format = '%(h)s %(l)s %(u)s %(t)s "%(m)s %(U)s %(H)s" %(s)s %(b)s "%(f)s" "%(a)s"'
+errorlog = "-"
+loglevel = os.getenv("GUNICORN_LOG_LEVEL", "info")
+
+# Снимки метрик воркеров для общего GET /metrics; задаётся до импорта приложения
+os.environ.setdefault("METRICS_DIR", "/tmp/quicket-metrics")
+
+
+def on_starting(server):
+    """Снимки метрик прошлого запуска не должны попасть в новые счётчики"""
+    from metrics import metrics
+
+    metrics.reset_directory()
+
+
+def post_fork(server, worker):
+    """Соединения, открытые мастером при preload, не должны использоваться воркерами"""
+    from app import app
+    from database import db
+
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+
+
+def worker_exit(server, worker):
+    from metrics import metrics
+
+    metrics.flush()
+
+
+def child_exit(server, worker):
+    """Счётчики завершившегося воркера переносятся в архив, gauge пула - отбрасываются"""
+    from metrics import metrics
+
+    metrics.retire_worker(worker.pid)
@@ -0,0 +1,135 @@
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, update
+
+from cache import response_cache
+from database import db
+from models import SeatHold
+from inventory import release_seats
+from seatmap import release_hold_seats
+
+# Время удержания мест на оплату, в секундах
+HOLD_TTL = int(os.getenv("SEAT_HOLD_TTL", "600"))
+# Период фоновой очистки истёкших удержаний (0 - не запускать очистку в воркере)
+HOLD_SWEEP_INTERVAL = float(os.getenv("SEAT_HOLD_SWEEP_INTERVAL", "5"))
+# Число удержаний, освобождаемых одной транзакцией очистки
+HOLD_SWEEP_BATCH = int(os.getenv("SEAT_HOLD_SWEEP_BATCH", "500"))
+
+_sweeper = None
+_sweeper_lock = threading.Lock()
+
+
+def hold_expires_at():
+    return datetime.utcnow() + timedelta(seconds=HOLD_TTL)
+
+
+def claim_hold(hold_id, user_id):
+    """Перевод активного неистёкшего удержания пользователя в confirmed.
+
+    Условный UPDATE: подтверждение и очистка не могут завершить одно
+    удержание дважды. Возвращает True, если удержание подтверждено.
+    """
+    result = db.session.execute(
+        update(SeatHold)
+        .where(
+            SeatHold.id == hold_id,
+            SeatHold.user_id == user_id,
+            SeatHold.status == 'active',
+            SeatHold.expires_at > datetime.utcnow()
+        )
+        .values(status='confirmed')
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 1
+
+
+def finish_holds(condition, status):
+    """Завершение активных удержаний под condition со статусом status
+    (expired или released) и возврат их мест в остаток и карты секторов.
+
+    Возвращает id мероприятий, у которых освободились места.
+    """
+    rows = db.session.execute(
+        update(SeatHold)
+        .where(SeatHold.status == 'active', condition)
+        .values(status=status)
+        .returning(SeatHold.id, SeatHold.event_id, SeatHold.seats)
+        .execution_options(synchronize_session=False)
+    ).all()
+    seats_by_event = {}
+    for _, event_id, seats in rows:
+        seats_by_event[event_id] = seats_by_event.get(event_id, 0) + seats
+    # Строки остатков блокируются в одном порядке во всех транзакциях
+    for event_id in sorted(seats_by_event):
+        release_seats(event_id, seats_by_event[event_id])
+    release_hold_seats([row.id for row in rows])
+    return set(seats_by_event)
+
+
+def expire_holds(limit=HOLD_SWEEP_BATCH):
+    """Одна порция истёкших удержаний (в текущей транзакции).
+
+    SKIP LOCKED позволяет очистке в нескольких воркерах брать разные
+    порции. Возвращает (количество, id мероприятий).
+    """
+    expired = select(SeatHold.id).where(
+        SeatHold.status == 'active',
+        SeatHold.expires_at <= datetime.utcnow()
+    ).order_by(SeatHold.expires_at).limit(limit).with_for_update(skip_locked=True)
+    ids = list(db.session.execute(expired).scalars())
+    if not ids:
+        return 0, set()
+    return len(ids), finish_holds(SeatHold.id.in_(ids), 'expired')
+
+
+def sweep_expired_holds():
+    """Освобождение всех истёкших удержаний порциями, коммит на порцию"""
+    total = 0
+    while True:
+        count, event_ids = expire_holds()
+        db.session.commit()
+        if event_ids:
+            response_cache.invalidate(*(f'event:{event_id}' for event_id in event_ids))
+        total += count
+        if count < HOLD_SWEEP_BATCH:
+            return total
+
+
+def _sweep_forever(app):
+    while True:
+        time.sleep(HOLD_SWEEP_INTERVAL)
+        with app.app_context():
+            try:
+                sweep_expired_holds()
+            except Exception as e:
+                db.session.rollback()
+                print(f"Seat hold sweep failed: {e}")
+            finally:
+                db.session.remove()
+
+
+def ensure_hold_sweeper(app):
+    """Запуск фоновой очистки в текущем процессе (после fork - заново)"""
+    global _sweeper
+    if HOLD_SWEEP_INTERVAL <= 0 or (_sweeper is not None and _sweeper.is_alive()):
+        return
+    with _sweeper_lock:
+        if _sweeper is not None and _sweeper.is_alive():
+            return
+        _sweeper = threading.Thread(target=_sweep_forever, args=(app,), name='hold-sweeper', daemon=True)
+        _sweeper.start()
+
+
+def serialize_hold(hold):
+    return {
+        'id': hold.id,
+        'event_id': hold.event_id,
+        'seats': hold.seats,
+        'status': hold.status,
+        'booking_id': hold.booking_id,
+        'expires_at': hold.expires_at.strftime('%Y-%m-%d %H:%M:%S'),
+        'ttl': max(0, int((hold.expires_at - datetime.utcnow()).total_seconds()))
+    }
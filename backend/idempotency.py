@@ -0,0 +1,203 @@
+import hashlib
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from functools import wraps
+
+from flask import Response, current_app, g, jsonify, request
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+
+from cache import response_cache
+from database import db, single_transaction
+from models import IdempotencyKey
+from query_guard import outside_budget
+
+# Время хранения результата запроса с Idempotency-Key, в секундах
+IDEMPOTENCY_TTL = int(os.getenv("IDEMPOTENCY_TTL", "86400"))
+# Период удаления истёкших ключей (не чаще, в каждом воркере)
+IDEMPOTENCY_PURGE_INTERVAL = float(os.getenv("IDEMPOTENCY_PURGE_INTERVAL", "300"))
+IDEMPOTENCY_KEY_MAX_LENGTH = 255
+
+_last_purge = 0.0
+_purge_lock = threading.Lock()
+
+
+def request_fingerprint():
+    """Хеш метода, пути и тела: ключ нельзя переиспользовать для другого запроса"""
+    digest = hashlib.sha256()
+    digest.update(f'{request.method} {request.path}\n'.encode())
+    digest.update(request.get_data())
+    return digest.hexdigest()
+
+
+def _insert_claim(user_id, key, fingerprint):
+    """Вставка ключа в транзакции запроса; True, если ключ захвачен этим
+    запросом. Параллельная вставка того же ключа ждёт завершения транзакции."""
+    values = {
+        'user_id': user_id,
+        'key': key,
+        'fingerprint': fingerprint,
+        'status': 'pending',
+        'created_at': datetime.utcnow(),
+        'expires_at': datetime.utcnow() + timedelta(seconds=IDEMPOTENCY_TTL)
+    }
+    dialect = db.session.get_bind().dialect.name
+    if dialect in ('postgresql', 'sqlite'):
+        # Истёкший ключ перезаписывается тем же оператором
+        insert_ = postgresql.insert if dialect == 'postgresql' else sqlite.insert
+        statement = insert_(IdempotencyKey).values(values)
+        statement = statement.on_conflict_do_update(
+            index_elements=[IdempotencyKey.user_id, IdempotencyKey.key],
+            set_={
+                'fingerprint': statement.excluded.fingerprint,
+                'status': statement.excluded.status,
+                'status_code': None,
+                'content_type': None,
+                'body': None,
+                'created_at': statement.excluded.created_at,
+                'expires_at': statement.excluded.expires_at
+            },
+            where=IdempotencyKey.expires_at <= values['created_at']
+        )
+        return db.session.execute(statement).rowcount == 1
+    db.session.execute(delete(IdempotencyKey).where(
+        IdempotencyKey.user_id == user_id,
+        IdempotencyKey.key == key,
+        IdempotencyKey.expires_at <= values['created_at']
+    ))
+    try:
+        db.session.execute(insert(IdempotencyKey).values(values))
+        return True
+    except IntegrityError:
+        db.session.rollback()
+        return False
+
+
+def _load(user_id, key):
+    return db.session.execute(
+        select(
+            IdempotencyKey.fingerprint, IdempotencyKey.status, IdempotencyKey.status_code,
+            IdempotencyKey.content_type, IdempotencyKey.body
+        ).where(
+            IdempotencyKey.user_id == user_id,
+            IdempotencyKey.key == key,
+            IdempotencyKey.expires_at > datetime.utcnow()
+        )
+    ).first()
+
+
+def claim_key(user_id, key, fingerprint):
+    """Захват ключа без коммита: строка ключа, изменения обработчика и его
+    ответ фиксируются одной транзакцией, и сбой воркера откатывает их вместе.
+
+    Возвращает None, если запрос должен выполниться, иначе сохранённую
+    строку ключа. Параллельный запрос с тем же ключом ждёт на уникальном
+    ключе, пока первый не зафиксирует или не откатит свою транзакцию.
+    """
+    while True:
+        if _insert_claim(user_id, key, fingerprint):
+            return None
+
+        record = _load(user_id, key)
+        db.session.rollback()
+        # Ключ мог истечь и удалиться между вставкой и чтением
+        if record is not None:
+            return record
+
+
+def store_response(user_id, key, response):
+    """Сохранение ответа для повторов на IDEMPOTENCY_TTL и коммит всей
+    транзакции запроса; после ошибки сервера транзакция вместе с ключом
+    откатывается"""
+    if response.status_code >= 500:
+        db.session.rollback()
+        return
+    db.session.execute(update(IdempotencyKey).where(
+        IdempotencyKey.user_id == user_id, IdempotencyKey.key == key
+    ).values(
+        status='done',
+        status_code=response.status_code,
+        content_type=response.content_type,
+        body=response.get_data(as_text=True),
+        expires_at=datetime.utcnow() + timedelta(seconds=IDEMPOTENCY_TTL)
+    ))
+    db.session.commit()
+
+
+def replay(record, fingerprint):
+    if record.fingerprint != fingerprint:
+        return jsonify({
+            'success': False,
+            'message': 'Idempotency-Key уже использован для другого запроса'
+        }), 422
+    response = Response(record.body, status=record.status_code, content_type=record.content_type)
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def maybe_purge_expired():
+    """Удаление истёкших ключей (не чаще IDEMPOTENCY_PURGE_INTERVAL)"""
+    global _last_purge
+    now = time.monotonic()
+    if now - _last_purge < IDEMPOTENCY_PURGE_INTERVAL or not _purge_lock.acquire(blocking=False):
+        return
+    try:
+        _last_purge = now
+        db.session.execute(delete(IdempotencyKey).where(IdempotencyKey.expires_at <= datetime.utcnow()))
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        print(f"Idempotency key purge failed: {e}")
+    finally:
+        _purge_lock.release()
+
+
+def idempotent(f):
+    """Поддержка заголовка Idempotency-Key (после token_required/admin_required).
+
+    Первый запрос с ключом выполняется, его ответ сохраняется по
+    (пользователь, ключ) на IDEMPOTENCY_TTL секунд; повтор получает
+    сохранённый ответ, не выполняя обработчик. Параллельный повтор ждёт
+    завершения первого запроса.
+
+    Коммиты и откаты обработчика работают с точкой сохранения (см.
+    single_transaction), кэш ответов сбрасывается после общего коммита.
+    """
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        key = request.headers.get('Idempotency-Key')
+        if key is None:
+            return f(*args, **kwargs)
+        if not key or len(key) > IDEMPOTENCY_KEY_MAX_LENGTH:
+            return jsonify({
+                'success': False,
+                'message': f'Idempotency-Key должен быть от 1 до {IDEMPOTENCY_KEY_MAX_LENGTH} символов'
+            }), 400
+
+        user_id = g.user_id
+        fingerprint = request_fingerprint()
+        # Операторы ключа - служебные и не входят в бюджет запросов эндпоинта
+        with outside_budget():
+            record = claim_key(user_id, key, fingerprint)
+        if record is not None:
+            return replay(record, fingerprint)
+
+        response_cache.defer_invalidations()
+        try:
+            with single_transaction():
+                response = current_app.make_response(f(*args, **kwargs))
+            with outside_budget():
+                store_response(user_id, key, response)
+        except Exception:
+            db.session.rollback()
+            raise
+        finally:
+            response_cache.flush_deferred()
+        with outside_budget():
+            maybe_purge_expired()
+        return response
+
+    return decorated
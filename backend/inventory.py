@@ -0,0 +1,153 @@
+from sqlalchemy import select, update, insert
+
+from database import db
+from models import Event, Booking, EventInventory
+
+
+def available_seats_column():
+    """Выражение для количества свободных мест, пригодное для SELECT.
+
+    Используется вместе с outerjoin(EventInventory, ...); для мероприятий без
+    записи остатка возвращает total_seats.
+    """
+    return db.func.coalesce(EventInventory.remaining_seats, Event.total_seats)
+
+
+def create_inventory(event):
+    """Создание записи остатка для нового мероприятия (в текущей транзакции)"""
+    event.inventory = EventInventory(remaining_seats=event.total_seats)
+    return event.inventory
+
+
+def reserve_seats(event_id, seats):
+    """Атомарная проверка и резервирование мест.
+
+    Один условный UPDATE: строка блокируется до конца транзакции, поэтому
+    параллельные бронирования не могут продать больше мест, чем осталось.
+    Возвращает True, если места зарезервированы.
+    """
+    result = db.session.execute(
+        update(EventInventory)
+        .where(
+            EventInventory.event_id == event_id,
+            EventInventory.remaining_seats >= seats
+        )
+        .values(remaining_seats=EventInventory.remaining_seats - seats)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 1
+
+
+def lock_inventories(event_ids):
+    """{event_id: remaining_seats} с блокировкой строк остатков в порядке
+    event_id: параллельные пакетные бронирования не блокируют друг друга
+    взаимно"""
+    rows = db.session.execute(
+        select(EventInventory.event_id, EventInventory.remaining_seats)
+        .where(EventInventory.event_id.in_(event_ids))
+        .order_by(EventInventory.event_id)
+        .with_for_update()
+    ).all()
+    return dict(rows)
+
+
+def reserve_seats_batch(seats_by_event):
+    """Резервирование мест сразу в нескольких мероприятиях {event_id: seats}.
+
+    Один условный UPDATE ... CASE; True, если места зарезервированы во всех
+    мероприятиях (иначе транзакцию нужно откатить).
+    """
+    seats = db.case(seats_by_event, value=EventInventory.event_id)
+    result = db.session.execute(
+        update(EventInventory)
+        .where(
+            EventInventory.event_id.in_(seats_by_event),
+            EventInventory.remaining_seats >= seats
+        )
+        .values(remaining_seats=EventInventory.remaining_seats - seats)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == len(seats_by_event)
+
+
+def release_seats(event_id, seats):
+    """Возврат мест в остаток (отмена бронирования или мероприятия)"""
+    if not seats:
+        return
+    db.session.execute(
+        update(EventInventory)
+        .where(EventInventory.event_id == event_id)
+        .values(remaining_seats=EventInventory.remaining_seats + seats)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def resize_inventory(event_id, delta):
+    """Изменение остатка при смене total_seats.
+
+    Уменьшение не проходит, если уже забронировано больше мест, чем новое
+    количество. Возвращает True при успехе.
+    """
+    result = db.session.execute(
+        update(EventInventory)
+        .where(
+            EventInventory.event_id == event_id,
+            EventInventory.remaining_seats + delta >= 0
+        )
+        .values(remaining_seats=EventInventory.remaining_seats + delta)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 1
+
+
+def lock_inventory(event_id):
+    """Блокировка строки остатка до конца транзакции (SELECT ... FOR UPDATE).
+
+    Параллельные reserve_seats ждут коммита, поэтому смена статуса
+    мероприятия видна им сразу после ожидания.
+    """
+    db.session.execute(
+        select(EventInventory.event_id)
+        .where(EventInventory.event_id == event_id)
+        .with_for_update()
+    )
+
+
+def get_remaining_seats(event_id):
+    """Текущий остаток мест мероприятия"""
+    return db.session.execute(
+        select(EventInventory.remaining_seats).where(EventInventory.event_id == event_id)
+    ).scalar()
+
+
+def backfill_inventory():
+    """Заполнение остатков для мероприятий, у которых их ещё нет.
+
+    Один INSERT ... SELECT по сумме подтверждённых мест; уже существующие
+    записи не трогаются, поэтому вызов безопасно повторять.
+    """
+    booked = select(
+        Booking.event_id,
+        db.func.sum(Booking.seats).label('booked_seats')
+    ).where(
+        Booking.status == 'confirmed'
+    ).group_by(
+        Booking.event_id
+    ).subquery()
+
+    remaining = Event.total_seats - db.func.coalesce(booked.c.booked_seats, 0)
+    rows = select(
+        Event.id,
+        db.case((remaining < 0, 0), else_=remaining)
+    ).outerjoin(
+        booked, booked.c.event_id == Event.id
+    ).outerjoin(
+        EventInventory, EventInventory.event_id == Event.id
+    ).where(
+        EventInventory.event_id.is_(None)
+    )
+
+    db.session.execute(
+        insert(EventInventory).from_select(['event_id', 'remaining_seats'], rows)
+    )
+    db.session.commit()
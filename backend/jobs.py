@@ -0,0 +1,197 @@
+import os
+import secrets
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import select, update, or_
+
+from database import db
+from models import BackgroundJob
+
+# Срок аренды задачи в секундах: если воркер не продлил её порцией работы,
+# задачу подхватывает очистка в другом воркере
+BACKGROUND_JOB_LEASE = float(os.getenv("BACKGROUND_JOB_LEASE", "60"))
+# Период поиска брошенных задач (0 - не запускать поиск в воркере)
+BACKGROUND_JOB_SWEEP_INTERVAL = float(os.getenv("BACKGROUND_JOB_SWEEP_INTERVAL", "30"))
+
+JOB_KINDS = {}
+
+_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("BACKGROUND_JOB_THREADS", "2")),
+    thread_name_prefix='background-job'
+)
+_sweeper = None
+_sweeper_lock = threading.Lock()
+
+
+class LeaseLost(Exception):
+    """Аренду задачи забрал другой воркер"""
+
+
+def job_kind(kind):
+    """Регистрация шагов задачи: factory(job) -> step, чтобы задачу можно
+    было продолжить после перезапуска воркера"""
+    def decorator(factory):
+        JOB_KINDS[kind] = factory
+        return factory
+    return decorator
+
+
+def _lease_until():
+    return datetime.utcnow() + timedelta(seconds=BACKGROUND_JOB_LEASE)
+
+
+def create_job(kind, target_id=None, total=0):
+    """Создание записи задачи в текущей транзакции.
+
+    Новая задача сразу получает аренду: если воркер упадёт до submit_job,
+    её подхватит очистка после истечения срока.
+    """
+    job = BackgroundJob(kind=kind, target_id=target_id, total=total, status='pending', lease_until=_lease_until())
+    db.session.add(job)
+    return job
+
+
+def submit_job(job_id, step=None):
+    """Запуск задачи после коммита её записи.
+
+    step(job) - генератор: выполняет очередную порцию работы в текущей
+    транзакции и возвращает число обработанных элементов. Порция, прогресс и
+    продление аренды фиксируются одним коммитом, поэтому после сбоя processed
+    совпадает с реально сделанной работой. Без step шаги строит фабрика,
+    зарегистрированная через job_kind.
+    """
+    _executor.submit(_run, current_app._get_current_object(), job_id, step, False)
+
+
+def _claim(job_id, stale_only):
+    """Захват аренды условным UPDATE; токен аренды или None, если задачу уже
+    выполняет другой поток"""
+    now = datetime.utcnow()
+    expired = or_(BackgroundJob.lease_until.is_(None), BackgroundJob.lease_until <= now)
+    token = secrets.token_hex(16)
+    result = db.session.execute(
+        update(BackgroundJob)
+        .where(
+            BackgroundJob.id == job_id,
+            BackgroundJob.status.in_(('pending', 'running')),
+            expired if stale_only else or_(BackgroundJob.status == 'pending', expired)
+        )
+        .values(status='running', lease_token=token, lease_until=_lease_until())
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return token if result.rowcount == 1 else None
+
+
+def _heartbeat(job_id, token, **values):
+    """Продление аренды вместе с изменениями задачи (в текущей транзакции)"""
+    result = db.session.execute(
+        update(BackgroundJob)
+        .where(BackgroundJob.id == job_id, BackgroundJob.lease_token == token)
+        .values(**{'lease_until': _lease_until(), **values})
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount != 1:
+        raise LeaseLost(job_id)
+
+
+def _run(app, job_id, step, stale_only):
+    with app.app_context():
+        token = None
+        try:
+            token = _claim(job_id, stale_only)
+            if token is None:
+                return
+            job = db.session.get(BackgroundJob, job_id)
+            if step is None:
+                step = JOB_KINDS[job.kind](job)
+
+            for processed in step(job):
+                _heartbeat(job_id, token, processed=BackgroundJob.processed + processed)
+                db.session.commit()
+
+            _heartbeat(job_id, token, status='done', lease_until=None)
+            db.session.commit()
+        except LeaseLost:
+            db.session.rollback()
+            print(f"Background job {job_id} lease lost, another worker continues it")
+        except Exception as e:
+            db.session.rollback()
+            if token is not None:
+                db.session.execute(
+                    update(BackgroundJob)
+                    .where(BackgroundJob.id == job_id, BackgroundJob.lease_token == token)
+                    .values(status='failed', error=str(e), lease_until=None)
+                    .execution_options(synchronize_session=False)
+                )
+                db.session.commit()
+            print(f"Background job {job_id} failed: {e}")
+        finally:
+            db.session.remove()
+
+
+def resume_stale_jobs(app):
+    """Повторный запуск задач pending/running с истёкшей арендой.
+
+    Шаги задач идемпотентны (например, отмена выбирает только confirmed
+    бронирования), поэтому прерванную порцию можно выполнить заново.
+    Возвращает id отправленных задач.
+    """
+    now = datetime.utcnow()
+    job_ids = list(db.session.execute(
+        select(BackgroundJob.id).where(
+            BackgroundJob.status.in_(('pending', 'running')),
+            BackgroundJob.kind.in_(JOB_KINDS),
+            or_(BackgroundJob.lease_until.is_(None), BackgroundJob.lease_until <= now)
+        ).order_by(BackgroundJob.id)
+    ).scalars())
+    db.session.rollback()
+    for job_id in job_ids:
+        print(f"Resuming background job {job_id}")
+        _executor.submit(_run, app, job_id, None, True)
+    return job_ids
+
+
+def _sweep_forever(app):
+    # Первый проход сразу после старта воркера
+    while True:
+        with app.app_context():
+            try:
+                resume_stale_jobs(app)
+            except Exception as e:
+                db.session.rollback()
+                print(f"Background job sweep failed: {e}")
+            finally:
+                db.session.remove()
+        time.sleep(BACKGROUND_JOB_SWEEP_INTERVAL)
+
+
+def ensure_job_sweeper(app):
+    """Запуск поиска брошенных задач в текущем процессе (после fork - заново)"""
+    global _sweeper
+    if BACKGROUND_JOB_SWEEP_INTERVAL <= 0 or (_sweeper is not None and _sweeper.is_alive()):
+        return
+    with _sweeper_lock:
+        if _sweeper is not None and _sweeper.is_alive():
+            return
+        _sweeper = threading.Thread(target=_sweep_forever, args=(app,), name='job-sweeper', daemon=True)
+        _sweeper.start()
+
+
+def serialize_job(job):
+    return {
+        'id': job.id,
+        'kind': job.kind,
+        'target_id': job.target_id,
+        'status': job.status,
+        'total': job.total,
+        'processed': job.processed,
+        'progress': round(job.processed / job.total, 4) if job.total else 1.0,
+        'error': job.error,
+        'created_at': job.created_at.strftime('%Y-%m-%d %H:%M:%S'),
+        'updated_at': job.updated_at.strftime('%Y-%m-%d %H:%M:%S') if job.updated_at else None
+    }
@@ -0,0 +1,460 @@
+"""Нагрузочные сценарии Quicket: флеш-продажа, каталог, опрос уведомлений.
+
+Запуск (из каталога backend):
+
+    python loadtest.py --scenario booking --users 2000 --total-seats 500
+    python loadtest.py --scenario booking --flow hold --seat-map
+    python loadtest.py --scenario all --output run.json
+    python loadtest.py --scenario all --compare run.json
+
+Каждый запуск заполняет одноразовую базу (по умолчанию новый файл SQLite во
+временном каталоге, либо --database-url - только пустая тестовая база!),
+поднимает сервер (см. bench_serving.py) и прогоняет сценарии:
+
+  booking        - все пользователи одновременно бронируют одно мероприятие;
+                   после прогона база проверяется на перепродажу (oversell)
+                   и расхождение остатка (inventory_drift)
+  catalog        - листание каталога, карточки мероприятий и поиск
+  notifications  - много вкладок опрашивают счётчик и список уведомлений
+
+Результат каждого сценария - JSON-строка в stdout: задержки p50/p95/p99,
+пропускная способность, доля ошибок. Ответы 400/409/410 на бронирование
+(места кончились или заняты) - ожидаемый отказ, а не ошибка. --output
+сохраняет прогон целиком, --compare печатает изменения относительно
+сохранённого прогона.
+"""
+import argparse
+import http.client
+import json
+import os
+import queue
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import quote
+
+from bench_serving import BACKEND_DIR, start_server
+
+SCENARIOS = ('booking', 'catalog', 'notifications')
+# Ответы бронирования, означающие отказ по бизнес-правилам
+REJECTED_STATUSES = {400, 409, 410}
+# Мест в ряду единственного сектора при --seat-map
+SEAT_MAP_ROW = 50
+
+
+def seed_database(options, path):
+    """Заполнение пустой базы (выполняется в отдельном процессе с DATABASE_URL)"""
+    from datetime import datetime, timedelta
+    from sqlalchemy import insert
+    from app import app, hash_password, generate_jwt_token
+    from database import db
+    from models import User, Venue, Event, EventType, EventStatus, Notification, NotificationType
+    from inventory import create_inventory
+    from notification_counters import rebuild_unread_counters
+    from search import index_events
+    from seatmap import replace_sections
+    from stats import rebuild_stats
+
+    with app.app_context():
+        if Event.query.first():
+            raise SystemExit('База не пустая: нагрузочный тест нужно запускать на одноразовой базе')
+
+        password = hash_password('loadtest')
+        db.session.execute(insert(User), [
+            {'username': f'load{i}', 'email': f'load{i}@loadtest.local', 'password': password}
+            for i in range(options['users'])
+        ])
+        venue = Venue(name='Load Arena', address='Almaty', capacity=options['total_seats'])
+        db.session.add(venue)
+        db.session.flush()
+        if options['seat_map']:
+            rows = -(-options['total_seats'] // SEAT_MAP_ROW)
+            replace_sections(venue.id, [{'code': 'main', 'rows': rows, 'seats_per_row': SEAT_MAP_ROW}])
+
+        start = datetime.utcnow() + timedelta(days=1)
+        events = []
+        for i in range(options['events']):
+            event = Event(title=f'Load event {i}', type=EventType.CONCERT, status=EventStatus.UPCOMING,
+                          venue_id=venue.id, date=start + timedelta(hours=i), time='19:00',
+                          total_seats=options['total_seats'], price=1000,
+                          description=f'Нагрузочный концерт номер {i}')
+            create_inventory(event)
+            db.session.add(event)
+            events.append(event)
+        db.session.flush()
+        index_events()
+
+        users = User.query.filter(User.email.like('%@loadtest.local')).order_by(User.id).all()
+        db.session.execute(insert(Notification), [
+            {'user_id': user.id, 'title': f'Уведомление {n}', 'message': 'Нагрузочный тест',
+             'notification_type': NotificationType.SYSTEM_MESSAGE, 'read': n % 2 == 0,
+             'created_at': datetime.utcnow()}
+            for user in users for n in range(options['notifications'])
+        ])
+        db.session.commit()
+        rebuild_stats()
+        rebuild_unread_counters()
+
+        fixture = {
+            'event_id': events[0].id,
+            'event_ids': [event.id for event in events],
+            'users': [[user.id, generate_jwt_token(user.id, 'user')] for user in users],
+            'seat_rows': -(-options['total_seats'] // SEAT_MAP_ROW) if options['seat_map'] else 0,
+        }
+    with open(path, 'w') as f:
+        json.dump(fixture, f)
+
+
+def verify_database(event_id, path):
+    """Проверка инвариантов остатка после флеш-продажи"""
+    from sqlalchemy import select
+    from app import app
+    from database import db
+    from models import Event, Booking, SeatHold, BookingSeat
+    from inventory import get_remaining_seats
+
+    with app.app_context():
+        total = db.session.get(Event, event_id).total_seats
+        booked = db.session.execute(
+            select(db.func.coalesce(db.func.sum(Booking.seats), 0))
+            .where(Booking.event_id == event_id, Booking.status == 'confirmed')
+        ).scalar()
+        held = db.session.execute(
+            select(db.func.coalesce(db.func.sum(SeatHold.seats), 0))
+            .where(SeatHold.event_id == event_id, SeatHold.status == 'active')
+        ).scalar()
+        assigned = db.session.execute(
+            select(db.func.count()).select_from(BookingSeat).where(BookingSeat.event_id == event_id)
+        ).scalar()
+        remaining = get_remaining_seats(event_id)
+        result = {
+            'total_seats': total,
+            'booked_seats': int(booked),
+            'held_seats': int(held),
+            'assigned_seats': assigned,
+            'remaining_seats': remaining,
+            'oversell': max(0, int(booked) + int(held) - total),
+            'inventory_drift': total - int(booked) - int(held) - remaining,
+        }
+    with open(path, 'w') as f:
+        json.dump(result, f)
+
+
+def run_internal(env, command, payload):
+    """Вызов seed_database/verify_database в отдельном процессе с env"""
+    fd, path = tempfile.mkstemp(suffix='.json')
+    os.close(fd)
+    try:
+        subprocess.run([sys.executable, os.path.abspath(__file__), '--internal', command, json.dumps(payload), path],
+                       cwd=BACKEND_DIR, env=env, check=True)
+        with open(path) as f:
+            return json.load(f)
+    finally:
+        os.remove(path)
+
+
+class Recorder:
+    """Задержки и исходы запросов всех клиентов сценария"""
+
+    def __init__(self):
+        self.latencies = []
+        self.ok = 0
+        self.rejected = 0
+        self.errors = 0
+        self.statuses = {}
+        self._lock = threading.Lock()
+
+    def merge(self, latencies, ok, rejected, errors, statuses):
+        with self._lock:
+            self.latencies.extend(latencies)
+            self.ok += ok
+            self.rejected += rejected
+            self.errors += errors
+            for status, count in statuses.items():
+                self.statuses[status] = self.statuses.get(status, 0) + count
+
+    def report(self, elapsed):
+        latencies = sorted(self.latencies)
+        total = self.ok + self.rejected + self.errors
+
+        def percentile(p):
+            return round(latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000, 2) if latencies else None
+
+        return {
+            'requests': total,
+            'ok': self.ok,
+            'rejected': self.rejected,
+            'errors': self.errors,
+            'error_rate': round(self.errors / total, 4) if total else 0.0,
+            'requests_per_sec': round(total / elapsed, 1) if elapsed else 0.0,
+            'p50_ms': percentile(0.50),
+            'p95_ms': percentile(0.95),
+            'p99_ms': percentile(0.99),
+            'statuses': {str(status): count for status, count in sorted(self.statuses.items(), key=str)},
+            'elapsed_sec': round(elapsed, 2),
+        }
+
+
+def run_clients(port, concurrency, next_request, deadline=None, on_success=None):
+    """concurrency keep-alive клиентов выполняют запросы next_request().
+
+    next_request() -> (метод, путь, тело, заголовки, rejected) или None, когда
+    работа закончилась; rejected - статусы, считающиеся ожидаемым отказом.
+    on_success(request, body) вызывается для каждого успешного ответа.
+    """
+    recorder = Recorder()
+
+    def client():
+        latencies, statuses = [], {}
+        ok = rejected = errors = 0
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        while deadline is None or time.perf_counter() < deadline:
+            request = next_request()
+            if request is None:
+                break
+            method, path, body, headers, rejected_statuses = request
+            started = time.perf_counter()
+            try:
+                connection.request(method, path, body=json.dumps(body) if body is not None else None,
+                                   headers=dict(headers, **({'Content-Type': 'application/json'} if body else {})))
+                response = connection.getresponse()
+                data = response.read()
+            except (OSError, http.client.HTTPException):
+                errors += 1
+                statuses['transport'] = statuses.get('transport', 0) + 1
+                connection.close()
+                connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+                continue
+            latencies.append(time.perf_counter() - started)
+            statuses[response.status] = statuses.get(response.status, 0) + 1
+            if 200 <= response.status < 300 or response.status == 304:
+                ok += 1
+                if on_success is not None:
+                    on_success(request, data)
+            elif response.status in rejected_statuses:
+                rejected += 1
+            else:
+                errors += 1
+        connection.close()
+        recorder.merge(latencies, ok, rejected, errors, statuses)
+
+    started = time.perf_counter()
+    workers = [threading.Thread(target=client) for _ in range(concurrency)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return recorder.report(time.perf_counter() - started)
+
+
+def booking_scenario(port, fixture, args, env):
+    """Флеш-продажа: каждый пользователь один раз бронирует мероприятие"""
+    users = queue.Queue()
+    for user in fixture['users']:
+        users.put(user)
+    event_id = fixture['event_id']
+    rows = fixture['seat_rows']
+
+    def next_request():
+        try:
+            user_id, token = users.get_nowait()
+        except queue.Empty:
+            return None
+        seats = random.randint(1, args.max_seats)
+        body = {'event_id': event_id, 'seats': seats}
+        if rows:
+            body['seat_numbers'] = [
+                f'{index // SEAT_MAP_ROW + 1}-{index % SEAT_MAP_ROW + 1}'
+                for index in random.sample(range(rows * SEAT_MAP_ROW), seats)
+            ]
+        path = '/api/holds' if args.flow == 'hold' else '/api/bookings'
+        return 'POST', path, body, {'Authorization': f'Bearer {token}'}, REJECTED_STATUSES
+
+    if args.flow == 'hold':
+        # Удержание и его подтверждение - две операции одного покупателя
+        confirm = queue.Queue()
+
+        def next_confirm():
+            try:
+                hold_id, authorization = confirm.get_nowait()
+            except queue.Empty:
+                return None
+            return 'POST', f'/api/holds/{hold_id}/confirm', None, {'Authorization': authorization}, REJECTED_STATUSES
+
+        def on_success(request, data):
+            if request[1] == '/api/holds':
+                confirm.put((json.loads(data)['hold']['id'], request[3]['Authorization']))
+
+        hold_request = next_request
+
+        def next_request():
+            return next_confirm() or hold_request()
+
+        result = run_clients(port, args.concurrency, next_request, on_success=on_success)
+        # Подтверждения удержаний, полученных последними клиентами
+        late = run_clients(port, 1, next_confirm)
+        result['late_confirms'] = late['requests']
+    else:
+        result = run_clients(port, args.concurrency, next_request)
+
+    result.update(run_internal(env, 'verify', {'event_id': event_id}))
+    result['flow'] = args.flow
+    result['seat_map'] = bool(rows)
+    return result
+
+
+def catalog_scenario(port, fixture, args, env):
+    """Листание каталога: страницы списка, карточки, места и поиск"""
+    event_ids = fixture['event_ids']
+    paths = (
+        lambda: '/api/events?limit=50',
+        lambda: f'/api/events/{random.choice(event_ids)}',
+        lambda: f'/api/events/{random.choice(event_ids)}/seats',
+        lambda: '/api/events/search?q=' + quote(f'концерт {random.randint(0, len(event_ids) - 1)}'),
+    )
+
+    def next_request():
+        return 'GET', random.choice(paths)(), None, {}, set()
+
+    return run_clients(port, args.concurrency, next_request, time.perf_counter() + args.duration)
+
+
+def notifications_scenario(port, fixture, args, env):
+    """Вкладки пользователей опрашивают счётчик и первую страницу уведомлений"""
+    users = fixture['users']
+
+    def next_request():
+        user_id, token = random.choice(users)
+        if random.random() < 0.8:
+            path = f'/api/users/{user_id}/notifications/unread-count'
+        else:
+            path = f'/api/users/{user_id}/notifications?limit=20'
+        return 'GET', path, None, {'Authorization': f'Bearer {token}'}, set()
+
+    return run_clients(port, args.tabs, next_request, time.perf_counter() + args.duration)
+
+
+RUNNERS = {
+    'booking': booking_scenario,
+    'catalog': catalog_scenario,
+    'notifications': notifications_scenario,
+}
+
+# Метрики для --compare: (ключ, больше - лучше)
+COMPARED_METRICS = (
+    ('requests_per_sec', True),
+    ('p50_ms', False),
+    ('p95_ms', False),
+    ('p99_ms', False),
+    ('error_rate', False),
+    ('oversell', False),
+)
+
+
+def compare(baseline, runs):
+    """Изменения метрик относительно сохранённого прогона"""
+    previous = {run['scenario']: run for run in baseline.get('runs', [])}
+    changes = []
+    for run in runs:
+        old = previous.get(run['scenario'])
+        if old is None:
+            continue
+        for key, higher_is_better in COMPARED_METRICS:
+            if run.get(key) is None or old.get(key) is None:
+                continue
+            delta = run[key] - old[key]
+            change = {'scenario': run['scenario'], 'metric': key, 'before': old[key], 'after': run[key]}
+            if old[key]:
+                change['change_pct'] = round(delta / old[key] * 100, 1)
+            change['regression'] = delta < 0 if higher_is_better else delta > 0
+            changes.append(change)
+    return changes
+
+
+def main():
+    if len(sys.argv) == 5 and sys.argv[1] == '--internal':
+        payload = json.loads(sys.argv[3])
+        if sys.argv[2] == 'seed':
+            seed_database(payload, sys.argv[4])
+        else:
+            verify_database(payload['event_id'], sys.argv[4])
+        return
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scenario', choices=SCENARIOS + ('all',), default='all')
+    parser.add_argument('--mode', choices=['dev', 'prod'], default='prod')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--users', type=int, default=2000, help='покупателей во флеш-продаже')
+    parser.add_argument('--total-seats', type=int, default=500, help='мест на мероприятии')
+    parser.add_argument('--max-seats', type=int, default=2, help='максимум мест в одном бронировании')
+    parser.add_argument('--flow', choices=['direct', 'hold'], default='direct',
+                        help='бронирование сразу или удержание с подтверждением')
+    parser.add_argument('--seat-map', action='store_true', help='бронировать конкретные места')
+    parser.add_argument('--events', type=int, default=200, help='мероприятий в каталоге')
+    parser.add_argument('--notifications', type=int, default=20, help='уведомлений на пользователя')
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--tabs', type=int, default=128, help='вкладок в сценарии уведомлений')
+    parser.add_argument('--duration', type=float, default=15, help='длительность сценариев каталога и уведомлений')
+    parser.add_argument('--port', type=int, default=5056)
+    parser.add_argument('--database-url', help='одноразовая база; по умолчанию новый файл SQLite')
+    parser.add_argument('--no-cache', action='store_true', help='отключить кэш ответов')
+    parser.add_argument('--seed', type=int, default=1, help='seed генератора случайных чисел')
+    parser.add_argument('--output', help='файл для сохранения прогона (JSON)')
+    parser.add_argument('--compare', help='сохранённый прогон для сравнения')
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    env = dict(os.environ, SEAT_HOLD_SWEEP_INTERVAL=os.environ.get('SEAT_HOLD_SWEEP_INTERVAL', '1'))
+    if args.database_url:
+        env['DATABASE_URL'] = args.database_url
+    else:
+        path = os.path.join(tempfile.gettempdir(), f'quicket_loadtest_{os.getpid()}.db')
+        if os.path.exists(path):
+            os.remove(path)
+        env['DATABASE_URL'] = 'sqlite:///' + path
+    if args.no_cache:
+        env['RESPONSE_CACHE_SIZE'] = '0'
+
+    subprocess.run([sys.executable, 'migrate.py'], cwd=BACKEND_DIR, env=env, check=True,
+                   stdout=subprocess.DEVNULL)
+    fixture = run_internal(env, 'seed', {
+        'users': args.users,
+        'total_seats': args.total_seats,
+        'seat_map': args.seat_map,
+        'events': max(1, args.events),
+        'notifications': args.notifications,
+    })
+
+    scenarios = SCENARIOS if args.scenario == 'all' else (args.scenario,)
+    server = start_server(args.mode, env, args.port, args.workers, args.threads)
+    runs = []
+    try:
+        for scenario in scenarios:
+            result = {'scenario': scenario}
+            result.update(RUNNERS[scenario](args.port, fixture, args, env))
+            runs.append(result)
+            print(json.dumps(result, ensure_ascii=False), flush=True)
+    finally:
+        server.terminate()
+        server.wait()
+
+    config = {key: value for key, value in vars(args).items() if key not in ('output', 'compare', 'database_url')}
+    config['database'] = env['DATABASE_URL'].split(':', 1)[0]
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'config': config, 'runs': runs}, f, ensure_ascii=False, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            for change in compare(json.load(f), runs):
+                print(json.dumps(change, ensure_ascii=False))
+
+    if any(run.get('oversell') or run.get('inventory_drift') for run in runs):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,301 @@
+import json
+import os
+import threading
+import time
+
+from flask import g, request, has_request_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import Pool
+
+# Границы гистограмм (секунды и число SQL-операторов на запрос)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+# name -> (тип, описание); порядок определяет порядок вывода
+METRICS = {
+    'quicket_http_requests_total': ('counter', 'HTTP-запросы по эндпоинту, методу и статусу'),
+    'quicket_http_request_duration_seconds': ('histogram', 'Время обработки запроса'),
+    'quicket_db_statements_per_request': ('histogram', 'SQL-операторов на один запрос'),
+    'quicket_db_statements_total': ('counter', 'Выполненные SQL-операторы'),
+    'quicket_db_statement_seconds_total': ('counter', 'Суммарное время SQL-операторов'),
+    'quicket_db_pool_checkouts_total': ('counter', 'Выдачи соединений из пула'),
+    'quicket_db_pool_size': ('gauge', 'Постоянный размер пула соединений'),
+    'quicket_db_pool_checked_out': ('gauge', 'Соединения, выданные из пула'),
+    'quicket_db_pool_overflow': ('gauge', 'Соединения сверх размера пула'),
+    'quicket_db_pool_checked_in': ('gauge', 'Свободные соединения в пуле'),
+}
+
+ARCHIVE_FILE = 'archive.json'
+
+
+def _key(name, labels):
+    return json.dumps([name, sorted(labels.items())], ensure_ascii=False)
+
+
+class MetricsRegistry:
+    """Счётчики, гистограммы и gauge процесса с выводом в формате Prometheus.
+
+    Без directory метрики живут только в памяти процесса. С directory
+    каждый воркер раз в flush_interval секунд (и при запросе /metrics)
+    сохраняет снимок в <pid>.json, а collect() складывает снимки всех
+    воркеров; счётчики завершившихся воркеров переносятся в archive.json
+    (retire_worker), gauge - отбрасываются.
+    """
+
+    def __init__(self, directory=None, flush_interval=5):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self._counters = {}  # key -> value
+        self._histograms = {}  # key -> [counts по границам..., sum, count]
+        self._gauge_callbacks = []
+        self._lock = threading.Lock()
+        self._flusher = None
+        self._flusher_pid = None
+
+    def inc(self, name, labels, value=1):
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, labels, value, buckets):
+        key = _key(name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [0] * (len(buckets) + 2)
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    histogram[i] += 1
+                    break
+            histogram[-2] += value
+            histogram[-1] += 1
+
+    def add_gauge_callback(self, callback):
+        """callback() -> {(name, labels tuple): value}, вызывается при снимке"""
+        self._gauge_callbacks.append(callback)
+
+    def snapshot(self):
+        gauges = {}
+        for callback in self._gauge_callbacks:
+            try:
+                for (name, labels), value in callback().items():
+                    gauges[_key(name, dict(labels))] = value
+            except Exception as e:
+                print(f"Metrics gauge callback failed: {e}")
+        with self._lock:
+            return {
+                'counters': dict(self._counters),
+                'histograms': {key: list(values) for key, values in self._histograms.items()},
+                'gauges': gauges,
+            }
+
+    def flush(self):
+        """Сохранение снимка процесса для остальных воркеров"""
+        if not self.directory:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f'{os.getpid()}.json')
+        _write_json(path, self.snapshot())
+
+    def ensure_flusher(self):
+        """Фоновое сохранение снимков в текущем процессе (после fork - заново)"""
+        if not self.directory or self._flusher_pid == os.getpid():
+            return
+        with self._lock:
+            if self._flusher_pid == os.getpid():
+                return
+            self._flusher_pid = os.getpid()
+            self._flusher = threading.Thread(target=self._flush_forever, name='metrics-flusher', daemon=True)
+            self._flusher.start()
+
+    def _flush_forever(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except OSError as e:
+                print(f"Metrics flush failed: {e}")
+
+    def collect(self):
+        """Сумма снимков всех воркеров (или только текущего процесса)"""
+        if not self.directory:
+            return self.snapshot()
+        self.flush()
+        merged = {'counters': {}, 'histograms': {}, 'gauges': {}}
+        for name in sorted(os.listdir(self.directory)):
+            if not name.endswith('.json'):
+                continue
+            snapshot = _read_json(os.path.join(self.directory, name))
+            if snapshot is not None:
+                _merge(merged, snapshot)
+        return merged
+
+    def retire_worker(self, pid):
+        """Перенос счётчиков завершившегося воркера в архив (из мастер-процесса)"""
+        if not self.directory:
+            return
+        path = os.path.join(self.directory, f'{pid}.json')
+        snapshot = _read_json(path)
+        if snapshot is None:
+            return
+        archive_path = os.path.join(self.directory, ARCHIVE_FILE)
+        archive = _read_json(archive_path) or {'counters': {}, 'histograms': {}, 'gauges': {}}
+        snapshot['gauges'] = {}
+        _merge(archive, snapshot)
+        _write_json(archive_path, archive)
+        os.remove(path)
+
+    def reset_directory(self):
+        """Очистка снимков прошлого запуска (из мастер-процесса при старте)"""
+        if not self.directory or not os.path.isdir(self.directory):
+            return
+        for name in os.listdir(self.directory):
+            if name.endswith('.json'):
+                os.remove(os.path.join(self.directory, name))
+
+    def render(self):
+        """Текстовый формат Prometheus 0.0.4"""
+        data = self.collect()
+        series = {}
+        for section in ('counters', 'histograms', 'gauges'):
+            for key, value in data[section].items():
+                name, labels = json.loads(key)
+                series.setdefault(name, []).append((labels, value))
+
+        lines = []
+        for name, (metric_type, description) in METRICS.items():
+            if name not in series:
+                continue
+            lines.append(f'# HELP {name} {description}')
+            lines.append(f'# TYPE {name} {metric_type}')
+            for labels, value in sorted(series[name], key=lambda item: item[0]):
+                if metric_type == 'histogram':
+                    buckets = LATENCY_BUCKETS if name.endswith('_seconds') else STATEMENT_BUCKETS
+                    cumulative = 0
+                    for bound, count in zip(buckets, value):
+                        cumulative += count
+                        lines.append(f'{name}_bucket{_labels(labels, le=_number(bound))} {cumulative}')
+                    lines.append(f'{name}_bucket{_labels(labels, le="+Inf")} {value[-1]}')
+                    lines.append(f'{name}_sum{_labels(labels)} {_number(value[-2])}')
+                    lines.append(f'{name}_count{_labels(labels)} {value[-1]}')
+                else:
+                    lines.append(f'{name}{_labels(labels)} {_number(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+def _merge(target, snapshot):
+    for key, value in snapshot.get('counters', {}).items():
+        target['counters'][key] = target['counters'].get(key, 0) + value
+    for key, values in snapshot.get('histograms', {}).items():
+        current = target['histograms'].get(key)
+        target['histograms'][key] = values if current is None else [a + b for a, b in zip(current, values)]
+    for key, value in snapshot.get('gauges', {}).items():
+        target['gauges'][key] = target['gauges'].get(key, 0) + value
+
+
+def _labels(labels, **extra):
+    pairs = list(labels) + list(extra.items())
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _read_json(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_json(path, data):
+    # Запись во временный файл и атомарная замена: читатели не видят половину снимка
+    tmp_path = f'{path}.{threading.get_ident()}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+metrics = MetricsRegistry(
+    directory=os.getenv("METRICS_DIR") or None,
+    flush_interval=float(os.getenv("METRICS_FLUSH_INTERVAL", "5"))
+)
+
+
+def _endpoint():
+    if not has_request_context():
+        return 'background'
+    return request.endpoint or 'unmatched'
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('metrics_started', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get('metrics_started')
+    if not started:
+        return
+    elapsed = time.perf_counter() - started.pop()
+    if has_request_context():
+        g.metrics_statements = g.get('metrics_statements', 0) + 1
+        g.metrics_db_time = g.get('metrics_db_time', 0.0) + elapsed
+    else:
+        labels = {'endpoint': 'background'}
+        metrics.inc('quicket_db_statements_total', labels)
+        metrics.inc('quicket_db_statement_seconds_total', labels, elapsed)
+
+
+@event.listens_for(Pool, 'checkout')
+def _pool_checkout(dbapi_connection, connection_record, connection_proxy):
+    metrics.inc('quicket_db_pool_checkouts_total', {})
+
+
+def init_metrics(app, db):
+    """Хуки запросов и gauge пула соединений приложения"""
+
+    @app.before_request
+    def start_request_metrics():
+        metrics.ensure_flusher()
+        g.metrics_started = time.perf_counter()
+
+    @app.after_request
+    def record_request_metrics(response):
+        started = g.pop('metrics_started', None)
+        if started is None:
+            return response
+        endpoint = _endpoint()
+        statements = g.pop('metrics_statements', 0)
+        labels = {'endpoint': endpoint}
+        metrics.inc('quicket_http_requests_total',
+                    {'endpoint': endpoint, 'method': request.method, 'status': response.status_code})
+        metrics.observe('quicket_http_request_duration_seconds', {'endpoint': endpoint, 'method': request.method},
+                        time.perf_counter() - started, LATENCY_BUCKETS)
+        metrics.observe('quicket_db_statements_per_request', labels, statements, STATEMENT_BUCKETS)
+        if statements:
+            metrics.inc('quicket_db_statements_total', labels, statements)
+            metrics.inc('quicket_db_statement_seconds_total', labels, g.pop('metrics_db_time', 0.0))
+        return response
+
+    def pool_gauges():
+        with app.app_context():
+            pool = db.engine.pool
+        gauges = {}
+        for name, method in (('quicket_db_pool_size', 'size'), ('quicket_db_pool_checked_out', 'checkedout'),
+                             ('quicket_db_pool_overflow', 'overflow'), ('quicket_db_pool_checked_in', 'checkedin')):
+            if hasattr(pool, method):
+                gauges[(name, ())] = getattr(pool, method)()
+        return gauges
+
+    metrics.add_gauge_callback(pool_gauges)
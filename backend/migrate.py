@@ -0,0 +1,41 @@
+"""Одноразовый шаг миграции базы перед запуском сервера.
+
+Применяет миграции Alembic (alembic upgrade head) и заполняет производные
+данные, которых ещё нет: остатки мест, поисковый индекс, агрегаты
+статистики и счётчики непрочитанных уведомлений. Сам сервер схему не
+трогает.
+
+    python migrate.py
+"""
+import os
+
+from alembic import command
+from alembic.config import Config
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def upgrade():
+    config = Config(os.path.join(BACKEND_DIR, 'alembic.ini'))
+    config.set_main_option('script_location', os.path.join(BACKEND_DIR, 'migrations'))
+    command.upgrade(config, 'head')
+
+
+def backfill():
+    from app import app
+    from inventory import backfill_inventory
+    from search import backfill_search_index
+    from stats import backfill_stats
+    from notification_counters import backfill_unread_counters
+
+    with app.app_context():
+        backfill_inventory()
+        backfill_search_index()
+        backfill_stats()
+        backfill_unread_counters()
+
+
+if __name__ == '__main__':
+    upgrade()
+    backfill()
+    print('Database migrated')
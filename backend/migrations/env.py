@@ -11,13 +11,15 @@ from dotenv import load_dotenv
 
 # Импортируем модели
 from models import db
+from database import DATABASE_URL
 
 # Загружаем переменные окружения из .env файла
 load_dotenv()
 
 # Alembic Config
 config = context.config
-config.set_main_option("sqlalchemy.url", os.getenv("DATABASE_URL"))
+# % в пароле экранируется для configparser
+config.set_main_option("sqlalchemy.url", DATABASE_URL.replace("%", "%%"))
 
 # Настройка логгирования
 if config.config_file_name is not None:
@@ -0,0 +1,120 @@
+"""Исходная схема: пользователи, площадки, мероприятия, бронирования, уведомления
+
+Базы, созданные раньше через db.create_all(), уже содержат эти таблицы,
+поэтому создаются только отсутствующие.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17 10:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if 'users' not in existing:
+        op.create_table(
+            'users',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('username', sa.String(100), nullable=False, unique=True),
+            sa.Column('email', sa.String(100), nullable=False, unique=True),
+            sa.Column('password', sa.String(256), nullable=False),
+            sa.Column('role', sa.Enum('user', 'admin', name='userrole'), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+        )
+
+    if 'venues' not in existing:
+        op.create_table(
+            'venues',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('name', sa.String(100), nullable=False),
+            sa.Column('address', sa.String(255), nullable=False),
+            sa.Column('description', sa.Text(), nullable=True),
+            sa.Column('capacity', sa.Integer(), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.Column('latitude', sa.Float(), nullable=True),
+            sa.Column('longitude', sa.Float(), nullable=True),
+            sa.Column('map_widget_code', sa.Text(), nullable=True),
+        )
+    elif 'map_widget_code' not in {c['name'] for c in sa.inspect(op.get_bind()).get_columns('venues')}:
+        op.add_column('venues', sa.Column('map_widget_code', sa.Text(), nullable=True))
+
+    if 'events' not in existing:
+        op.create_table(
+            'events',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('title', sa.String(255), nullable=False),
+            sa.Column('type', sa.Enum('SPORT', 'CONCERT', 'THEATER', 'EXHIBITION', 'WORKSHOP', 'OTHER',
+                                      name='eventtype'), nullable=False),
+            sa.Column('status', sa.Enum('UPCOMING', 'ONGOING', 'FINISHED', 'CANCELLED',
+                                        name='eventstatus'), nullable=True),
+            sa.Column('venue_id', sa.Integer(), sa.ForeignKey('venues.id'), nullable=False),
+            sa.Column('date', sa.DateTime(), nullable=False),
+            sa.Column('time', sa.String(5), nullable=False),
+            sa.Column('duration', sa.Integer(), nullable=True),
+            sa.Column('total_seats', sa.Integer(), nullable=False),
+            sa.Column('price', sa.Float(), nullable=False),
+            sa.Column('description', sa.Text(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.Column('event_subtype', sa.String(50), nullable=True),
+            sa.Column('image_url', sa.String(255), nullable=True),
+            sa.Column('background_music_url', sa.String(255), nullable=True),
+            sa.Column('organizer', sa.String(100), nullable=True),
+            sa.Column('featured', sa.Boolean(), nullable=True),
+        )
+
+    if 'event_media' not in existing:
+        op.create_table(
+            'event_media',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('event_id', sa.Integer(), sa.ForeignKey('events.id'), nullable=True),
+            sa.Column('media_type', sa.String(50), nullable=False),
+            sa.Column('media_url', sa.String(255), nullable=False),
+            sa.Column('description', sa.String(255), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+        )
+
+    if 'bookings' not in existing:
+        op.create_table(
+            'bookings',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=False),
+            sa.Column('event_id', sa.Integer(), sa.ForeignKey('events.id'), nullable=False),
+            sa.Column('seats', sa.Integer(), nullable=False),
+            sa.Column('status', sa.String(20), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+        )
+
+    if 'notifications' not in existing:
+        op.create_table(
+            'notifications',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=False),
+            sa.Column('title', sa.String(255), nullable=False),
+            sa.Column('message', sa.Text(), nullable=False),
+            sa.Column('notification_type', sa.Enum('BOOKING_CREATED', 'BOOKING_CANCELLED', 'BOOKING_REMINDER',
+                                                   'EVENT_UPDATED', 'EVENT_CANCELLED', 'SYSTEM_MESSAGE',
+                                                   name='notificationtype'), nullable=False),
+            sa.Column('read', sa.Boolean(), nullable=True),
+            sa.Column('action_link', sa.String(255), nullable=True),
+            sa.Column('related_id', sa.Integer(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+        )
+
+
+def downgrade() -> None:
+    for table in ('notifications', 'bookings', 'event_media', 'events', 'venues', 'users'):
+        op.drop_table(table)
+    if op.get_bind().dialect.name == 'postgresql':
+        for enum in ('notificationtype', 'eventstatus', 'eventtype', 'userrole'):
+            sa.Enum(name=enum).drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,108 @@
+"""Производные таблицы: остатки мест, поиск, отзыв токенов, фоновые задачи, статистика
+
+Таблицы новые и пустые, поэтому их индексы создаются сразу; заполняет
+их шаг migrate.py после миграций.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17 10:05:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if 'event_inventory' not in existing:
+        op.create_table(
+            'event_inventory',
+            sa.Column('event_id', sa.Integer(), sa.ForeignKey('events.id', ondelete='CASCADE'), primary_key=True),
+            sa.Column('remaining_seats', sa.Integer(), nullable=False),
+            sa.Column('updated_at', sa.DateTime(), nullable=True),
+            sa.CheckConstraint('remaining_seats >= 0', name='remaining_seats_non_negative'),
+        )
+
+    if 'event_search' not in existing:
+        op.create_table(
+            'event_search',
+            sa.Column('event_id', sa.Integer(), sa.ForeignKey('events.id', ondelete='CASCADE'), primary_key=True),
+            sa.Column('title_text', sa.Text(), nullable=False),
+            sa.Column('meta_text', sa.Text(), nullable=False),
+            sa.Column('body_text', sa.Text(), nullable=False),
+            sa.Column('search_vector', sa.Text().with_variant(postgresql.TSVECTOR(), 'postgresql'), nullable=True),
+            sa.Column('updated_at', sa.DateTime(), nullable=True),
+        )
+    if op.get_bind().dialect.name == 'postgresql':
+        op.create_index('ix_event_search_vector', 'event_search', ['search_vector'],
+                        postgresql_using='gin', if_not_exists=True)
+
+    if 'token_revocations' not in existing:
+        op.create_table(
+            'token_revocations',
+            sa.Column('user_id', sa.Integer(), primary_key=True),
+            sa.Column('revoked_at', sa.DateTime(), nullable=False),
+        )
+    op.create_index('ix_token_revocations_revoked_at', 'token_revocations', ['revoked_at'], if_not_exists=True)
+
+    if 'notification_counters' not in existing:
+        op.create_table(
+            'notification_counters',
+            sa.Column('user_id', sa.Integer(), primary_key=True),
+            sa.Column('unread_count', sa.Integer(), nullable=False),
+        )
+
+    if 'booking_daily_stats' not in existing:
+        op.create_table(
+            'booking_daily_stats',
+            sa.Column('day', sa.Date(), primary_key=True),
+            sa.Column('status', sa.String(20), primary_key=True),
+            sa.Column('shard', sa.Integer(), primary_key=True),
+            sa.Column('count', sa.Integer(), nullable=False),
+        )
+
+    for table, key in (('event_booking_stats', 'event_id'), ('user_booking_stats', 'user_id')):
+        if table not in existing:
+            op.create_table(
+                table,
+                sa.Column(key, sa.Integer(), primary_key=True),
+                sa.Column('bookings_count', sa.Integer(), nullable=False),
+            )
+        op.create_index(f'ix_{table}_bookings_count', table, ['bookings_count'], if_not_exists=True)
+
+    if 'monthly_signup_stats' not in existing:
+        op.create_table(
+            'monthly_signup_stats',
+            sa.Column('month', sa.String(7), primary_key=True),
+            sa.Column('count', sa.Integer(), nullable=False),
+        )
+
+    if 'background_jobs' not in existing:
+        op.create_table(
+            'background_jobs',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('kind', sa.String(50), nullable=False),
+            sa.Column('target_id', sa.Integer(), nullable=True),
+            sa.Column('status', sa.String(20), nullable=False),
+            sa.Column('total', sa.Integer(), nullable=False),
+            sa.Column('processed', sa.Integer(), nullable=False),
+            sa.Column('error', sa.Text(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.Column('updated_at', sa.DateTime(), nullable=True),
+        )
+
+
+def downgrade() -> None:
+    for table in ('background_jobs', 'monthly_signup_stats', 'user_booking_stats', 'event_booking_stats',
+                  'booking_daily_stats', 'notification_counters', 'token_revocations', 'event_search',
+                  'event_inventory'):
+        op.drop_table(table)
@@ -0,0 +1,46 @@
+"""Индексы горячих запросов на существующих таблицах
+
+На PostgreSQL индексы строятся CONCURRENTLY вне транзакции, чтобы не
+блокировать запись в bookings, events и notifications. Если построение
+прервалось, невалидный индекс нужно удалить (DROP INDEX CONCURRENTLY) и
+повторить миграцию.
+
+events.date и notifications.user_id покрываются ведущими столбцами
+составных индексов, bookings.status - индексом (event_id, status).
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17 10:10:00
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+INDEXES = (
+    ('ix_bookings_event_id_status', 'bookings', ['event_id', 'status']),
+    ('ix_bookings_user_id', 'bookings', ['user_id']),
+    ('ix_events_venue_id', 'events', ['venue_id']),
+    ('ix_events_date_time_id', 'events', ['date', 'time', 'id']),
+    ('ix_notifications_created_at_id', 'notifications', ['created_at', 'id']),
+    ('ix_notifications_user_created_at_id', 'notifications', ['user_id', 'created_at', 'id']),
+    ('ix_notifications_user_read_created_at_id', 'notifications', ['user_id', 'read', 'created_at', 'id']),
+)
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, if_not_exists=True, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
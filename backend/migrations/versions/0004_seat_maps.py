@@ -0,0 +1,58 @@
+"""Схемы секторов площадок и битовые карты занятости мест
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17 11:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'venue_sections',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('venue_id', sa.Integer(), sa.ForeignKey('venues.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('code', sa.String(20), nullable=False),
+        sa.Column('name', sa.String(100), nullable=True),
+        sa.Column('rows', sa.Integer(), nullable=False),
+        sa.Column('seats_per_row', sa.Integer(), nullable=False),
+        sa.Column('position', sa.Integer(), nullable=False),
+        sa.UniqueConstraint('venue_id', 'code'),
+        sa.CheckConstraint('rows > 0 AND seats_per_row > 0', name='section_size_positive'),
+    )
+
+    op.create_table(
+        'event_seat_maps',
+        sa.Column('event_id', sa.Integer(), sa.ForeignKey('events.id', ondelete='CASCADE'), primary_key=True),
+        sa.Column('section_id', sa.Integer(), sa.ForeignKey('venue_sections.id', ondelete='CASCADE'),
+                  primary_key=True),
+        sa.Column('taken', sa.LargeBinary(), nullable=False),
+        sa.Column('free_seats', sa.Integer(), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+    )
+
+    op.create_table(
+        'booking_seats',
+        sa.Column('event_id', sa.Integer(), sa.ForeignKey('events.id', ondelete='CASCADE'), primary_key=True),
+        sa.Column('section_id', sa.Integer(), sa.ForeignKey('venue_sections.id', ondelete='CASCADE'),
+                  primary_key=True),
+        sa.Column('seat_index', sa.Integer(), primary_key=True),
+        sa.Column('booking_id', sa.Integer(), sa.ForeignKey('bookings.id', ondelete='CASCADE'), nullable=False),
+    )
+    op.create_index('ix_booking_seats_booking_id', 'booking_seats', ['booking_id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_booking_seats_booking_id', table_name='booking_seats')
+    op.drop_table('booking_seats')
+    op.drop_table('event_seat_maps')
+    op.drop_table('venue_sections')
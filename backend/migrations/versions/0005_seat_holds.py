@@ -0,0 +1,52 @@
+"""Удержания мест на время оплаты
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17 11:30:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'seat_holds',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('event_id', sa.Integer(), sa.ForeignKey('events.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('seats', sa.Integer(), nullable=False),
+        sa.Column('status', sa.String(20), nullable=False),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.Column('booking_id', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+    )
+    op.create_index('ix_seat_holds_status_expires_at', 'seat_holds', ['status', 'expires_at'])
+    op.create_index('ix_seat_holds_user_id', 'seat_holds', ['user_id'])
+
+    # batch - для SQLite, где ALTER COLUMN пересоздаёт таблицу
+    with op.batch_alter_table('booking_seats') as batch:
+        batch.alter_column('booking_id', existing_type=sa.Integer(), nullable=True)
+        batch.add_column(sa.Column('hold_id', sa.Integer(), nullable=True))
+        batch.create_foreign_key('fk_booking_seats_hold_id_seat_holds', 'seat_holds', ['hold_id'], ['id'],
+                                 ondelete='CASCADE')
+        batch.create_index('ix_booking_seats_hold_id', ['hold_id'])
+
+
+def downgrade() -> None:
+    op.execute('DELETE FROM booking_seats WHERE booking_id IS NULL')
+    with op.batch_alter_table('booking_seats') as batch:
+        batch.drop_index('ix_booking_seats_hold_id')
+        batch.drop_constraint('fk_booking_seats_hold_id_seat_holds', type_='foreignkey')
+        batch.drop_column('hold_id')
+        batch.alter_column('booking_id', existing_type=sa.Integer(), nullable=False)
+    op.drop_index('ix_seat_holds_user_id', table_name='seat_holds')
+    op.drop_index('ix_seat_holds_status_expires_at', table_name='seat_holds')
+    op.drop_table('seat_holds')
@@ -0,0 +1,28 @@
+"""Аренда фоновых задач для возобновления после перезапуска воркера
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-17 18:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0008'
+down_revision = '0007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('background_jobs', sa.Column('lease_token', sa.String(32), nullable=True))
+    op.add_column('background_jobs', sa.Column('lease_until', sa.DateTime(), nullable=True))
+    op.create_index('ix_background_jobs_status_lease_until', 'background_jobs', ['status', 'lease_until'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_background_jobs_status_lease_until', table_name='background_jobs')
+    op.drop_column('background_jobs', 'lease_until')
+    op.drop_column('background_jobs', 'lease_token')
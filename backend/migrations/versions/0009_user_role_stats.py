@@ -0,0 +1,30 @@
+"""Агрегат количества пользователей по ролям
+
+Таблица новая и пустая; заполняет её шаг migrate.py после миграций.
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-17 19:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0009'
+down_revision = '0008'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'user_role_stats',
+        sa.Column('role', sa.String(20), primary_key=True),
+        sa.Column('count', sa.Integer(), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('user_role_stats')
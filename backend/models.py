@@ -1,7 +1,9 @@
 from datetime import datetime
 from database import db
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Text, Boolean, Enum
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, ForeignKey, Text, Boolean, Enum, CheckConstraint, Index
+from sqlalchemy import LargeBinary, UniqueConstraint, JSON
 from sqlalchemy.orm import relationship
+from sqlalchemy.dialects.postgresql import TSVECTOR
 import enum
 
 class UserRole(enum.Enum):
@@ -39,6 +41,16 @@ class User(db.Model):
     def __repr__(self):
         return f"<User {self.username}>"
 
+class TokenRevocation(db.Model):
+    """Момент, до которого выданные пользователю JWT считаются отозванными"""
+    __tablename__ = 'token_revocations'
+    
+    user_id = Column(Integer, primary_key=True)  # без FK: запись переживает удаление пользователя
+    revoked_at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
+    
+    def __repr__(self):
+        return f"<TokenRevocation {self.user_id} at {self.revoked_at}>"
+
 class Venue(db.Model):
     __tablename__ = 'venues'
     
@@ -58,18 +70,23 @@ class Venue(db.Model):
     
     # Связи с другими таблицами
     events = relationship("Event", back_populates="venue", cascade="all, delete-orphan")
+    sections = relationship("VenueSection", cascade="all, delete-orphan", passive_deletes=True)
     
     def __repr__(self):
         return f"<Venue {self.name}>"
 
 class Event(db.Model):
     __tablename__ = 'events'
+    __table_args__ = (
+        # Ключ сортировки каталога для keyset-пагинации
+        Index('ix_events_date_time_id', 'date', 'time', 'id'),
+    )
     
     id = Column(Integer, primary_key=True)
     title = Column(String(255), nullable=False)
     type = Column(Enum(EventType), nullable=False)
     status = Column(Enum(EventStatus), default=EventStatus.UPCOMING)
-    venue_id = Column(Integer, ForeignKey('venues.id'), nullable=False)
+    venue_id = Column(Integer, ForeignKey('venues.id'), nullable=False, index=True)
     date = Column(DateTime, nullable=False)
     time = Column(String(5), nullable=False)  # формат HH:MM
     duration = Column(Integer, default=60)  # в минутах
@@ -89,10 +106,142 @@ class Event(db.Model):
     venue = relationship("Venue", back_populates="events")
     bookings = relationship("Booking", back_populates="event", cascade="all, delete-orphan")
     media = relationship("EventMedia", back_populates="event", cascade="all, delete-orphan")
+    inventory = relationship("EventInventory", back_populates="event", uselist=False, cascade="all, delete-orphan")
+    search_document = relationship("EventSearchDocument", uselist=False, cascade="all, delete-orphan")
     
     def __repr__(self):
         return f"<Event {self.title}>"
 
+class EventInventory(db.Model):
+    """Денормализованный остаток свободных мест мероприятия.
+
+    Изменяется только условными UPDATE из inventory.py, поэтому проверка
+    наличия мест и их резервирование выполняются одним оператором.
+    """
+    __tablename__ = 'event_inventory'
+    __table_args__ = (
+        CheckConstraint('remaining_seats >= 0', name='remaining_seats_non_negative'),
+    )
+    
+    event_id = Column(Integer, ForeignKey('events.id', ondelete='CASCADE'), primary_key=True)
+    remaining_seats = Column(Integer, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    # Связь с Event
+    event = relationship("Event", back_populates="inventory")
+    
+    def __repr__(self):
+        return f"<EventInventory {self.event_id}: {self.remaining_seats}>"
+
+class VenueSection(db.Model):
+    """Сектор площадки: прямоугольная сетка rows x seats_per_row мест.
+
+    Место (row, seat) сектора имеет номер (row - 1) * seats_per_row + (seat - 1)
+    в битовых картах EventSeatMap.
+    """
+    __tablename__ = 'venue_sections'
+    __table_args__ = (
+        UniqueConstraint('venue_id', 'code'),
+        CheckConstraint('rows > 0 AND seats_per_row > 0', name='section_size_positive'),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    venue_id = Column(Integer, ForeignKey('venues.id', ondelete='CASCADE'), nullable=False)
+    code = Column(String(20), nullable=False)  # код в номере места, например 'A1' в 'A1-3-15'
+    name = Column(String(100), nullable=True)
+    rows = Column(Integer, nullable=False)
+    seats_per_row = Column(Integer, nullable=False)
+    position = Column(Integer, default=0, nullable=False)  # порядок вывода на схеме
+    
+    @property
+    def capacity(self):
+        return self.rows * self.seats_per_row
+    
+    def __repr__(self):
+        return f"<VenueSection {self.code} of {self.venue_id}>"
+
+class EventSeatMap(db.Model):
+    """Занятость мест сектора на мероприятии: бит на место (1 - занято).
+
+    Бит места i - (taken[i // 8] >> (i % 8)) & 1. Изменяется только через
+    seatmap.py под блокировкой строки; version растёт с каждым изменением.
+    """
+    __tablename__ = 'event_seat_maps'
+    
+    event_id = Column(Integer, ForeignKey('events.id', ondelete='CASCADE'), primary_key=True)
+    section_id = Column(Integer, ForeignKey('venue_sections.id', ondelete='CASCADE'), primary_key=True)
+    taken = Column(LargeBinary, nullable=False)
+    free_seats = Column(Integer, nullable=False)
+    version = Column(Integer, default=0, nullable=False)
+    
+    def __repr__(self):
+        return f"<EventSeatMap {self.event_id}/{self.section_id}: {self.free_seats} free>"
+
+class BookingSeat(db.Model):
+    """Конкретное место, занятое бронированием или удержанием.
+
+    Первичный ключ не даёт занять место мероприятия дважды даже в обход
+    битовой карты; при отмене бронирования или истечении удержания строки
+    удаляются. Подтверждённое удержание получает booking_id.
+    """
+    __tablename__ = 'booking_seats'
+    
+    event_id = Column(Integer, ForeignKey('events.id', ondelete='CASCADE'), primary_key=True)
+    section_id = Column(Integer, ForeignKey('venue_sections.id', ondelete='CASCADE'), primary_key=True)
+    seat_index = Column(Integer, primary_key=True)
+    booking_id = Column(Integer, ForeignKey('bookings.id', ondelete='CASCADE'), nullable=True, index=True)
+    hold_id = Column(Integer, ForeignKey('seat_holds.id', ondelete='CASCADE'), nullable=True, index=True)
+    
+    def __repr__(self):
+        return f"<BookingSeat {self.event_id}/{self.section_id}/{self.seat_index} of {self.booking_id or self.hold_id}>"
+
+class SeatHold(db.Model):
+    """Удержание мест на время оплаты (см. holds.py).
+
+    Места списываются из остатка и карт секторов при создании удержания,
+    поэтому available_seats учитывает удержания без обращения к этой таблице.
+    status: active, confirmed, expired, released.
+    """
+    __tablename__ = 'seat_holds'
+    __table_args__ = (
+        # Поиск истёкших удержаний фоновой очисткой
+        Index('ix_seat_holds_status_expires_at', 'status', 'expires_at'),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'), nullable=False, index=True)
+    event_id = Column(Integer, ForeignKey('events.id', ondelete='CASCADE'), nullable=False)
+    seats = Column(Integer, nullable=False)
+    status = Column(String(20), default='active', nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+    booking_id = Column(Integer, nullable=True)  # бронирование, созданное подтверждением
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f"<SeatHold {self.id} {self.status} until {self.expires_at}>"
+
+class EventSearchDocument(db.Model):
+    """Поисковый документ мероприятия (см. search.py).
+
+    Поля сгруппированы по весу: title_text (A), meta_text (B - подтип,
+    организатор, название площадки), body_text (C - описание, адрес).
+    search_vector заполняется только на PostgreSQL и индексируется GIN.
+    """
+    __tablename__ = 'event_search'
+    __table_args__ = (
+        Index('ix_event_search_vector', 'search_vector', postgresql_using='gin').ddl_if(dialect='postgresql'),
+    )
+    
+    event_id = Column(Integer, ForeignKey('events.id', ondelete='CASCADE'), primary_key=True)
+    title_text = Column(Text, nullable=False, default='')
+    meta_text = Column(Text, nullable=False, default='')
+    body_text = Column(Text, nullable=False, default='')
+    search_vector = Column(Text().with_variant(TSVECTOR(), 'postgresql'), nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f"<EventSearchDocument {self.event_id}>"
+
 class EventMedia(db.Model):
     __tablename__ = 'event_media'
     
@@ -111,9 +260,13 @@ class EventMedia(db.Model):
 
 class Booking(db.Model):
     __tablename__ = 'bookings'
+    __table_args__ = (
+        # Подтверждённые бронирования мероприятия: отмена, статистика, остатки
+        Index('ix_bookings_event_id_status', 'event_id', 'status'),
+    )
     
     id = Column(Integer, primary_key=True)
-    user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=False, index=True)
     event_id = Column(Integer, ForeignKey('events.id'), nullable=False)
     seats = Column(Integer, default=1, nullable=False)
     status = Column(String(20), default='confirmed', nullable=False)
@@ -136,6 +289,13 @@ class NotificationType(enum.Enum):
 
 class Notification(db.Model):
     __tablename__ = 'notifications'
+    __table_args__ = (
+        # Журнал уведомлений администратора: keyset-пагинация от новых к старым
+        Index('ix_notifications_created_at_id', 'created_at', 'id'),
+        # Уведомления пользователя (все и только непрочитанные) по (created_at, id)
+        Index('ix_notifications_user_created_at_id', 'user_id', 'created_at', 'id'),
+        Index('ix_notifications_user_read_created_at_id', 'user_id', 'read', 'created_at', 'id'),
+    )
     
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
@@ -151,4 +311,143 @@ class Notification(db.Model):
     user = relationship("User", back_populates="notifications")
     
     def __repr__(self):
-        return f"<Notification {self.id} for user {self.user_id}>"
\ No newline at end of file
+        return f"<Notification {self.id} for user {self.user_id}>"
+
+class NotificationCounter(db.Model):
+    """Количество непрочитанных уведомлений пользователя (см. notification_counters.py)"""
+    __tablename__ = 'notification_counters'
+    
+    user_id = Column(Integer, primary_key=True)
+    unread_count = Column(Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f"<NotificationCounter {self.user_id}: {self.unread_count}>"
+
+# Агрегаты для административной статистики (см. stats.py).
+# Обновляются инкрементально при записи; без FK, чтобы удаление строк
+# источника не проходило мимо счётчиков.
+class BookingDailyStats(db.Model):
+    """Количество бронирований по дню создания и текущему статусу.
+
+    Счётчик дня разбит на шарды, чтобы параллельные бронирования не
+    блокировали одну строку; прошедшие дни сворачиваются в шард 0.
+    """
+    __tablename__ = 'booking_daily_stats'
+    
+    day = Column(Date, primary_key=True)
+    status = Column(String(20), primary_key=True)
+    shard = Column(Integer, primary_key=True, default=0)
+    count = Column(Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f"<BookingDailyStats {self.day} {self.status}: {self.count}>"
+
+class EventBookingStats(db.Model):
+    """Количество бронирований мероприятия (всех статусов)"""
+    __tablename__ = 'event_booking_stats'
+    
+    event_id = Column(Integer, primary_key=True)
+    bookings_count = Column(Integer, nullable=False, default=0, index=True)
+    
+    def __repr__(self):
+        return f"<EventBookingStats {self.event_id}: {self.bookings_count}>"
+
+class UserBookingStats(db.Model):
+    """Количество бронирований пользователя (всех статусов)"""
+    __tablename__ = 'user_booking_stats'
+    
+    user_id = Column(Integer, primary_key=True)
+    bookings_count = Column(Integer, nullable=False, default=0, index=True)
+    
+    def __repr__(self):
+        return f"<UserBookingStats {self.user_id}: {self.bookings_count}>"
+
+class MonthlySignupStats(db.Model):
+    """Количество зарегистрированных пользователей по месяцам ('YYYY-MM')"""
+    __tablename__ = 'monthly_signup_stats'
+    
+    month = Column(String(7), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f"<MonthlySignupStats {self.month}: {self.count}>"
+
+class UserRoleStats(db.Model):
+    """Количество пользователей по роли (имя UserRole)"""
+    __tablename__ = 'user_role_stats'
+    
+    role = Column(String(20), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f"<UserRoleStats {self.role}: {self.count}>"
+
+class BackgroundJob(db.Model):
+    """Фоновая задача с отчётом о прогрессе (см. jobs.py).
+
+    Выполняющий задачу поток держит аренду lease_token до lease_until и
+    продлевает её с каждой порцией; задачу с истёкшей арендой подхватывает
+    другой воркер.
+    """
+    __tablename__ = 'background_jobs'
+    __table_args__ = (
+        Index('ix_background_jobs_status_lease_until', 'status', 'lease_until'),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    kind = Column(String(50), nullable=False)
+    target_id = Column(Integer, nullable=True)  # ID объекта задачи (например, event_id)
+    status = Column(String(20), default='pending', nullable=False)  # pending, running, done, failed
+    total = Column(Integer, default=0, nullable=False)
+    processed = Column(Integer, default=0, nullable=False)
+    error = Column(Text, nullable=True)
+    lease_token = Column(String(32), nullable=True)
+    lease_until = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f"<BackgroundJob {self.id} {self.kind} {self.status}>"
+
+class OutboxMessage(db.Model):
+    """Побочный эффект, записанный в одной транзакции с изменением (см. outbox.py).
+
+    Строка удаляется после обработки; неудачная попытка откладывается через
+    available_at, после OUTBOX_MAX_ATTEMPTS строка остаётся для разбора.
+    """
+    __tablename__ = 'outbox_messages'
+    __table_args__ = (
+        # Выборка готовых к обработке сообщений
+        Index('ix_outbox_messages_available_at_id', 'available_at', 'id'),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    kind = Column(String(50), nullable=False)
+    payload = Column(JSON, nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)
+    available_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f"<OutboxMessage {self.id} {self.kind}>"
+
+class IdempotencyKey(db.Model):
+    """Результат запроса с заголовком Idempotency-Key (см. idempotency.py).
+
+    status: pending - запрос выполняется, done - ответ сохранён для повторов.
+    """
+    __tablename__ = 'idempotency_keys'
+    
+    user_id = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    key = Column(String(255), primary_key=True)
+    fingerprint = Column(String(64), nullable=False)  # sha256 метода, пути и тела запроса
+    status = Column(String(20), default='pending', nullable=False)
+    status_code = Column(Integer, nullable=True)
+    content_type = Column(String(100), nullable=True)
+    body = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False, index=True)
+    
+    def __repr__(self):
+        return f"<IdempotencyKey {self.user_id}:{self.key} {self.status}>"
\ No newline at end of file
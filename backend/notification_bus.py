@@ -0,0 +1,168 @@
+import os
+import select
+import threading
+import time
+
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+from database import db
+from models import Notification
+
+# Канал PostgreSQL LISTEN/NOTIFY для рассылки изменений между воркерами
+PG_CHANNEL = 'quicket_notifications'
+# Предел полезной нагрузки NOTIFY - 8000 байт
+PG_PAYLOAD_LIMIT = 7900
+
+
+class Subscription:
+    """Подписка одного SSE-соединения на изменения уведомлений пользователя"""
+
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self._event = threading.Event()
+
+    def signal(self):
+        self._event.set()
+
+    def wait(self, timeout):
+        """True, если за timeout секунд пришло изменение"""
+        fired = self._event.wait(timeout)
+        self._event.clear()
+        return fired
+
+
+class NotificationBus:
+    """Pub/sub изменений уведомлений внутри процесса-воркера.
+
+    Публикуются только id пользователей: подписчик сам дочитывает новые
+    уведомления из базы по Last-Event-ID. На PostgreSQL изменения из всех
+    воркеров приходят через LISTEN/NOTIFY (pg_notify выполняется в той же
+    транзакции и доставляется только после коммита), на остальных базах
+    публикация идёт в процессе после коммита.
+    """
+
+    def __init__(self, max_connections=100):
+        self.max_connections = max_connections
+        self._subscribers = {}  # user_id -> set(Subscription)
+        self._connections = 0
+        self._lock = threading.Lock()
+        self._listener = None
+
+    def subscribe(self, user_id):
+        """Новая подписка или None, если достигнут лимит соединений воркера"""
+        with self._lock:
+            if self._connections >= self.max_connections:
+                return None
+            self._connections += 1
+            subscription = Subscription(user_id)
+            self._subscribers.setdefault(user_id, set()).add(subscription)
+        self._ensure_listener()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.user_id)
+            if subscribers is not None and subscription in subscribers:
+                subscribers.discard(subscription)
+                self._connections -= 1
+                if not subscribers:
+                    del self._subscribers[subscription.user_id]
+
+    def publish(self, user_ids):
+        with self._lock:
+            targets = [s for user_id in user_ids for s in self._subscribers.get(user_id, ())]
+        for subscription in targets:
+            subscription.signal()
+
+    @property
+    def connections(self):
+        return self._connections
+
+    def _ensure_listener(self):
+        if db.engine.dialect.name != 'postgresql':
+            return
+        with self._lock:
+            if self._listener is not None and self._listener.is_alive():
+                return
+            self._listener = threading.Thread(
+                target=self._listen, args=(db.engine.url,), name='notification-listener', daemon=True
+            )
+            self._listener.start()
+
+    def _listen(self, url):
+        """Фоновый поток: LISTEN на отдельном соединении с переподключением"""
+        import psycopg2
+
+        dsn = url.set(drivername='postgresql').render_as_string(hide_password=False)
+        while True:
+            try:
+                connection = psycopg2.connect(dsn)
+                connection.autocommit = True
+                with connection.cursor() as cursor:
+                    cursor.execute(f'LISTEN {PG_CHANNEL}')
+                while True:
+                    if select.select([connection], [], [], 30) == ([], [], []):
+                        continue
+                    connection.poll()
+                    user_ids = set()
+                    while connection.notifies:
+                        payload = connection.notifies.pop(0).payload
+                        user_ids.update(int(user_id) for user_id in payload.split(',') if user_id)
+                    self.publish(user_ids)
+            except Exception as e:
+                print(f"Notification listener error: {e}")
+                time.sleep(1)
+
+
+notification_bus = NotificationBus(
+    max_connections=int(os.getenv("NOTIFICATION_STREAM_MAX_CONNECTIONS", "100"))
+)
+
+
+def notify_users(session, user_ids):
+    """Пометка пользователей, чьи уведомления изменились в текущей транзакции.
+
+    Для массовых UPDATE/INSERT, которые не проходят через ORM flush.
+    """
+    user_ids = set(user_ids)
+    if not user_ids:
+        return
+    if session.get_bind().dialect.name == 'postgresql':
+        payload = ''
+        for user_id in sorted(user_ids):
+            part = f'{user_id},'
+            if len(payload) + len(part) > PG_PAYLOAD_LIMIT:
+                session.connection().execute(text('SELECT pg_notify(:channel, :payload)'),
+                                             {'channel': PG_CHANNEL, 'payload': payload})
+                payload = ''
+            payload += part
+        session.connection().execute(text('SELECT pg_notify(:channel, :payload)'),
+                                     {'channel': PG_CHANNEL, 'payload': payload})
+    else:
+        session.info.setdefault('notified_users', set()).update(user_ids)
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_notification_changes(session, flush_context):
+    user_ids = {
+        obj.user_id
+        for obj in (*session.new, *session.dirty, *session.deleted)
+        if isinstance(obj, Notification)
+    }
+    notify_users(session, user_ids)
+
+
+@event.listens_for(Session, 'after_commit')
+def _publish_notification_changes(session):
+    user_ids = session.info.pop('notified_users', None)
+    if user_ids:
+        notification_bus.publish(user_ids)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_notification_changes(session, previous_transaction):
+    # Откат к точке сохранения не отменяет изменений внешней транзакции
+    if previous_transaction.nested:
+        return
+    session.info.pop('notified_users', None)
@@ -0,0 +1,76 @@
+from sqlalchemy import event, select, delete, insert, inspect
+from sqlalchemy.orm import Session
+
+from database import db
+from models import Notification, NotificationCounter
+from stats import add_to_counters
+
+
+def add_unread(session, deltas):
+    """Изменение счётчиков непрочитанных {user_id: дельта} в текущей транзакции.
+
+    Для массовых INSERT/UPDATE, которые не проходят через ORM flush.
+    """
+    add_to_counters(
+        NotificationCounter, 'unread_count',
+        {(user_id,): delta for user_id, delta in deltas.items()},
+        connection=session.connection()
+    )
+
+
+def get_unread_count(user_id):
+    count = db.session.execute(
+        select(NotificationCounter.unread_count).where(NotificationCounter.user_id == user_id)
+    ).scalar()
+    return max(count or 0, 0)
+
+
+def forget_user(user_id):
+    """Удаление счётчика удалённого пользователя"""
+    db.session.execute(delete(NotificationCounter).where(NotificationCounter.user_id == user_id))
+
+
+def rebuild_unread_counters():
+    """Полный пересчёт счётчиков по таблице notifications"""
+    db.session.execute(delete(NotificationCounter))
+    db.session.execute(insert(NotificationCounter).from_select(
+        ['user_id', 'unread_count'],
+        select(Notification.user_id, db.func.count())
+        .where(Notification.read == False)
+        .group_by(Notification.user_id)
+    ))
+    db.session.commit()
+
+
+def backfill_unread_counters():
+    """Пересчёт счётчиков, если они ещё не заполнены (первый запуск)"""
+    empty = db.session.execute(select(NotificationCounter.user_id).limit(1)).first() is None
+    if empty and db.session.execute(select(Notification.id).where(Notification.read == False).limit(1)).first():
+        rebuild_unread_counters()
+
+
+def _is_unread(value):
+    return value is not True
+
+
+@event.listens_for(Session, 'after_flush')
+def _count_notification_changes(session, flush_context):
+    deltas = {}
+    for obj in session.new:
+        if isinstance(obj, Notification) and _is_unread(obj.read):
+            deltas[obj.user_id] = deltas.get(obj.user_id, 0) + 1
+    for obj in session.deleted:
+        # Значение read берём из загруженного состояния: строка уже удалена
+        if isinstance(obj, Notification) and _is_unread(inspect(obj).dict.get('read', True)):
+            deltas[obj.user_id] = deltas.get(obj.user_id, 0) - 1
+    for obj in session.dirty:
+        if not isinstance(obj, Notification):
+            continue
+        history = inspect(obj).attrs.read.history
+        if not history.added or not history.deleted:
+            continue
+        was_unread, is_unread = _is_unread(history.deleted[0]), _is_unread(history.added[0])
+        if was_unread != is_unread:
+            deltas[obj.user_id] = deltas.get(obj.user_id, 0) + (1 if is_unread else -1)
+    if deltas:
+        add_unread(session, deltas)
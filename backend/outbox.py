@@ -0,0 +1,192 @@
+import os
+import threading
+from datetime import datetime, timedelta
+
+from sqlalchemy import event, select, delete, update
+from sqlalchemy.orm import Session
+
+from database import db
+from models import OutboxMessage, Notification, NotificationType, User
+
+# Потоков обработки outbox в каждом воркере (0 - только отдельный процесс flask outbox-worker)
+OUTBOX_WORKERS = int(os.getenv("OUTBOX_WORKERS", "1"))
+# Период опроса таблицы, если в процессе не было новых сообщений
+OUTBOX_POLL_INTERVAL = float(os.getenv("OUTBOX_POLL_INTERVAL", "1"))
+# Сообщений на одну транзакцию обработки
+OUTBOX_BATCH = int(os.getenv("OUTBOX_BATCH", "200"))
+# Попыток до того, как сообщение остаётся в таблице для разбора
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "10"))
+
+HANDLERS = {}
+
+_workers = []
+_workers_lock = threading.Lock()
+# Сигнал потокам обработки о коммите с новыми сообщениями в этом процессе
+_wakeup = threading.Event()
+
+
+def outbox_handler(kind):
+    """Регистрация обработчика: handler(payloads) в транзакции порции"""
+    def decorator(handler):
+        HANDLERS[kind] = handler
+        return handler
+    return decorator
+
+
+def enqueue(kind, payload):
+    """Запись побочного эффекта в текущую транзакцию"""
+    db.session.add(OutboxMessage(kind=kind, payload=payload))
+    db.session.info['outbox_enqueued'] = True
+
+
+def enqueue_notification(user_id, title, message, notification_type, related_id=None, action_link=None):
+    enqueue('notification', {
+        'user_id': user_id,
+        'title': title,
+        'message': message,
+        'notification_type': notification_type.name,
+        'related_id': related_id,
+        'action_link': action_link
+    })
+
+
+@outbox_handler('notification')
+def _create_notifications(payloads):
+    """Уведомления порции одним flush: счётчики непрочитанных и SSE
+    обновляются обработчиками flush/commit (notification_counters, notification_bus)"""
+    user_ids = {payload['user_id'] for payload in payloads}
+    # Пользователь мог быть удалён после записи сообщения
+    existing = set(db.session.execute(select(User.id).where(User.id.in_(user_ids))).scalars())
+    db.session.add_all(
+        Notification(
+            user_id=payload['user_id'],
+            title=payload['title'],
+            message=payload['message'],
+            notification_type=NotificationType[payload['notification_type']],
+            related_id=payload.get('related_id'),
+            action_link=payload.get('action_link')
+        )
+        for payload in payloads if payload['user_id'] in existing
+    )
+    db.session.flush()
+
+
+def _lock_messages(limit, message_id=None):
+    """Готовые сообщения в порядке записи; SKIP LOCKED делит их между воркерами"""
+    query = select(OutboxMessage.id, OutboxMessage.kind, OutboxMessage.payload).where(
+        OutboxMessage.available_at <= datetime.utcnow(),
+        OutboxMessage.attempts < OUTBOX_MAX_ATTEMPTS
+    )
+    if message_id is not None:
+        query = query.where(OutboxMessage.id == message_id)
+    return db.session.execute(
+        query.order_by(OutboxMessage.id).limit(limit).with_for_update(skip_locked=True)
+    ).all()
+
+
+def _process(messages):
+    payloads_by_kind = {}
+    for _, kind, payload in messages:
+        payloads_by_kind.setdefault(kind, []).append(payload)
+    for kind, payloads in payloads_by_kind.items():
+        handler = HANDLERS.get(kind)
+        if handler is None:
+            raise ValueError(f'Неизвестный тип сообщения outbox: {kind}')
+        handler(payloads)
+    db.session.execute(delete(OutboxMessage).where(OutboxMessage.id.in_([row.id for row in messages])))
+
+
+def _defer(message_id, error):
+    """Откладывание сбойного сообщения с экспоненциальной задержкой"""
+    attempts = db.session.execute(
+        select(OutboxMessage.attempts).where(OutboxMessage.id == message_id)
+    ).scalar() or 0
+    db.session.execute(
+        update(OutboxMessage)
+        .where(OutboxMessage.id == message_id)
+        .values(
+            attempts=attempts + 1,
+            available_at=datetime.utcnow() + timedelta(seconds=min(2 ** attempts, 300)),
+            last_error=str(error)
+        )
+    )
+
+
+def drain_outbox(limit=OUTBOX_BATCH):
+    """Одна порция сообщений одной транзакцией; возвращает число выбранных.
+
+    Если порция не прошла, сообщения обрабатываются по одному, и сбойное
+    откладывается, не задерживая остальные.
+    """
+    messages = _lock_messages(limit)
+    if not messages:
+        db.session.rollback()
+        return 0
+    try:
+        _process(messages)
+        db.session.commit()
+        return len(messages)
+    except Exception as e:
+        db.session.rollback()
+        print(f"Outbox batch failed, retrying messages one by one: {e}")
+
+    for message in messages:
+        locked = _lock_messages(1, message_id=message.id)
+        if not locked:
+            db.session.rollback()
+            continue
+        try:
+            _process(locked)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f"Outbox message {message.id} ({message.kind}) failed: {e}")
+            _defer(message.id, e)
+            db.session.commit()
+    return len(messages)
+
+
+def run_outbox_worker(app):
+    """Цикл обработки: порции подряд, пока очередь не опустеет, затем ожидание"""
+    with app.app_context():
+        while True:
+            try:
+                while drain_outbox() >= OUTBOX_BATCH:
+                    pass
+            except Exception as e:
+                db.session.rollback()
+                print(f"Outbox worker error: {e}")
+            finally:
+                db.session.remove()
+            _wakeup.wait(OUTBOX_POLL_INTERVAL)
+            _wakeup.clear()
+
+
+def ensure_outbox_workers(app):
+    """Запуск потоков обработки в текущем процессе (после fork - заново)"""
+    if OUTBOX_WORKERS <= 0 or OUTBOX_POLL_INTERVAL <= 0:
+        return
+    if _workers and all(worker.is_alive() for worker in _workers):
+        return
+    with _workers_lock:
+        _workers[:] = [worker for worker in _workers if worker.is_alive()]
+        while len(_workers) < OUTBOX_WORKERS:
+            worker = threading.Thread(
+                target=run_outbox_worker, args=(app,), name=f'outbox-worker-{len(_workers)}', daemon=True
+            )
+            worker.start()
+            _workers.append(worker)
+
+
+@event.listens_for(Session, 'after_commit')
+def _wake_outbox_workers(session):
+    if session.info.pop('outbox_enqueued', None):
+        _wakeup.set()
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_outbox_flag(session, previous_transaction):
+    # Откат к точке сохранения не отменяет изменений внешней транзакции
+    if previous_transaction.nested:
+        return
+    session.info.pop('outbox_enqueued', None)
@@ -0,0 +1,63 @@
+import base64
+import json
+from datetime import datetime
+
+from flask import request
+from sqlalchemy import tuple_
+
+
+class InvalidCursor(ValueError):
+    """Курсор пагинации повреждён или не соответствует сортировке"""
+
+
+def encode_cursor(values):
+    """Упаковка значений ключа сортировки последней строки в непрозрачную строку"""
+    payload = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    raw = json.dumps(payload, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor, types):
+    """Распаковка курсора; types - конструкторы значений в порядке сортировки"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(payload, list) or len(payload) != len(types):
+            raise InvalidCursor(cursor)
+        return [
+            datetime.fromisoformat(value) if kind is datetime else kind(value)
+            for kind, value in zip(types, payload)
+        ]
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(cursor) from e
+
+
+def get_page_limit(default=20, maximum=100):
+    """Размер страницы из ?limit=, ограниченный сверху"""
+    limit = request.args.get('limit', default=default, type=int)
+    return max(1, min(limit, maximum))
+
+
+def keyset_page(query, columns, key, limit, descending=False):
+    """Применение курсора из ?cursor= и выборка одной страницы.
+
+    columns - столбцы уникального ключа сортировки; к запросу добавляются
+    ORDER BY по ним и условие «строго после курсора», поэтому стоимость
+    страницы не зависит от её номера. key(row) возвращает значения columns
+    для строки результата. Возвращает (rows, next_cursor).
+    """
+    cursor = request.args.get('cursor')
+    if cursor:
+        types = [getattr(column.type, 'python_type', str) for column in columns]
+        values = decode_cursor(cursor, types)
+        if descending:
+            query = query.filter(tuple_(*columns) < tuple_(*values))
+        else:
+            query = query.filter(tuple_(*columns) > tuple_(*values))
+
+    order = [column.desc() for column in columns] if descending else list(columns)
+    rows = query.order_by(*order).limit(limit + 1).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, encode_cursor(key(rows[-1]))
+    return rows, None
@@ -0,0 +1,216 @@
+import os
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import g, request, has_request_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Режим контроля запросов: пусто - выключен, log - печать предупреждений,
+# raise - превышение бюджета запросов эндпоинта завершается ошибкой (для тестов и CI)
+QUERY_GUARD = os.getenv("QUERY_GUARD", "").lower()
+# Сколько раз один и тот же вид SQL должен повториться за запрос, чтобы считаться N+1
+QUERY_GUARD_REPEAT_THRESHOLD = int(os.getenv("QUERY_GUARD_REPEAT_THRESHOLD", "5"))
+# Порог медленного оператора в миллисекундах, для него печатается план EXPLAIN
+QUERY_GUARD_SLOW_MS = float(os.getenv("QUERY_GUARD_SLOW_MS", "100"))
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+# Точка сохранения вокруг EXPLAIN медленных запросов
+EXPLAIN_SAVEPOINT = 'query_guard_explain'
+
+_PLACEHOLDER_LIST = re.compile(r'\(\s*(?:\?|%s|%\(\w+\)s|:\w+)(?:\s*,\s*(?:\?|%s|%\(\w+\)s|:\w+))*\s*\)')
+_WHITESPACE = re.compile(r'\s+')
+
+_local = threading.local()
+
+
+class QueryBudgetExceeded(AssertionError):
+    def __init__(self, endpoint, count, budget):
+        super().__init__(f'{endpoint}: {count} SQL-операторов при бюджете {budget}')
+        self.endpoint = endpoint
+        self.count = count
+        self.budget = budget
+
+
+class QueryLog:
+    """SQL-операторы одного запроса, сгруппированные по виду"""
+
+    def __init__(self):
+        self.count = 0
+        self.overhead = 0  # служебные операторы outside_budget()
+        self.shapes = {}  # вид оператора -> [количество, место вызова]
+
+    @property
+    def budgeted(self):
+        """Операторы, которые сравниваются с бюджетом эндпоинта"""
+        return self.count - self.overhead
+
+    def record(self, statement, overhead=False):
+        self.count += 1
+        if overhead:
+            self.overhead += 1
+        shape = statement_shape(statement)
+        entry = self.shapes.get(shape)
+        if entry is None:
+            self.shapes[shape] = [1, None]
+            return
+        entry[0] += 1
+        # Место вызова ищем по первому повтору: стек дорогой, а повтор и есть подозрение
+        if entry[1] is None:
+            entry[1] = _caller()
+
+    def repeated(self, threshold=QUERY_GUARD_REPEAT_THRESHOLD):
+        """[(количество, вид, место вызова)] для видов, повторившихся threshold и более раз"""
+        return sorted(
+            ((count, shape, location) for shape, (count, location) in self.shapes.items() if count >= threshold),
+            reverse=True
+        )
+
+
+def statement_shape(statement):
+    """Вид оператора: списки параметров IN (...) любой длины сворачиваются в один"""
+    return _PLACEHOLDER_LIST.sub('(?)', _WHITESPACE.sub(' ', statement).strip())
+
+
+def _caller():
+    """Ближайший кадр стека из кода приложения (не SQLAlchemy и не этот модуль)"""
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(BACKEND_DIR) and filename != __file__:
+            return f'{os.path.basename(filename)}:{frame.f_lineno} {frame.f_code.co_name}'
+        frame = frame.f_back
+    return 'unknown'
+
+
+def _active_logs():
+    logs = list(getattr(_local, 'logs', ()))
+    if QUERY_GUARD and has_request_context():
+        log = g.get('query_log')
+        if log is not None:
+            logs.append(log)
+    return logs
+
+
+def _is_savepoint(statement):
+    return statement.lstrip().upper().startswith(('SAVEPOINT', 'RELEASE SAVEPOINT', 'ROLLBACK TO SAVEPOINT'))
+
+
+@contextmanager
+def outside_budget():
+    """Служебные операторы блока (ключ идемпотентности, периодическая
+    синхронизация отзывов токенов) считаются, но не входят в бюджет
+    эндпоинта: бюджет - это операторы самого обработчика. Точки сохранения
+    в бюджет тоже не входят"""
+    _local.outside_budget = getattr(_local, 'outside_budget', 0) + 1
+    try:
+        yield
+    finally:
+        _local.outside_budget -= 1
+
+
+@contextmanager
+def count_queries():
+    """SQL-операторы внутри блока текущего потока (для тестов):
+
+        with count_queries() as queries:
+            client.get('/api/events')
+        assert queries.count <= 3
+    """
+    log = QueryLog()
+    if not hasattr(_local, 'logs'):
+        _local.logs = []
+    _local.logs.append(log)
+    try:
+        yield log
+    finally:
+        _local.logs.remove(log)
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    logs = _active_logs()
+    if not logs:
+        return
+    overhead = getattr(_local, 'outside_budget', 0) > 0 or _is_savepoint(statement)
+    for log in logs:
+        log.record(statement, overhead)
+    conn.info.setdefault('query_guard_started', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get('query_guard_started')
+    if not started:
+        return
+    elapsed_ms = (time.perf_counter() - started.pop()) * 1000
+    if elapsed_ms < QUERY_GUARD_SLOW_MS:
+        return
+    endpoint = request.endpoint if has_request_context() else 'background'
+    print(f"Slow SQL in {endpoint} ({_caller()}): {elapsed_ms:.0f} ms\n{statement}")
+    if not executemany:
+        plan = explain(conn, statement, parameters)
+        if plan:
+            print(plan)
+
+
+def explain(conn, statement, parameters):
+    """План выполнения SELECT в том же соединении; None для остальных операторов.
+
+    EXPLAIN идёт внутри точки сохранения: на PostgreSQL ошибка оператора
+    прерывает всю транзакцию, а откат к точке сохранения оставляет
+    транзакцию запроса рабочей.
+    """
+    if not statement.lstrip().upper().startswith(('SELECT', 'WITH')):
+        return None
+    prefix = 'EXPLAIN QUERY PLAN ' if conn.dialect.name == 'sqlite' else 'EXPLAIN '
+    # Отдельный курсор DBAPI: результат исходного оператора ещё не прочитан,
+    # а события SQLAlchemy на нём не срабатывают
+    cursor = conn.connection.cursor()
+    try:
+        cursor.execute(f'SAVEPOINT {EXPLAIN_SAVEPOINT}')
+        try:
+            cursor.execute(prefix + statement, parameters)
+            plan = '\n'.join(' '.join(str(column) for column in row) for row in cursor.fetchall())
+        except Exception:
+            cursor.execute(f'ROLLBACK TO SAVEPOINT {EXPLAIN_SAVEPOINT}')
+            raise
+        finally:
+            cursor.execute(f'RELEASE SAVEPOINT {EXPLAIN_SAVEPOINT}')
+        return plan
+    except Exception as e:
+        return f'EXPLAIN failed: {e}'
+    finally:
+        cursor.close()
+
+
+def init_query_guard(app):
+    """Учёт SQL по запросам в режиме QUERY_GUARD; бюджеты - app.config['QUERY_BUDGETS']
+    ({эндпоинт: максимум операторов}), горячие эндпоинты объявлены в app.py,
+    тесты могут добавлять свои"""
+    app.config.setdefault('QUERY_BUDGETS', {})
+    if not QUERY_GUARD:
+        return
+
+    @app.before_request
+    def start_query_log():
+        g.query_log = QueryLog()
+
+    @app.after_request
+    def check_query_log(response):
+        log = g.pop('query_log', None)
+        if log is None:
+            return response
+        endpoint = request.endpoint or 'unmatched'
+        for count, shape, location in log.repeated():
+            print(f"N+1 suspect in {endpoint} ({location}): {count}x {shape[:300]}")
+        budget = app.config['QUERY_BUDGETS'].get(endpoint)
+        if budget is not None and log.budgeted > budget:
+            error = QueryBudgetExceeded(endpoint, log.budgeted, budget)
+            if QUERY_GUARD == 'raise':
+                raise error
+            print(f"Query budget exceeded: {error}")
+        return response
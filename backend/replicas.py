@@ -0,0 +1,267 @@
+import itertools
+import os
+import threading
+import time
+from functools import wraps
+
+from flask import current_app, g, request, has_request_context
+from flask_sqlalchemy.session import Session as FlaskSession
+from sqlalchemy import event, text
+from sqlalchemy.exc import OperationalError
+
+# Реплики только для чтения через запятую (пусто - все запросы идут в основную базу)
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+# Сколько секунд после записи клиент читает из основной базы (запас на задержку репликации)
+REPLICA_STICKY_SECONDS = float(os.getenv("REPLICA_STICKY_SECONDS", "5"))
+# На сколько секунд исключается реплика с ошибкой соединения
+REPLICA_EJECT_SECONDS = float(os.getenv("REPLICA_EJECT_SECONDS", "30"))
+# Период проверки реплик в каждом воркере (0 - исключение только по ошибкам запросов)
+REPLICA_HEALTH_INTERVAL = float(os.getenv("REPLICA_HEALTH_INTERVAL", "5"))
+# Допустимое отставание реплики PostgreSQL в секундах
+REPLICA_MAX_LAG = float(os.getenv("REPLICA_MAX_LAG", "10"))
+
+STICKY_COOKIE = 'quicket_primary_until'
+# Отставание реплики PostgreSQL; 0, если всё полученное уже применено
+LAG_QUERY = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+)
+
+_monitor = None
+_monitor_lock = threading.Lock()
+
+
+def replica_binds():
+    """SQLALCHEMY_BINDS для реплик: replica_0, replica_1, ..."""
+    return {f'replica_{i}': url for i, url in enumerate(DATABASE_REPLICA_URLS)}
+
+
+class ReplicaRouter:
+    """Выбор реплики по кругу среди исправных и привязка клиента к основной
+    базе после записи.
+
+    Состояние живёт в памяти процесса: исключённую реплику каждый воркер
+    обнаруживает сам, а привязка после записи передаётся между воркерами
+    cookie (для клиентов без cookie - по user_id в пределах воркера).
+    """
+
+    def __init__(self, bind_keys, eject_seconds=30, sticky_seconds=5):
+        self.bind_keys = list(bind_keys)
+        self.eject_seconds = eject_seconds
+        self.sticky_seconds = sticky_seconds
+        self._ejected = {}  # bind key -> monotonic, до которого реплика исключена
+        self._sticky_users = {}  # user_id -> monotonic, до которого читаем из основной базы
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+
+    def healthy(self):
+        now = time.monotonic()
+        return [key for key in self.bind_keys if self._ejected.get(key, 0) <= now]
+
+    def choose(self):
+        """Следующая исправная реплика или None (читать из основной базы)"""
+        healthy = self.healthy()
+        if not healthy:
+            return None
+        return healthy[next(self._counter) % len(healthy)]
+
+    def eject(self, bind_key, reason):
+        with self._lock:
+            if self._ejected.get(bind_key, 0) <= time.monotonic():
+                print(f"Replica {bind_key} ejected for {self.eject_seconds:.0f}s: {reason}")
+            self._ejected[bind_key] = time.monotonic() + self.eject_seconds
+
+    def restore(self, bind_key):
+        with self._lock:
+            if self._ejected.pop(bind_key, None) is not None:
+                print(f"Replica {bind_key} restored")
+
+    def mark_written(self, user_id):
+        now = time.monotonic()
+        with self._lock:
+            self._sticky_users[user_id] = now + self.sticky_seconds
+            if len(self._sticky_users) > 10000:
+                self._sticky_users = {
+                    key: until for key, until in self._sticky_users.items() if until > now
+                }
+
+    def is_sticky(self, user_id, cookie):
+        """Клиент недавно писал: по cookie или по user_id этого воркера"""
+        try:
+            if cookie and float(cookie) > time.time():
+                return True
+        except ValueError:
+            pass
+        return user_id is not None and self._sticky_users.get(user_id, 0) > time.monotonic()
+
+
+replica_router = ReplicaRouter(
+    replica_binds(), eject_seconds=REPLICA_EJECT_SECONDS, sticky_seconds=REPLICA_STICKY_SECONDS
+)
+
+
+def _is_read(clause):
+    """SELECT без FOR UPDATE; прочие операторы и text() - в основную базу"""
+    return getattr(clause, 'is_select', False) and getattr(clause, '_for_update_arg', None) is None
+
+
+class RoutingSession(FlaskSession):
+    """Сессия, отправляющая чтение маршрутов @read_replica на реплику.
+
+    Запись (flush, INSERT/UPDATE/DELETE, SELECT FOR UPDATE) и всё вне
+    таких маршрутов идёт в основную базу. После первой записи в запросе и
+    в окне REPLICA_STICKY_SECONDS после записи клиента чтение тоже идёт в
+    основную базу (read-your-writes). Реплика выбирается один раз на запрос.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        primary = super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+        if bind is not None or not replica_router.bind_keys:
+            return primary
+        if self._flushing or (clause is not None and not _is_read(clause)):
+            self.info['replica_wrote'] = True
+            return primary
+        if clause is None or self.info.get('replica_wrote') or not has_request_context():
+            return primary
+        if not g.get('read_replica') or g.get('replica_sticky'):
+            return primary
+        bind_key = g.get('replica_bind')
+        if bind_key is None:
+            bind_key = g.replica_bind = replica_router.choose()
+        if bind_key is None:
+            return primary
+        return self._db.engines[bind_key]
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _remember_write(session):
+    if session.info.pop('replica_wrote', None) and has_request_context():
+        g.replica_write_committed = True
+
+
+@event.listens_for(RoutingSession, 'after_soft_rollback')
+def _forget_write(session, previous_transaction):
+    # Откат к точке сохранения не отменяет изменений внешней транзакции
+    if previous_transaction.nested:
+        return
+    session.info.pop('replica_wrote', None)
+
+
+def read_replica(f):
+    """Чтение маршрута с реплики (после token_required/admin_required).
+
+    Если реплика не отвечает, она исключается, а обработчик повторяется
+    на основной базе - маршрут должен быть только для чтения.
+    """
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        if not replica_router.bind_keys:
+            return f(*args, **kwargs)
+        g.read_replica = True
+        g.replica_sticky = replica_router.is_sticky(g.get('user_id'), request.cookies.get(STICKY_COOKIE))
+        try:
+            try:
+                response = f(*args, **kwargs)
+            except OperationalError:
+                if g.get('replica_failed') is None:
+                    raise
+                response = None
+            # Обработчик мог сам перехватить ошибку и вернуть 500
+            bind_key = g.pop('replica_failed', None)
+            if bind_key is None:
+                return response
+            current_app.extensions['sqlalchemy'].session.rollback()
+            replica_router.eject(bind_key, 'ошибка соединения в запросе')
+            g.pop('replica_bind', None)
+            g.read_replica = False
+            return f(*args, **kwargs)
+        finally:
+            g.pop('read_replica', None)
+
+    return decorated
+
+
+def replica_in_use():
+    """Ответ текущего запроса прочитан с реплики"""
+    return has_request_context() and g.get('replica_bind') is not None
+
+
+def check_replicas(engines):
+    """SELECT 1 и отставание (PostgreSQL) каждой реплики"""
+    for bind_key in replica_router.bind_keys:
+        engine = engines[bind_key]
+        try:
+            with engine.connect() as conn:
+                if engine.dialect.name == 'postgresql':
+                    lag = conn.execute(LAG_QUERY).scalar()
+                else:
+                    conn.execute(text('SELECT 1'))
+                    lag = 0
+        except Exception as e:
+            replica_router.eject(bind_key, e)
+            continue
+        if lag is not None and float(lag) > REPLICA_MAX_LAG:
+            replica_router.eject(bind_key, f'отставание {float(lag):.1f}s')
+        else:
+            replica_router.restore(bind_key)
+
+
+def _monitor_forever(app):
+    with app.app_context():
+        engines = app.extensions['sqlalchemy'].engines
+    while True:
+        time.sleep(REPLICA_HEALTH_INTERVAL)
+        try:
+            check_replicas(engines)
+        except Exception as e:
+            print(f"Replica health check failed: {e}")
+
+
+def ensure_replica_monitor(app):
+    """Запуск проверки реплик в текущем процессе (после fork - заново)"""
+    global _monitor
+    if not replica_router.bind_keys or REPLICA_HEALTH_INTERVAL <= 0:
+        return
+    if _monitor is not None and _monitor.is_alive():
+        return
+    with _monitor_lock:
+        if _monitor is not None and _monitor.is_alive():
+            return
+        _monitor = threading.Thread(target=_monitor_forever, args=(app,), name='replica-monitor', daemon=True)
+        _monitor.start()
+
+
+def _error_listener(bind_key):
+    def handle_error(context):
+        if not (context.is_disconnect or isinstance(context.sqlalchemy_exception, OperationalError)):
+            return
+        # В запросе реплику исключит read_replica, повторив обработчик на основной базе
+        if has_request_context():
+            g.replica_failed = bind_key
+        else:
+            replica_router.eject(bind_key, context.original_exception)
+    return handle_error
+
+
+def init_replicas(app, db):
+    """Исключение реплик по ошибкам соединения и привязка клиента к основной
+    базе после успешной записи"""
+    if not replica_router.bind_keys:
+        return
+
+    with app.app_context():
+        for bind_key in replica_router.bind_keys:
+            event.listen(db.engines[bind_key], 'handle_error', _error_listener(bind_key))
+
+    @app.after_request
+    def stick_to_primary(response):
+        if not g.pop('replica_write_committed', False):
+            return response
+        user_id = g.get('user_id')
+        if user_id is not None:
+            replica_router.mark_written(user_id)
+        response.set_cookie(
+            STICKY_COOKIE, f'{time.time() + REPLICA_STICKY_SECONDS:.3f}',
+            max_age=int(REPLICA_STICKY_SECONDS) + 1, path='/api', httponly=True, samesite='Lax'
+        )
+        return response
@@ -0,0 +1,281 @@
+import math
+import os
+import re
+import threading
+from bisect import bisect_left
+
+from sqlalchemy import select, delete, update, insert
+from sqlalchemy.dialects.postgresql import REGCONFIG
+
+from database import db
+from models import Event, Venue, EventSearchDocument
+
+# Веса полей документа (как в ts_rank: A=1.0, B=0.4, C=0.2)
+FIELD_WEIGHTS = (
+    ('title_text', 'A', 1.0),
+    ('meta_text', 'B', 0.4),
+    ('body_text', 'C', 0.2),
+)
+
+# Конфигурации PostgreSQL: simple - для казахского и префиксов, остальные - стемминг
+PG_CONFIGS = ('simple', 'russian', 'english')
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+# Окончания для облегчённого стемминга в Python-движке (самые длинные - первыми)
+CYRILLIC_SUFFIXES = sorted({
+    # русский
+    'ами', 'ями', 'ого', 'его', 'ому', 'ему', 'ыми', 'ими', 'ать', 'ять', 'ение',
+    'ая', 'яя', 'ой', 'ей', 'ий', 'ый', 'ое', 'ее', 'ые', 'ие', 'ов', 'ев',
+    'ам', 'ям', 'ах', 'ях', 'ом', 'ем', 'ы', 'и', 'а', 'я', 'о', 'е', 'у', 'ю', 'ь',
+    # казахский
+    'лар', 'лер', 'дар', 'дер', 'тар', 'тер', 'ның', 'нің', 'дың', 'дің', 'тың', 'тің',
+    'ға', 'ге', 'қа', 'ке', 'нда', 'нде', 'да', 'де', 'та', 'те',
+    'дан', 'ден', 'тан', 'тен', 'нан', 'нен', 'ды', 'ді', 'ты', 'ті', 'ны', 'ні',
+    'сы', 'сі', 'ы', 'і',
+}, key=len, reverse=True)
+LATIN_SUFFIXES = ('ings', 'ing', 'ed', 'es', 's')
+MIN_STEM_LENGTH = 3
+
+
+def normalize(text):
+    return (text or '').lower().replace('ё', 'е')
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(normalize(text))
+
+
+def stem(token):
+    """Отсечение одного окончания (русский, казахский, английский)"""
+    suffixes = LATIN_SUFFIXES if token.isascii() else CYRILLIC_SUFFIXES
+    for suffix in suffixes:
+        if token.endswith(suffix) and len(token) - len(suffix) >= MIN_STEM_LENGTH:
+            return token[:-len(suffix)]
+    return token
+
+
+def _document_select(condition=None):
+    """SELECT полей поискового документа из events и venues"""
+    def joined(*columns):
+        expression = db.func.coalesce(columns[0], '')
+        for column in columns[1:]:
+            expression = expression + ' ' + db.func.coalesce(column, '')
+        return expression
+
+    query = select(
+        Event.id,
+        db.func.coalesce(Event.title, ''),
+        joined(Event.event_subtype, Event.organizer, Venue.name),
+        joined(Event.description, Venue.address)
+    ).join(
+        Venue, Event.venue_id == Venue.id
+    )
+    if condition is not None:
+        query = query.where(condition)
+    return query
+
+
+def index_events(event_ids=None, venue_id=None):
+    """Пересчёт поисковых документов в текущей транзакции.
+
+    event_ids - конкретные мероприятия, venue_id - все мероприятия площадки
+    (после изменения её названия или адреса); без аргументов - полная
+    перестройка индекса.
+    """
+    if event_ids is not None:
+        condition = Event.id.in_(list(event_ids))
+    elif venue_id is not None:
+        condition = Event.venue_id == venue_id
+    else:
+        condition = None
+
+    targets = select(Event.id)
+    if condition is not None:
+        targets = targets.where(condition)
+    db.session.execute(
+        delete(EventSearchDocument)
+        .where(EventSearchDocument.event_id.in_(targets))
+        .execution_options(synchronize_session=False)
+    )
+    db.session.execute(
+        insert(EventSearchDocument).from_select(
+            ['event_id', 'title_text', 'meta_text', 'body_text'],
+            _document_select(condition)
+        )
+    )
+    get_search_engine().refresh(targets)
+
+
+def backfill_search_index():
+    """Создание документов для мероприятий, которые ещё не проиндексированы"""
+    missing = select(Event.id).outerjoin(
+        EventSearchDocument, EventSearchDocument.event_id == Event.id
+    ).where(
+        EventSearchDocument.event_id.is_(None)
+    )
+    event_ids = db.session.execute(missing).scalars().all()
+    if event_ids:
+        index_events(event_ids)
+    db.session.commit()
+
+
+class PostgresSearchEngine:
+    """Полнотекстовый поиск на tsvector/tsquery с GIN-индексом"""
+
+    def refresh(self, targets):
+        """Пересчёт search_vector для документов выбранных мероприятий"""
+        vector = None
+        for field, weight, _ in FIELD_WEIGHTS:
+            column = getattr(EventSearchDocument, field)
+            for config in PG_CONFIGS:
+                part = db.func.setweight(db.func.to_tsvector(db.cast(config, REGCONFIG), column), weight)
+                vector = part if vector is None else vector.op('||')(part)
+        db.session.execute(
+            update(EventSearchDocument)
+            .where(EventSearchDocument.event_id.in_(targets))
+            .values(search_vector=vector)
+            .execution_options(synchronize_session=False)
+        )
+
+    def _tsquery(self, text):
+        # Каждое слово ищется как префикс в любой из конфигураций, слова - через AND
+        query = None
+        for token in tokenize(text):
+            term = f'{token}:*'
+            alternatives = None
+            for config in PG_CONFIGS:
+                part = db.func.to_tsquery(db.cast(config, REGCONFIG), term)
+                alternatives = part if alternatives is None else alternatives.op('||')(part)
+            query = alternatives if query is None else query.op('&&')(alternatives)
+        return query
+
+    def filter_query(self, query, text):
+        tsquery = self._tsquery(text)
+        if tsquery is None:
+            return query
+        return query.join(
+            EventSearchDocument, EventSearchDocument.event_id == Event.id
+        ).filter(
+            EventSearchDocument.search_vector.op('@@')(tsquery)
+        )
+
+    def search(self, query, text, limit, offset):
+        tsquery = self._tsquery(text)
+        if tsquery is None:
+            return []
+        rank = db.func.ts_rank_cd(EventSearchDocument.search_vector, tsquery)
+        rows = query.add_columns(rank.label('rank')).join(
+            EventSearchDocument, EventSearchDocument.event_id == Event.id
+        ).filter(
+            EventSearchDocument.search_vector.op('@@')(tsquery)
+        ).order_by(
+            rank.desc(), Event.id
+        ).offset(offset).limit(limit).all()
+        return [(tuple(row[:-1]), float(row[-1])) for row in rows]
+
+
+class PythonSearchEngine:
+    """Инвертированный индекс в памяти процесса (SQLite, тесты, разработка).
+
+    Индекс строится по таблице event_search и перестраивается, когда
+    меняется её сигнатура (число строк и max(updated_at)).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._signature = None
+        self._postings = {}
+        self._terms = []
+        self._documents = 0
+
+    def refresh(self, targets):
+        # Изменения будут подхвачены по сигнатуре таблицы при следующем поиске
+        pass
+
+    def _ensure_index(self):
+        signature = tuple(db.session.execute(
+            select(db.func.count(), db.func.max(EventSearchDocument.updated_at))
+        ).one())
+        with self._lock:
+            if signature == self._signature:
+                return
+            postings = {}
+            rows = db.session.execute(select(
+                EventSearchDocument.event_id,
+                EventSearchDocument.title_text,
+                EventSearchDocument.meta_text,
+                EventSearchDocument.body_text
+            ))
+            for event_id, *fields in rows:
+                for text, (_, _, weight) in zip(fields, FIELD_WEIGHTS):
+                    for token in tokenize(text):
+                        for term in {token, stem(token)}:
+                            scores = postings.setdefault(term, {})
+                            scores[event_id] = scores.get(event_id, 0.0) + weight
+            self._postings = postings
+            self._terms = sorted(postings)
+            self._documents = signature[0]
+            self._signature = signature
+
+    def _prefixed(self, prefix):
+        start = bisect_left(self._terms, prefix)
+        for term in self._terms[start:]:
+            if not term.startswith(prefix):
+                break
+            yield term
+
+    def rank(self, text):
+        """[(event_id, score)] по убыванию релевантности; все слова обязательны"""
+        tokens = tokenize(text)
+        if not tokens:
+            return []
+        self._ensure_index()
+        scores = None
+        for token in tokens:
+            exact = {token, stem(token)}
+            matches = {}
+            for prefix in exact:
+                for term in self._prefixed(prefix):
+                    # Точное совпадение слова весит больше, чем совпадение по префиксу
+                    factor = 1.0 if term in exact else 0.5
+                    for event_id, weight in self._postings[term].items():
+                        matches[event_id] = max(matches.get(event_id, 0.0), weight * factor)
+            if not matches:
+                return []
+            idf = math.log(1 + self._documents / len(matches))
+            if scores is None:
+                scores = {event_id: score * idf for event_id, score in matches.items()}
+            else:
+                scores = {
+                    event_id: score + matches[event_id] * idf
+                    for event_id, score in scores.items() if event_id in matches
+                }
+        return sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+
+    def filter_query(self, query, text):
+        if not tokenize(text):
+            return query
+        return query.filter(Event.id.in_([event_id for event_id, _ in self.rank(text)]))
+
+    def search(self, query, text, limit, offset):
+        ranked = dict(self.rank(text))
+        if not ranked:
+            return []
+        rows = query.filter(Event.id.in_(list(ranked))).all()
+        rows.sort(key=lambda row: (-ranked[row.id], row.id))
+        return [(tuple(row), ranked[row.id]) for row in rows[offset:offset + limit]]
+
+
+_engines = {
+    'postgres': PostgresSearchEngine(),
+    'python': PythonSearchEngine(),
+}
+
+
+def get_search_engine():
+    """Движок поиска: SEARCH_ENGINE из окружения или по диалекту базы"""
+    name = os.getenv('SEARCH_ENGINE')
+    if not name:
+        name = 'postgres' if db.engine.dialect.name == 'postgresql' else 'python'
+    return _engines[name]
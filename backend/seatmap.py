@@ -0,0 +1,413 @@
+import base64
+
+from sqlalchemy import Integer, select, update, delete, insert, literal, and_
+from sqlalchemy.dialects import postgresql, sqlite
+
+from database import db
+from models import VenueSection, EventSeatMap, BookingSeat, Booking, SeatHold
+
+# Схема Astana Arena из StadiumSeatSelection.jsx: секторы A-D по 10 подсекторов,
+# (рядов, мест в ряду) для каждого сектора
+STADIUM_SECTORS = {'A': (15, 20), 'B': (12, 15), 'C': (15, 20), 'D': (12, 15)}
+STADIUM_SUBSECTORS = 10
+
+
+class InvalidSeat(ValueError):
+    """Номер места не соответствует схеме площадки"""
+
+
+class NotEnoughSeats(Exception):
+    """В картах секторов меньше свободных мест, чем нужно"""
+
+
+class SeatsTaken(Exception):
+    """Часть запрошенных мест уже занята"""
+
+    def __init__(self, labels):
+        super().__init__(', '.join(labels))
+        self.labels = labels
+
+
+def is_taken(bitmap, index):
+    """Занято ли место index по битовой карте (O(1)); недостающие байты - свободные места"""
+    byte = index >> 3
+    return byte < len(bitmap) and bool(bitmap[byte] >> (index & 7) & 1)
+
+
+def seat_label(section, index, single=False):
+    """Номер места в формате фронтенда: 'A1-3-15' или '3-15' для площадки с одним сектором"""
+    row, seat = divmod(index, section.seats_per_row)
+    label = f'{row + 1}-{seat + 1}'
+    return label if single else f'{section.code}-{label}'
+
+
+def get_sections(venue_id):
+    return VenueSection.query.filter_by(venue_id=venue_id).order_by(
+        VenueSection.position, VenueSection.id
+    ).all()
+
+
+def stadium_sections():
+    """Схема секторов стадиона в формате replace_sections"""
+    return [
+        {'code': f'{sector}{number}', 'name': f'Сектор {sector}{number}',
+         'rows': rows, 'seats_per_row': seats_per_row}
+        for sector, (rows, seats_per_row) in STADIUM_SECTORS.items()
+        for number in range(1, STADIUM_SUBSECTORS + 1)
+    ]
+
+
+def replace_sections(venue_id, sections):
+    """Замена схемы площадки (в текущей транзакции).
+
+    sections - список {'code', 'name', 'rows', 'seats_per_row'}. Схему нельзя
+    менять, пока на её места есть бронирования: номера мест в битовых картах
+    перестанут совпадать. ValueError с сообщением при ошибке.
+    """
+    codes = set()
+    for section in sections:
+        code = section.get('code')
+        rows, seats_per_row = section.get('rows'), section.get('seats_per_row')
+        if not isinstance(code, str) or not code or '-' in code or len(code) > 20:
+            raise ValueError('Код сектора должен быть непустой строкой без дефисов')
+        if code in codes:
+            raise ValueError(f'Код сектора {code} повторяется')
+        for value in (rows, seats_per_row):
+            if not isinstance(value, int) or isinstance(value, bool) or value < 1:
+                raise ValueError(f'Размеры сектора {code} должны быть положительными числами')
+        codes.add(code)
+
+    section_ids = select(VenueSection.id).where(VenueSection.venue_id == venue_id)
+    if db.session.execute(
+        select(BookingSeat.event_id).where(BookingSeat.section_id.in_(section_ids)).limit(1)
+    ).first() is not None:
+        raise ValueError('Схема площадки уже используется в бронированиях')
+
+    db.session.execute(delete(EventSeatMap).where(EventSeatMap.section_id.in_(section_ids)))
+    db.session.execute(delete(VenueSection).where(VenueSection.venue_id == venue_id))
+    for position, section in enumerate(sections):
+        db.session.add(VenueSection(
+            venue_id=venue_id,
+            code=section['code'],
+            name=section.get('name'),
+            rows=section['rows'],
+            seats_per_row=section['seats_per_row'],
+            position=position
+        ))
+    db.session.flush()
+
+
+def parse_seat_labels(sections, labels):
+    """[(section, index)] по номерам мест; InvalidSeat при неверном или повторном номере"""
+    by_code = {section.code: section for section in sections}
+    positions = []
+    seen = set()
+    for label in labels:
+        parts = label.split('-') if isinstance(label, str) else []
+        if len(parts) == 2 and len(sections) == 1:
+            parts = [sections[0].code] + parts
+        section = by_code.get(parts[0]) if len(parts) == 3 else None
+        if section is None or not parts[1].isdigit() or not parts[2].isdigit():
+            raise InvalidSeat(label)
+        row, seat = int(parts[1]), int(parts[2])
+        if not (1 <= row <= section.rows and 1 <= seat <= section.seats_per_row):
+            raise InvalidSeat(label)
+        index = (row - 1) * section.seats_per_row + (seat - 1)
+        if (section.id, index) in seen:
+            raise InvalidSeat(label)
+        seen.add((section.id, index))
+        positions.append((section, index))
+    return positions
+
+
+def _ensure_seat_maps(event_id, section_ids):
+    """Пустые карты секторов мероприятия, которых ещё нет.
+
+    Пустая битовая карта означает, что все места свободны: байты
+    дописываются при первом занятии места.
+    """
+    existing = set(db.session.execute(
+        select(EventSeatMap.section_id).where(
+            EventSeatMap.event_id == event_id,
+            EventSeatMap.section_id.in_(section_ids)
+        )
+    ).scalars())
+    missing = [section_id for section_id in section_ids if section_id not in existing]
+    if not missing:
+        return
+    rows = select(
+        literal(event_id), VenueSection.id, literal(b''), VenueSection.rows * VenueSection.seats_per_row, literal(0)
+    ).where(VenueSection.id.in_(missing))
+    columns = ['event_id', 'section_id', 'taken', 'free_seats', 'version']
+
+    dialect = db.session.get_bind().dialect.name
+    if dialect in ('postgresql', 'sqlite'):
+        insert_ = postgresql.insert if dialect == 'postgresql' else sqlite.insert
+        db.session.execute(insert_(EventSeatMap).from_select(columns, rows).on_conflict_do_nothing())
+    else:
+        db.session.execute(insert(EventSeatMap).from_select(columns, rows))
+
+
+def _lock_seat_maps(event_id, section_ids):
+    """{section_id: (taken, free_seats, version)} с блокировкой строк в порядке section_id"""
+    rows = db.session.execute(
+        select(EventSeatMap.section_id, EventSeatMap.taken, EventSeatMap.free_seats, EventSeatMap.version)
+        .where(EventSeatMap.event_id == event_id, EventSeatMap.section_id.in_(section_ids))
+        .order_by(EventSeatMap.section_id)
+        .with_for_update()
+    ).all()
+    return {row.section_id: (bytearray(row.taken), row.free_seats, row.version) for row in rows}
+
+
+def _write_seat_map(event_id, section_id, taken, free_seats, version):
+    """Запись изменённой карты; версия защищает от потерянного обновления
+    на базах без SELECT ... FOR UPDATE"""
+    result = db.session.execute(
+        update(EventSeatMap)
+        .where(
+            EventSeatMap.event_id == event_id,
+            EventSeatMap.section_id == section_id,
+            EventSeatMap.version == version
+        )
+        .values(taken=bytes(taken), free_seats=free_seats, version=version + 1)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 1
+
+
+def _first_free(sections, maps, count):
+    """count первых свободных мест по порядку секторов (заполненные байты
+    карты пропускаются целиком); NotEnoughSeats, если столько мест нет"""
+    positions = []
+    for section in sections:
+        taken, free_seats, _ = maps[section.id]
+        index = 0
+        while index < section.capacity and free_seats > 0 and len(positions) < count:
+            if index & 7 == 0 and index >> 3 < len(taken) and taken[index >> 3] == 0xFF:
+                index += 8
+                continue
+            if not is_taken(taken, index):
+                positions.append((section, index))
+                free_seats -= 1
+            index += 1
+        if len(positions) == count:
+            return positions
+    raise NotEnoughSeats(count)
+
+
+def _take_positions(event_id, positions, maps, single):
+    """Отметка мест [(section, index)] в заблокированных картах и их запись"""
+    by_section = {}
+    for section, index in positions:
+        by_section.setdefault(section.id, (section, []))[1].append(index)
+    for section_id in sorted(by_section):
+        section, indexes = by_section[section_id]
+        taken, free_seats, version = maps[section_id]
+        size = (section.capacity + 7) >> 3
+        if len(taken) < size:
+            taken.extend(bytes(size - len(taken)))
+        for index in indexes:
+            taken[index >> 3] |= 1 << (index & 7)
+        if not _write_seat_map(event_id, section_id, taken, free_seats - len(indexes), version):
+            raise SeatsTaken([seat_label(section, index, single) for index in indexes])
+
+
+def reserve_seat_labels(event_id, venue_id, labels):
+    """Атомарное занятие конкретных мест мероприятия (в текущей транзакции).
+
+    Карты затронутых секторов блокируются в порядке section_id, поэтому
+    параллельные покупатели не продадут одно место дважды и не попадут во
+    взаимную блокировку. InvalidSeat - номер не из схемы, SeatsTaken - часть
+    мест занята (транзакцию нужно откатить). Возвращает [(section_id, index)]
+    для assign_booking_seats или None, если у площадки нет схемы.
+    """
+    sections = get_sections(venue_id)
+    if not sections:
+        return None
+    positions = parse_seat_labels(sections, labels)
+    single = len(sections) == 1
+
+    section_ids = sorted({section.id for section, _ in positions})
+    _ensure_seat_maps(event_id, section_ids)
+    maps = _lock_seat_maps(event_id, section_ids)
+
+    taken_labels = [
+        seat_label(section, index, single)
+        for section, index in positions
+        if is_taken(maps[section.id][0], index)
+    ]
+    if taken_labels:
+        raise SeatsTaken(taken_labels)
+
+    _take_positions(event_id, positions, maps, single)
+    return [(section.id, index) for section, index in positions]
+
+
+def reserve_any_seats(event_id, venue_id, count):
+    """Занятие count первых свободных мест для бронирования без номеров мест
+    (в текущей транзакции), чтобы карты секторов не расходились с остатком.
+
+    Возвращает [(section_id, index)] для assign_booking_seats или None, если
+    у площадки нет схемы; NotEnoughSeats, если в картах меньше count мест.
+    """
+    sections = get_sections(venue_id)
+    if not sections:
+        return None
+    section_ids = sorted(section.id for section in sections)
+    _ensure_seat_maps(event_id, section_ids)
+    maps = _lock_seat_maps(event_id, section_ids)
+    positions = _first_free(sections, maps, count)
+    _take_positions(event_id, positions, maps, len(sections) == 1)
+    return [(section.id, index) for section, index in positions]
+
+
+def rebuild_seat_maps(event_id, venue_id):
+    """Карты мест мероприятия после смены площадки (в текущей транзакции).
+
+    Места старой схемы снимаются, а подтверждённым бронированиям и активным
+    удержаниям по порядку назначаются места схемы новой площадки.
+    NotEnoughSeats, если в новой схеме меньше мест, чем уже продано.
+    """
+    drop_seat_maps(event_id)
+    sections = get_sections(venue_id)
+    if not sections:
+        return
+    holders = db.session.execute(
+        select(Booking.id, literal(None, Integer), Booking.seats)
+        .where(Booking.event_id == event_id, Booking.status == 'confirmed')
+        .union_all(
+            select(literal(None, Integer), SeatHold.id, SeatHold.seats)
+            .where(SeatHold.event_id == event_id, SeatHold.status == 'active')
+        )
+    ).all()
+    if not holders:
+        return
+
+    section_ids = sorted(section.id for section in sections)
+    _ensure_seat_maps(event_id, section_ids)
+    maps = _lock_seat_maps(event_id, section_ids)
+    positions = _first_free(sections, maps, sum(seats for _, _, seats in holders))
+    _take_positions(event_id, positions, maps, len(sections) == 1)
+    free = iter(positions)
+    rows = [
+        {'event_id': event_id, 'section_id': section.id, 'seat_index': index,
+         'booking_id': booking_id, 'hold_id': hold_id}
+        for booking_id, hold_id, seats in holders
+        for section, index in (next(free) for _ in range(seats))
+    ]
+    db.session.execute(insert(BookingSeat), rows)
+
+
+def assign_booking_seats(booking_id, event_id, positions, hold_id=None):
+    """Привязка занятых reserve_seat_labels мест к бронированию или удержанию"""
+    if not positions:
+        return
+    db.session.execute(insert(BookingSeat), [
+        {'event_id': event_id, 'section_id': section_id, 'seat_index': index,
+         'booking_id': booking_id, 'hold_id': hold_id}
+        for section_id, index in positions
+    ])
+
+
+def confirm_hold_seats(hold_id, booking_id):
+    """Передача мест подтверждённого удержания бронированию"""
+    db.session.execute(
+        update(BookingSeat)
+        .where(BookingSeat.hold_id == hold_id)
+        .values(booking_id=booking_id)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def release_booking_seats(booking_ids):
+    """Освобождение мест бронирований (в текущей транзакции)"""
+    if booking_ids:
+        _release_seats(BookingSeat.booking_id.in_(booking_ids))
+
+
+def release_hold_seats(hold_ids):
+    """Освобождение мест неподтверждённых удержаний (в текущей транзакции)"""
+    if hold_ids:
+        _release_seats(and_(BookingSeat.hold_id.in_(hold_ids), BookingSeat.booking_id.is_(None)))
+
+
+def _release_seats(condition):
+    """Строки booking_seats удаляются одним DELETE ... RETURNING, биты
+    сбрасываются в заблокированных картах секторов"""
+    released = db.session.execute(
+        delete(BookingSeat)
+        .where(condition)
+        .returning(BookingSeat.event_id, BookingSeat.section_id, BookingSeat.seat_index)
+    ).all()
+    by_event = {}
+    for event_id, section_id, index in released:
+        by_event.setdefault(event_id, {}).setdefault(section_id, []).append(index)
+
+    for event_id, sections in sorted(by_event.items()):
+        maps = _lock_seat_maps(event_id, sorted(sections))
+        for section_id, indexes in sorted(sections.items()):
+            taken, free_seats, version = maps[section_id]
+            for index in indexes:
+                if index >> 3 < len(taken):
+                    taken[index >> 3] &= ~(1 << (index & 7)) & 0xFF
+            if not _write_seat_map(event_id, section_id, taken, free_seats + len(indexes), version):
+                raise RuntimeError(f'Карта мест {event_id}/{section_id} изменена параллельно')
+
+
+def booking_seat_labels(booking_ids):
+    """{booking_id: [номера мест]} для списка бронирований"""
+    if not booking_ids:
+        return {}
+    rows = db.session.execute(
+        select(BookingSeat.booking_id, BookingSeat.seat_index, VenueSection)
+        .join(VenueSection, VenueSection.id == BookingSeat.section_id)
+        .where(BookingSeat.booking_id.in_(booking_ids))
+        .order_by(BookingSeat.booking_id, VenueSection.position, BookingSeat.seat_index)
+    ).all()
+    single_venues = {
+        venue_id for venue_id, count in db.session.execute(
+            select(VenueSection.venue_id, db.func.count())
+            .where(VenueSection.venue_id.in_({section.venue_id for _, _, section in rows}))
+            .group_by(VenueSection.venue_id)
+        ) if count == 1
+    }
+    result = {}
+    for booking_id, index, section in rows:
+        result.setdefault(booking_id, []).append(seat_label(section, index, section.venue_id in single_venues))
+    return result
+
+
+def drop_seat_maps(event_id):
+    """Удаление карт и мест удаляемого мероприятия"""
+    db.session.execute(delete(BookingSeat).where(BookingSeat.event_id == event_id))
+    db.session.execute(delete(EventSeatMap).where(EventSeatMap.event_id == event_id))
+
+
+def seat_availability(event_id, venue_id):
+    """Схема и занятость мест мероприятия одним запросом.
+
+    taken - битовая карта в base64 (бит i байта i // 8 - место с номером i,
+    1 - занято; недостающие в конце байты - свободные места). Для стадиона
+    на 50 000 мест это около 8 КБ.
+    """
+    rows = db.session.execute(
+        select(VenueSection, EventSeatMap.taken, EventSeatMap.free_seats)
+        .outerjoin(EventSeatMap, and_(
+            EventSeatMap.section_id == VenueSection.id,
+            EventSeatMap.event_id == event_id
+        ))
+        .where(VenueSection.venue_id == venue_id)
+        .order_by(VenueSection.position, VenueSection.id)
+    ).all()
+    return [
+        {
+            'id': section.id,
+            'code': section.code,
+            'name': section.name,
+            'rows': section.rows,
+            'seats_per_row': section.seats_per_row,
+            'free': section.capacity if free_seats is None else free_seats,
+            'taken': base64.b64encode(taken or b'').decode('ascii')
+        }
+        for section, taken, free_seats in rows
+    ]
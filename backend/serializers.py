@@ -0,0 +1,101 @@
+import enum
+from datetime import date, datetime
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # без orjson ответы кодирует стандартный json с тем же форматом
+    orjson = None
+
+# Преобразования значения столбца в скомпилированной функции ({} - значение)
+FIELD_FORMATS = {
+    None: '{}',
+    'enum': '{}.value',
+    'date': '{}.date().isoformat()',  # DateTime-столбец, в ответе только дата
+    'datetime': "{}.isoformat(' ', 'seconds')",
+}
+
+
+def _nullable(column):
+    return getattr(getattr(column, 'expression', column), 'nullable', True)
+
+
+def compile_serializer(fields):
+    """Функция row -> dict под конкретный набор полей.
+
+    Код собирается один раз: dict-литерал с обращениями к row по индексу и
+    встроенными преобразованиями, без цикла по полям и вызовов на каждое поле.
+    """
+    items = []
+    for index, (name, column, *options) in enumerate(fields):
+        field_format = options[0] if options else None
+        value = f'row[{index}]'
+        expression = FIELD_FORMATS[field_format].format(value)
+        if field_format is not None and _nullable(column):
+            expression = f'(None if {value} is None else {expression})'
+        items.append(f'{name!r}: {expression}')
+    source = 'def serialize(row):\n    return {' + ', '.join(items) + '}\n'
+    namespace = {}
+    exec(compile(source, f'<projection {",".join(field[0] for field in fields)}>', 'exec'), namespace)
+    return namespace['serialize']
+
+
+class Projection:
+    """Столбцы ответа списка и скомпилированное преобразование строки в dict.
+
+    fields - кортежи (имя, столбец или SQL-выражение[, формат]), формат - ключ
+    FIELD_FORMATS. Запрос выбирает только columns (без ORM-объектов и
+    ненужных Text-столбцов), строки результата доступны и по именам полей.
+    """
+
+    def __init__(self, *fields):
+        self.fields = fields
+        self.names = tuple(field[0] for field in fields)
+        self.columns = [field[1].label(field[0]) for field in fields]
+        self.serialize = compile_serializer(fields)
+
+    def extend(self, *fields):
+        return Projection(*self.fields, *fields)
+
+    def serialize_all(self, rows):
+        serialize = self.serialize
+        return [serialize(row) for row in rows]
+
+
+def json_default(value):
+    """Даты - в формате API, перечисления - значением, остальное - как во Flask"""
+    if isinstance(value, datetime):
+        return value.isoformat(' ', 'seconds')
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, enum.Enum):
+        return value.value
+    return DefaultJSONProvider.default(value)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """jsonify через orjson: ответ сразу собирается в bytes, перечисления
+    кодируются без default. Без orjson - стандартный json с json_default."""
+
+    default = staticmethod(json_default)
+
+    def encode(self, obj, indent=False):
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=json_default, option=option)
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None or kwargs:
+            return super().dumps(obj, **kwargs)
+        return self.encode(obj).decode()
+
+    def response(self, *args, **kwargs):
+        if orjson is None:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = self.compact is False or (self.compact is None and self._app.debug)
+        return self._app.response_class(self.encode(obj, indent) + b'\n', mimetype=self.mimetype)
@@ -0,0 +1,267 @@
+import os
+import random
+import threading
+import time
+from datetime import datetime, date
+
+from sqlalchemy import select, delete, insert, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+from database import db
+from models import (
+    Booking, User, UserRole, BookingDailyStats, EventBookingStats, UserBookingStats, MonthlySignupStats,
+    UserRoleStats
+)
+
+# Число шардов дневного счётчика бронирований
+STATS_SHARDS = int(os.getenv("STATS_SHARDS", "8"))
+# Как часто (в секундах) сворачивать шарды прошедших дней
+STATS_COMPACTION_INTERVAL = float(os.getenv("STATS_COMPACTION_INTERVAL", "3600"))
+
+_compaction_lock = threading.Lock()
+_last_compaction = 0.0
+
+
+def _as_date(value):
+    # SQLite возвращает date() строкой
+    return date.fromisoformat(value) if isinstance(value, str) else value
+
+
+def _month(value):
+    return value.strftime('%Y-%m')
+
+
+def add_to_counters(model, column, deltas, connection=None):
+    """Прибавление deltas {ключ первичного ключа: дельта} к счётчику column.
+
+    Один INSERT ... ON CONFLICT DO UPDATE на все ключи; ключи
+    сортируются, чтобы параллельные транзакции блокировали строки в одном
+    порядке. connection - соединение сессии, если вызов идёт из событий
+    flush; по умолчанию используется db.session.
+    """
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    table = model.__table__
+    key_columns = [c.name for c in table.primary_key.columns]
+    rows = [dict(zip(key_columns, key), **{column: delta}) for key, delta in sorted(deltas.items())]
+    executor = connection if connection is not None else db.session
+
+    dialect = (connection if connection is not None else db.session.get_bind()).dialect.name
+    if dialect in ('postgresql', 'sqlite'):
+        insert_ = postgresql.insert if dialect == 'postgresql' else sqlite.insert
+        statement = insert_(table).values(rows)
+        executor.execute(statement.on_conflict_do_update(
+            index_elements=key_columns,
+            set_={column: table.c[column] + statement.excluded[column]}
+        ))
+        return
+
+    for row in rows:
+        result = executor.execute(
+            update(table)
+            .where(*(table.c[name] == row[name] for name in key_columns))
+            .values({column: table.c[column] + row[column]})
+        )
+        if result.rowcount == 0:
+            executor.execute(insert(table).values(row))
+
+
+def _add_daily(deltas):
+    """deltas {(день, статус): дельта} в случайный шард дневного счётчика"""
+    shard = random.randrange(STATS_SHARDS) if STATS_SHARDS > 1 else 0
+    add_to_counters(BookingDailyStats, 'count', {
+        (day, status, shard): delta for (day, status), delta in deltas.items()
+    })
+
+
+def record_booking_created(booking):
+    """Учёт нового бронирования (в текущей транзакции)"""
+    record_bookings_created([booking])
+
+
+def record_bookings_created(bookings):
+    """Учёт новых бронирований (объекты или строки с полями Booking):
+    по одному upsert на каждый агрегат"""
+    daily, events, users = {}, {}, {}
+    for booking in bookings:
+        key = ((booking.created_at or datetime.utcnow()).date(), booking.status or 'confirmed')
+        daily[key] = daily.get(key, 0) + 1
+        events[(booking.event_id,)] = events.get((booking.event_id,), 0) + 1
+        users[(booking.user_id,)] = users.get((booking.user_id,), 0) + 1
+    _add_daily(daily)
+    add_to_counters(EventBookingStats, 'bookings_count', events)
+    add_to_counters(UserBookingStats, 'bookings_count', users)
+
+
+def record_status_change(created_at_values, old_status, new_status):
+    """Учёт смены статуса бронирований, созданных в created_at_values"""
+    deltas = {}
+    for created_at in created_at_values:
+        day = (created_at or datetime.utcnow()).date()
+        deltas[(day, old_status)] = deltas.get((day, old_status), 0) - 1
+        deltas[(day, new_status)] = deltas.get((day, new_status), 0) + 1
+    _add_daily(deltas)
+
+
+def record_bookings_deleted(condition):
+    """Учёт бронирований, которые будут удалены (вызывать до удаления)"""
+    day = db.func.date(Booking.created_at)
+    daily = db.session.execute(
+        select(day, Booking.status, db.func.count()).where(condition).group_by(day, Booking.status)
+    ).all()
+    _add_daily({(_as_date(d), status): -count for d, status, count in daily if d is not None})
+
+    for column, model in ((Booking.event_id, EventBookingStats), (Booking.user_id, UserBookingStats)):
+        counts = db.session.execute(
+            select(column, db.func.count()).where(condition).group_by(column)
+        ).all()
+        add_to_counters(model, 'bookings_count', {(key,): -count for key, count in counts})
+
+
+def forget_event(event_id):
+    """Удаление счётчика удалённого мероприятия"""
+    db.session.execute(delete(EventBookingStats).where(EventBookingStats.event_id == event_id))
+
+
+def _role(user):
+    return (user.role or UserRole.user).name
+
+
+def record_user_created(user):
+    add_to_counters(MonthlySignupStats, 'count', {(_month(user.created_at or datetime.utcnow()),): 1})
+    add_to_counters(UserRoleStats, 'count', {(_role(user),): 1})
+
+
+def record_role_change(old_role, new_role):
+    """Учёт смены роли пользователя (строка пользователя должна быть заблокирована)"""
+    if old_role != new_role:
+        add_to_counters(UserRoleStats, 'count', {(old_role.name,): -1, (new_role.name,): 1})
+
+
+def record_user_deleted(user):
+    """Учёт удаления пользователя вместе с его бронированиями"""
+    record_bookings_deleted(Booking.user_id == user.id)
+    db.session.execute(delete(UserBookingStats).where(UserBookingStats.user_id == user.id))
+    if user.created_at is not None:
+        add_to_counters(MonthlySignupStats, 'count', {(_month(user.created_at),): -1})
+    add_to_counters(UserRoleStats, 'count', {(_role(user),): -1})
+
+
+def compact_booking_daily_stats():
+    """Сворачивание шардов прошедших дней в шард 0 (в текущей транзакции).
+
+    DELETE ... RETURNING забирает значения атомарно, поэтому параллельное
+    увеличение счётчика либо попадёт в свёрнутую сумму, либо создаст новую
+    строку шарда.
+    """
+    removed = db.session.execute(
+        delete(BookingDailyStats)
+        .where(BookingDailyStats.shard > 0, BookingDailyStats.day < datetime.utcnow().date())
+        .returning(BookingDailyStats.day, BookingDailyStats.status, BookingDailyStats.count)
+    ).all()
+    deltas = {}
+    for day, status, count in removed:
+        deltas[(day, status, 0)] = deltas.get((day, status, 0), 0) + count
+    add_to_counters(BookingDailyStats, 'count', deltas)
+
+
+def maybe_compact():
+    """Периодическое сворачивание шардов (не чаще STATS_COMPACTION_INTERVAL)"""
+    global _last_compaction
+    now = time.monotonic()
+    if now - _last_compaction < STATS_COMPACTION_INTERVAL or not _compaction_lock.acquire(blocking=False):
+        return
+    try:
+        _last_compaction = now
+        compact_booking_daily_stats()
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        print(f"Stats compaction failed: {e}")
+    finally:
+        _compaction_lock.release()
+
+
+def rebuild_stats():
+    """Полный пересчёт агрегатов по bookings и users"""
+    for model in (BookingDailyStats, EventBookingStats, UserBookingStats, MonthlySignupStats, UserRoleStats):
+        db.session.execute(delete(model))
+
+    day = db.func.date(Booking.created_at)
+    db.session.execute(insert(BookingDailyStats).from_select(
+        ['day', 'status', 'shard', 'count'],
+        select(day, Booking.status, db.literal(0), db.func.count())
+        .where(Booking.created_at.isnot(None))
+        .group_by(day, Booking.status)
+    ))
+    for column, model, key in ((Booking.event_id, EventBookingStats, 'event_id'),
+                               (Booking.user_id, UserBookingStats, 'user_id')):
+        db.session.execute(insert(model).from_select(
+            [key, 'bookings_count'],
+            select(column, db.func.count()).group_by(column)
+        ))
+
+    if db.session.get_bind().dialect.name == 'sqlite':
+        month = db.func.strftime('%Y-%m', User.created_at)
+    else:
+        month = db.func.to_char(User.created_at, 'YYYY-MM')
+    db.session.execute(insert(MonthlySignupStats).from_select(
+        ['month', 'count'],
+        select(month, db.func.count()).where(User.created_at.isnot(None)).group_by(month)
+    ))
+    db.session.execute(insert(UserRoleStats).from_select(
+        ['role', 'count'],
+        select(User.role, db.func.count()).group_by(User.role)
+    ))
+    db.session.commit()
+
+
+def backfill_stats():
+    """Пересчёт агрегатов, если они ещё не заполнены (первый запуск или
+    новый агрегат после миграции)"""
+    empty = any(
+        db.session.execute(select(key).limit(1)).first() is None
+        for key in (MonthlySignupStats.month, UserRoleStats.role)
+    )
+    if empty and db.session.execute(select(User.id).limit(1)).first() is not None:
+        rebuild_stats()
+
+
+def booking_status_totals():
+    rows = db.session.execute(
+        select(BookingDailyStats.status, db.func.sum(BookingDailyStats.count))
+        .group_by(BookingDailyStats.status)
+    ).all()
+    return {status: int(count) for status, count in rows if count}
+
+
+def daily_booking_counts(since):
+    rows = db.session.execute(
+        select(BookingDailyStats.day, db.func.sum(BookingDailyStats.count))
+        .where(BookingDailyStats.day >= since)
+        .group_by(BookingDailyStats.day)
+    ).all()
+    return {str(day): int(count) for day, count in rows if count}
+
+
+def top_booked(model, limit=5):
+    """[(id, bookings_count)] из EventBookingStats или UserBookingStats"""
+    key = model.event_id if model is EventBookingStats else model.user_id
+    return db.session.execute(
+        select(key, model.bookings_count)
+        .where(model.bookings_count > 0)
+        .order_by(model.bookings_count.desc(), key)
+        .limit(limit)
+    ).all()
+
+
+def user_role_totals():
+    """{имя роли: количество пользователей}"""
+    rows = db.session.execute(select(UserRoleStats.role, UserRoleStats.count))
+    return {role: count for role, count in rows if count}
+
+
+def monthly_signups():
+    rows = db.session.execute(select(MonthlySignupStats.month, MonthlySignupStats.count))
+    return {month: count for month, count in rows if count}
@@ -0,0 +1,91 @@
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Отдельная база SQLite и без фоновых потоков: настройки читаются при импорте приложения
+DATA_DIR = tempfile.mkdtemp(prefix='quicket-tests-')
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(DATA_DIR, 'test.db')
+# Вторая база SQLite подключается как реплика replica_0; чтение на неё идёт
+# только в тестах, включивших маршрутизацию (фикстура replica в test_replicas.py)
+os.environ['DATABASE_REPLICA_URLS'] = 'sqlite:///' + os.path.join(DATA_DIR, 'replica.db')
+os.environ['REPLICA_HEALTH_INTERVAL'] = '0'
+# Превышение QUERY_BUDGETS завершает запрос исключением, и тест падает
+os.environ.setdefault('QUERY_GUARD', 'raise')
+for name in ('SEAT_HOLD_SWEEP_INTERVAL', 'OUTBOX_POLL_INTERVAL', 'BACKGROUND_JOB_SWEEP_INTERVAL'):
+    os.environ[name] = '0'
+sys.path.insert(0, BACKEND_DIR)
+
+from app import app, generate_jwt_token, hash_password  # noqa: E402
+from cache import response_cache  # noqa: E402
+from database import db  # noqa: E402
+from models import Venue, Event, EventType, EventStatus, EventInventory, EventMedia, User, UserRole  # noqa: E402
+from replicas import replica_router  # noqa: E402
+
+REPLICA_BIND_KEYS = replica_router.bind_keys
+replica_router.bind_keys = []
+
+
+@pytest.fixture
+def client():
+    """Тестовый клиент на пустой схеме; кэш ответов сбрасывается между тестами"""
+    app.config['TESTING'] = True
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        response_cache.clear()
+        yield app.test_client()
+        db.session.remove()
+
+
+def make_user(username, role):
+    """Пользователь и заголовки с его JWT"""
+    user = User(username=username, email=f'{username}@example.com', password=hash_password('secret'), role=role)
+    db.session.add(user)
+    db.session.commit()
+    return {'id': user.id, 'headers': {'Authorization': 'Bearer ' + generate_jwt_token(user.id, role.value)}}
+
+
+@pytest.fixture
+def buyer(client):
+    return make_user('buyer', UserRole.user)
+
+
+@pytest.fixture
+def admin(client):
+    return make_user('admin', UserRole.admin)
+
+
+@pytest.fixture
+def add_events(client):
+    """Фабрика add_events(count, images=2, seats=100): count предстоящих
+    мероприятий на одной площадке, у каждого images изображений EventMedia
+    (первое - обложка). Возвращает созданные мероприятия."""
+    venue = Venue(name='Arena', address='Almaty', capacity=1000)
+    db.session.add(venue)
+    start = datetime.utcnow() + timedelta(days=1)
+    created = []
+
+    def add(count, images=2, seats=100):
+        events = []
+        for i in range(len(created), len(created) + count):
+            event = Event(
+                title=f'Event {i}', type=EventType.CONCERT, status=EventStatus.UPCOMING, venue=venue,
+                date=start + timedelta(hours=i), time='18:00', duration=90, total_seats=seats, price=1000
+            )
+            event.inventory = EventInventory(remaining_seats=seats)
+            event.media = [
+                EventMedia(media_type='image', media_url=f'cover-{i}.jpg' if n == 0 else f'extra-{i}-{n}.jpg')
+                for n in range(images)
+            ]
+            events.append(event)
+        db.session.add_all(events)
+        db.session.commit()
+        created.extend(events)
+        return events
+
+    return add
@@ -0,0 +1,34 @@
+from database import db
+from inventory import get_remaining_seats
+from models import Booking, OutboxMessage, EventBookingStats
+
+
+def test_batch_books_all_events(client, add_events, buyer):
+    first, second = add_events(2, seats=5)
+    response = client.post('/api/bookings/batch', json={'items': [
+        {'event_id': first.id, 'seats': 2}, {'event_id': second.id, 'seats': 3}
+    ]}, headers=buyer['headers'])
+
+    assert response.status_code == 200, response.get_json()
+    assert [(item['event_id'], item['seats']) for item in response.json['bookings']] == [(first.id, 2), (second.id, 3)]
+    assert (get_remaining_seats(first.id), get_remaining_seats(second.id)) == (3, 2)
+    assert OutboxMessage.query.count() == 1
+
+
+def test_batch_rolls_back_when_one_event_is_short(client, add_events, buyer):
+    first, short, third = add_events(3, seats=5)
+    response = client.post('/api/bookings/batch', json={'items': [
+        {'event_id': first.id, 'seats': 2},
+        {'event_id': short.id, 'seats': 6},
+        {'event_id': third.id, 'seats': 1}
+    ]}, headers=buyer['headers'])
+
+    assert response.status_code == 409
+    assert response.json['errors'] == [
+        {'index': 1, 'event_id': short.id, 'message': 'Недостаточно мест. Доступно: 5'}
+    ]
+    db.session.expire_all()
+    assert [get_remaining_seats(event.id) for event in (first, short, third)] == [5, 5, 5]
+    assert Booking.query.count() == 0
+    assert OutboxMessage.query.count() == 0
+    assert EventBookingStats.query.count() == 0
@@ -0,0 +1,135 @@
+import io
+import json
+
+import pytest
+
+import event_import
+from database import db
+from event_import import import_events
+from models import Event, Venue
+
+CSV_HEADER = 'title,type,date,time,total_seats,price,venue\n'
+
+
+def csv_row(title, seats=100, date='2030-01-15', venue='Arena'):
+    return f'{title},concert,{date},19:00,{seats},1500,{venue}\n'
+
+
+def jsonl_row(title, **overrides):
+    data = {'title': title, 'type': 'concert', 'date': '2030-01-15', 'time': '19:00',
+            'total_seats': 100, 'price': 1500, 'venue': 'Arena'}
+    data.update(overrides)
+    return json.dumps(data, ensure_ascii=False) + '\n'
+
+
+class BrokenStream(io.BytesIO):
+    """Поток, чтение которого обрывается после break_after строк"""
+
+    def __init__(self, data, break_after):
+        super().__init__(data)
+        self.lines_left = break_after
+
+    def __next__(self):
+        if self.lines_left == 0:
+            raise OSError('connection reset')
+        self.lines_left -= 1
+        return super().__next__()
+
+
+def admin_import(client, admin, body, import_format, dry_run=False):
+    url = f'/api/admin/events/import?format={import_format}' + ('&dry_run=true' if dry_run else '')
+    return client.post(url, data=body, headers=admin['headers'])
+
+
+@pytest.fixture
+def venue(client):
+    venue = Venue(name='Arena', address='Almaty', capacity=1000)
+    db.session.add(venue)
+    db.session.commit()
+    return venue
+
+
+def imported_titles():
+    return sorted(db.session.execute(db.select(Event.title)).scalars())
+
+
+def test_csv_error_rows_and_counts(client, admin, venue):
+    body = (CSV_HEADER + csv_row('Good 1') + csv_row('Bad date', date='15.01.2030')
+            + csv_row('Bad seats', seats='many') + csv_row('Good 2') + csv_row('No venue', venue='Nowhere'))
+    response = admin_import(client, admin, body.encode(), 'csv')
+
+    assert response.status_code == 200
+    assert response.json['success'] is False
+    assert response.json['imported'] == 2
+    assert response.json['failed'] == 3
+    assert response.json['errors_truncated'] is False
+    # Номер строки файла: заголовок - строка 1
+    assert response.json['errors'] == [
+        {'row': 3, 'message': 'Дата должна быть в формате YYYY-MM-DD'},
+        {'row': 4, 'message': 'Поле total_seats должно быть числом'},
+        {'row': 6, 'message': 'Площадка "Nowhere" не найдена'}
+    ]
+    assert imported_titles() == ['Good 1', 'Good 2']
+
+
+def test_jsonl_error_rows_and_counts(client, admin, venue):
+    body = (jsonl_row('Good 1') + '{not json\n' + '[1, 2]\n' + '\n'
+            + jsonl_row('Bad type', type='opera') + jsonl_row('Good 2', venue=None, venue_id=venue.id))
+    response = admin_import(client, admin, body.encode(), 'jsonl')
+
+    assert response.json['imported'] == 2
+    assert response.json['failed'] == 3
+    errors = {error['row']: error['message'] for error in response.json['errors']}
+    assert sorted(errors) == [2, 3, 5]
+    assert errors[2].startswith('Неверный JSON')
+    assert errors[3] == 'Строка должна быть JSON-объектом'
+    assert errors[5] == 'Неверный тип мероприятия: opera'
+    assert imported_titles() == ['Good 1', 'Good 2']
+
+
+def test_dry_run_counts_without_writing(client, admin, venue):
+    body = CSV_HEADER + csv_row('Good 1') + csv_row('Bad', seats=0)
+    response = admin_import(client, admin, body.encode(), 'csv', dry_run=True)
+
+    assert response.json['dry_run'] is True
+    assert (response.json['imported'], response.json['failed']) == (1, 1)
+    assert imported_titles() == []
+
+
+def test_error_report_is_truncated(client, venue, monkeypatch):
+    monkeypatch.setattr(event_import, 'IMPORT_MAX_ERRORS', 2)
+    body = CSV_HEADER + ''.join(csv_row(f'Bad {i}', seats=0) for i in range(5)) + csv_row('Good')
+    report = import_events(io.BytesIO(body.encode()), 'csv').as_dict()
+
+    assert (report['imported'], report['failed']) == (1, 5)
+    assert [error['row'] for error in report['errors']] == [2, 3]
+    assert report['errors_truncated'] is True
+
+
+@pytest.mark.parametrize('import_format', ['csv', 'jsonl'])
+def test_mid_file_decode_error_keeps_other_rows(client, venue, monkeypatch, import_format):
+    # Порции по 2 строки: первые порции записаны до строки с неверной кодировкой
+    monkeypatch.setattr(event_import, 'IMPORT_CHUNK_SIZE', 2)
+    row = csv_row if import_format == 'csv' else jsonl_row
+    header = CSV_HEADER.encode() if import_format == 'csv' else b''
+    body = (header + b''.join(row(f'Good {i}').encode() for i in range(3))
+            + row('Broken').encode().replace(b'Broken', b'Broken \xff\xfe')
+            + row('Good 3').encode())
+    report = import_events(io.BytesIO(body), import_format).as_dict()
+
+    broken_line = 5 if import_format == 'csv' else 4
+    assert (report['imported'], report['failed']) == (4, 1)
+    assert report['errors'] == [{'row': broken_line, 'message': 'Строка не в кодировке UTF-8'}]
+    assert imported_titles() == ['Good 0', 'Good 1', 'Good 2', 'Good 3']
+
+
+def test_interrupted_read_keeps_written_chunks(client, venue, monkeypatch):
+    monkeypatch.setattr(event_import, 'IMPORT_CHUNK_SIZE', 2)
+    body = CSV_HEADER + ''.join(csv_row(f'Good {i}') for i in range(6))
+    # Заголовок и три строки: первая порция записана, третья строка ещё в буфере
+    report = import_events(BrokenStream(body.encode(), break_after=4), 'csv').as_dict()
+
+    assert (report['imported'], report['failed']) == (3, 1)
+    assert report['errors'] == [{'row': 5, 'message': 'Чтение файла прервано: connection reset'}]
+    assert imported_titles() == ['Good 0', 'Good 1', 'Good 2']
+
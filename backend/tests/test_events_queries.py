@@ -0,0 +1,27 @@
+from cache import response_cache
+from query_guard import count_queries
+
+# Мероприятий на странице каталога при первом и втором замере
+SMALL, LARGE = 10, 50
+
+
+def catalog_queries(client):
+    response_cache.clear()
+    with count_queries() as queries:
+        response = client.get('/api/events?limit=100')
+    assert response.status_code == 200
+    return queries.count, response.json['events']
+
+
+def test_catalog_query_count_does_not_grow_with_events(client, add_events):
+    # Обложка каждого мероприятия - первое изображение EventMedia, image_url не задан
+    add_events(SMALL)
+    small_count, events = catalog_queries(client)
+    assert len(events) == SMALL
+
+    add_events(LARGE - SMALL)
+    large_count, events = catalog_queries(client)
+    assert len(events) == LARGE
+
+    assert 0 < large_count == small_count
+    assert all(event['image_url'].startswith('cover-') for event in events)
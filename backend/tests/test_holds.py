@@ -0,0 +1,91 @@
+from datetime import datetime, timedelta
+
+from database import db
+from holds import claim_hold, expire_holds, sweep_expired_holds
+from inventory import get_remaining_seats
+from models import Booking, SeatHold
+
+
+def create_hold(client, buyer, event_id, seats=2):
+    response = client.post('/api/holds', json={'event_id': event_id, 'seats': seats}, headers=buyer['headers'])
+    assert response.status_code == 200, response.get_json()
+    return response.json['hold']['id']
+
+
+def expire(hold_id):
+    SeatHold.query.filter_by(id=hold_id).update({'expires_at': datetime.utcnow() - timedelta(seconds=1)})
+    db.session.commit()
+
+
+def test_hold_then_confirm_creates_booking(client, add_events, buyer):
+    event = add_events(1, seats=5)[0]
+    hold_id = create_hold(client, buyer, event.id)
+    assert get_remaining_seats(event.id) == 3
+
+    response = client.post(f'/api/holds/{hold_id}/confirm', headers=buyer['headers'])
+    assert response.status_code == 200, response.get_json()
+    booking = db.session.get(Booking, response.json['booking_id'])
+    assert (booking.event_id, booking.seats, booking.status) == (event.id, 2, 'confirmed')
+    hold = db.session.get(SeatHold, hold_id)
+    assert (hold.status, hold.booking_id) == ('confirmed', booking.id)
+    # Места уже списаны удержанием, подтверждение их не списывает повторно
+    assert get_remaining_seats(event.id) == 3
+
+    response = client.post(f'/api/holds/{hold_id}/confirm', headers=buyer['headers'])
+    assert response.status_code == 400
+
+
+def test_claim_hold_checks_owner_and_expiry(client, add_events, buyer, admin):
+    event = add_events(1, seats=5)[0]
+    hold_id = create_hold(client, buyer, event.id)
+    assert not claim_hold(hold_id, admin['id'])
+    expire(hold_id)
+    assert not claim_hold(hold_id, buyer['id'])
+    db.session.rollback()
+    assert db.session.get(SeatHold, hold_id).status == 'active'
+
+
+def test_expire_holds_returns_seats(client, add_events, buyer):
+    event = add_events(1, seats=5)[0]
+    live = create_hold(client, buyer, event.id, seats=1)
+    stale = create_hold(client, buyer, event.id, seats=3)
+    assert get_remaining_seats(event.id) == 1
+    expire(stale)
+
+    count, event_ids = expire_holds()
+    db.session.commit()
+    assert (count, event_ids) == (1, {event.id})
+    assert get_remaining_seats(event.id) == 4
+    db.session.expire_all()
+    assert db.session.get(SeatHold, stale).status == 'expired'
+    assert db.session.get(SeatHold, live).status == 'active'
+    assert expire_holds() == (0, set())
+
+
+def test_sweeper_releases_all_expired_holds(client, add_events, buyer):
+    first, second = add_events(2, seats=5)
+    holds = [create_hold(client, buyer, first.id), create_hold(client, buyer, second.id, seats=5)]
+    for hold_id in holds:
+        expire(hold_id)
+
+    assert sweep_expired_holds() == 2
+    assert (get_remaining_seats(first.id), get_remaining_seats(second.id)) == (5, 5)
+    # Освобождённые места снова можно забронировать
+    response = client.post('/api/bookings', json={'event_id': second.id, 'seats': 5}, headers=buyer['headers'])
+    assert response.status_code == 200, response.get_json()
+
+
+def test_confirm_after_expiry_releases_seats(client, add_events, buyer):
+    event = add_events(1, seats=5)[0]
+    hold_id = create_hold(client, buyer, event.id)
+    expire(hold_id)
+
+    response = client.post(f'/api/holds/{hold_id}/confirm', headers=buyer['headers'])
+    assert response.status_code == 410
+    db.session.expire_all()
+    assert db.session.get(SeatHold, hold_id).status == 'expired'
+    assert get_remaining_seats(event.id) == 5
+    assert Booking.query.count() == 0
+    # Очистка не возвращает места повторно
+    assert sweep_expired_holds() == 0
+    assert get_remaining_seats(event.id) == 5
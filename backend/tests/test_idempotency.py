@@ -0,0 +1,101 @@
+import threading
+import time
+
+import app as app_module
+from app import app
+from database import db
+from inventory import get_remaining_seats
+from models import Booking, IdempotencyKey, OutboxMessage
+
+
+def with_key(headers, key):
+    return {**headers, 'Idempotency-Key': key}
+
+
+def test_replay_returns_stored_response(client, add_events, buyer):
+    event = add_events(1, seats=5)[0]
+    headers = with_key(buyer['headers'], 'booking-1')
+    first = client.post('/api/bookings', json={'event_id': event.id, 'seats': 2}, headers=headers)
+    second = client.post('/api/bookings', json={'event_id': event.id, 'seats': 2}, headers=headers)
+
+    assert first.status_code == second.status_code == 200
+    assert second.json == first.json
+    assert second.headers['Idempotent-Replayed'] == 'true'
+    assert 'Idempotent-Replayed' not in first.headers
+    assert Booking.query.count() == 1 and OutboxMessage.query.count() == 1
+    assert get_remaining_seats(event.id) == 3
+
+
+def test_client_errors_are_replayed(client, buyer):
+    headers = with_key(buyer['headers'], 'missing')
+    assert client.post('/api/bookings', json={'event_id': 999}, headers=headers).status_code == 404
+    response = client.post('/api/bookings', json={'event_id': 999}, headers=headers)
+    assert response.status_code == 404 and response.headers['Idempotent-Replayed'] == 'true'
+
+
+def test_fingerprint_mismatch(client, add_events, buyer, admin):
+    event = add_events(1, seats=5)[0]
+    headers = with_key(buyer['headers'], 'booking-1')
+    assert client.post('/api/bookings', json={'event_id': event.id, 'seats': 1}, headers=headers).status_code == 200
+
+    response = client.post('/api/bookings', json={'event_id': event.id, 'seats': 2}, headers=headers)
+    assert response.status_code == 422
+    # Ключ принадлежит пользователю: у другого пользователя тот же ключ свой
+    response = client.post('/api/bookings', json={'event_id': event.id, 'seats': 2},
+                           headers=with_key(admin['headers'], 'booking-1'))
+    assert response.status_code == 200 and 'Idempotent-Replayed' not in response.headers
+    assert Booking.query.count() == 2
+
+
+def test_server_error_rolls_back_booking_and_key(client, add_events, buyer, monkeypatch):
+    event = add_events(1, seats=5)[0]
+    headers = with_key(buyer['headers'], 'booking-1')
+
+    def fail(booking):
+        raise RuntimeError('stats unavailable')
+
+    monkeypatch.setattr(app_module, 'record_booking_created', fail)
+    response = client.post('/api/bookings', json={'event_id': event.id}, headers=headers)
+    assert response.status_code == 500
+    assert IdempotencyKey.query.count() == 0 and Booking.query.count() == 0
+    assert get_remaining_seats(event.id) == 5
+
+    monkeypatch.undo()
+    response = client.post('/api/bookings', json={'event_id': event.id}, headers=headers)
+    assert response.status_code == 200 and 'Idempotent-Replayed' not in response.headers
+
+
+def test_concurrent_request_waits_for_pending_claim(client, add_events, buyer, monkeypatch):
+    event_id = add_events(1, seats=5)[0].id
+    headers = with_key(buyer['headers'], 'booking-1')
+    entered, release = threading.Event(), threading.Event()
+    notify = app_module.notify_booking_created
+
+    def slow_notify(booking, event):
+        notify(booking, event)
+        entered.set()
+        release.wait(5)
+
+    monkeypatch.setattr(app_module, 'notify_booking_created', slow_notify)
+    responses = {}
+
+    def post(name):
+        responses[name] = app.test_client().post('/api/bookings', json={'event_id': event_id}, headers=headers)
+
+    first = threading.Thread(target=post, args=('first',))
+    first.start()
+    assert entered.wait(5)
+    # Ключ первого запроса ещё не зафиксирован: повтор ждёт на уникальном ключе
+    second = threading.Thread(target=post, args=('second',))
+    second.start()
+    time.sleep(0.3)
+    assert 'second' not in responses
+
+    release.set()
+    first.join(5)
+    second.join(5)
+    assert responses['first'].status_code == responses['second'].status_code == 200
+    assert responses['second'].json == responses['first'].json
+    assert responses['second'].headers['Idempotent-Replayed'] == 'true'
+    db.session.expire_all()
+    assert Booking.query.count() == 1
@@ -0,0 +1,74 @@
+import pytest
+
+from app import app
+from cache import response_cache
+from database import db
+from models import Notification, NotificationType, Venue
+from query_guard import count_queries, explain
+
+# Строк каждого вида: при N+1 число операторов превысит бюджет
+ROWS = 20
+
+
+@pytest.fixture
+def seeded(add_events, buyer):
+    """ROWS мероприятий (у каждого несколько изображений) и покупатель с ROWS уведомлениями"""
+    events = add_events(ROWS, images=3)
+    db.session.add_all([
+        Notification(user_id=buyer['id'], title=f'Notification {i}', message='text',
+                     notification_type=NotificationType.SYSTEM_MESSAGE)
+        for i in range(ROWS)
+    ])
+    db.session.commit()
+    return {'event_id': events[0].id, 'user_id': buyer['id'], 'headers': buyer['headers']}
+
+
+def within_budget(endpoint, call):
+    """Ответ call() и проверка числа SQL-операторов по QUERY_BUDGETS
+    (в режиме QUERY_GUARD=raise превышение обнаруживает и сам guard)"""
+    response_cache.clear()
+    with count_queries() as queries:
+        response = call()
+    assert response.status_code == 200, response.get_json()
+    budget = app.config['QUERY_BUDGETS'][endpoint]
+    assert queries.budgeted <= budget, f'{endpoint}: {queries.budgeted} SQL-операторов при бюджете {budget}'
+    return response
+
+
+def test_get_events_budget(client, seeded):
+    response = within_budget('get_events', lambda: client.get('/api/events?limit=100'))
+    assert len(response.json['events']) == ROWS
+
+
+def test_get_event_budget(client, seeded):
+    response = within_budget('get_event', lambda: client.get(f'/api/events/{seeded["event_id"]}'))
+    assert response.json['id'] == seeded['event_id']
+
+
+def test_create_booking_budget(client, seeded):
+    # Без ключа и с Idempotency-Key, как отправляет фронтенд: операторы ключа вне бюджета
+    for key in (None, 'booking-1', 'booking-2'):
+        headers = dict(seeded['headers'], **({'Idempotency-Key': key} if key else {}))
+        within_budget('create_booking', lambda: client.post(
+            '/api/bookings', json={'event_id': seeded['event_id'], 'seats': 2}, headers=headers
+        ))
+
+
+def test_get_user_notifications_budget(client, seeded):
+    response = within_budget('get_user_notifications', lambda: client.get(
+        f'/api/users/{seeded["user_id"]}/notifications?limit=50', headers=seeded['headers']
+    ))
+    assert len(response.json['notifications']) == ROWS
+
+
+def test_failed_explain_keeps_request_transaction(client):
+    db.session.add(Venue(name='Hall', address='Almaty', capacity=10))
+    db.session.flush()
+    conn = db.session.connection()
+
+    assert explain(conn, 'SELECT * FROM missing_table', ()).startswith('EXPLAIN failed')
+    assert 'venues' in explain(conn, 'SELECT * FROM venues WHERE id = ?', (1,))
+
+    # Незакоммиченная запись запроса пережила ошибку EXPLAIN и фиксируется
+    db.session.commit()
+    assert db.session.query(Venue).filter_by(name='Hall').count() == 1
@@ -0,0 +1,75 @@
+import pytest
+from flask.globals import app_ctx
+
+from app import app
+from cache import response_cache
+from conftest import REPLICA_BIND_KEYS
+from database import db
+from models import Event
+from replicas import STICKY_COOKIE, replica_router, check_replicas
+
+
+@pytest.fixture
+def replica(client, add_events, buyer, monkeypatch):
+    """Копия основной базы в replica_0, отличающаяся названием мероприятия,
+    и включённая маршрутизация чтения на реплику"""
+    event_id = add_events(1)[0].id
+    primary, replica_engine = db.engines[None], db.engines[REPLICA_BIND_KEYS[0]]
+    db.metadata.drop_all(replica_engine)
+    db.metadata.create_all(replica_engine)
+    with primary.connect() as source, replica_engine.begin() as target:
+        for table in db.metadata.sorted_tables:
+            rows = source.execute(table.select()).mappings().all()
+            if rows:
+                target.execute(table.insert(), [dict(row) for row in rows])
+        target.execute(Event.__table__.update().values(title='Replica'))
+    db.session.execute(db.update(Event).values(title='Primary'))
+    db.session.commit()
+
+    monkeypatch.setattr(replica_router, 'bind_keys', list(REPLICA_BIND_KEYS))
+    monkeypatch.setattr(replica_router, '_ejected', {})
+    monkeypatch.setattr(replica_router, '_sticky_users', {})
+    # Каждому запросу - свой контекст приложения и свой g, как в воркере
+    ctx = app_ctx._get_current_object()
+    ctx.pop()
+    yield {'event_id': event_id, 'engine': replica_engine, 'headers': buyer['headers']}
+    ctx.push()
+
+
+def read_title(client, event_id):
+    response_cache.clear()
+    response = client.get(f'/api/events/{event_id}')
+    assert response.status_code == 200
+    return response.json['title']
+
+
+def test_reads_go_to_replica_until_client_writes(client, replica):
+    assert read_title(client, replica['event_id']) == 'Replica'
+    assert client.get_cookie(STICKY_COOKIE, path='/api') is None
+
+    response = client.post('/api/bookings', json={'event_id': replica['event_id'], 'seats': 1},
+                           headers=replica['headers'])
+    assert response.status_code == 200, response.json
+    assert client.get_cookie(STICKY_COOKIE, path='/api') is not None
+
+    # Анонимное чтение с cookie: привязка передаётся между воркерами только cookie
+    assert read_title(client, replica['event_id']) == 'Primary'
+
+    client.delete_cookie(STICKY_COOKIE, path='/api')
+    assert read_title(client, replica['event_id']) == 'Replica'
+
+
+def test_failed_replica_is_ejected_and_read_retried_on_primary(client, replica):
+    assert read_title(client, replica['event_id']) == 'Replica'
+
+    # Ошибка реплики (OperationalError: no such table) - обработчик повторяется на основной базе
+    db.metadata.drop_all(replica['engine'])
+    assert read_title(client, replica['event_id']) == 'Primary'
+    assert replica_router.healthy() == []
+    assert read_title(client, replica['event_id']) == 'Primary'
+
+    # Проверка реплик возвращает ответившую реплику
+    db.metadata.create_all(replica['engine'])
+    with app.app_context():
+        check_replicas(db.engines)
+    assert replica_router.healthy() == REPLICA_BIND_KEYS
@@ -0,0 +1,76 @@
+import pytest
+
+from database import db
+from models import Event
+from query_guard import count_queries
+from search import PythonSearchEngine, index_events, stem
+
+
+@pytest.fixture
+def engine(client):
+    """Отдельный экземпляр движка: индекс глобального не должен переживать тест"""
+    return PythonSearchEngine()
+
+
+@pytest.fixture
+def catalog(add_events):
+    """Проиндексированные мероприятия: {название: id}"""
+    concert, match, marathon = add_events(3)
+    concert.title = 'Концерт симфонического оркестра'
+    match.title = 'Футбольный матч'
+    marathon.title = 'Running marathon'
+    db.session.flush()
+    index_events()
+    db.session.commit()
+    return {'concert': concert.id, 'match': match.id, 'marathon': marathon.id}
+
+
+def found(engine, text):
+    return [event_id for event_id, _ in engine.rank(text)]
+
+
+def test_prefix_queries(engine, catalog):
+    assert found(engine, 'конц') == [catalog['concert']]
+    assert found(engine, 'футб') == [catalog['match']]
+    assert found(engine, 'mara') == [catalog['marathon']]
+    assert found(engine, 'Симфонич оркест') == [catalog['concert']]
+    # Все слова запроса обязательны
+    assert found(engine, 'концерт футбол') == []
+    assert found(engine, 'балет') == []
+
+
+def test_stemmed_queries(engine, catalog):
+    assert stem('оркестром') == stem('оркестра') == 'оркестр'
+    assert found(engine, 'концерты') == [catalog['concert']]
+    assert found(engine, 'оркестром') == [catalog['concert']]
+    assert found(engine, 'marathons') == [catalog['marathon']]
+    assert found(engine, 'runs') == [catalog['marathon']]
+
+
+def test_exact_word_ranks_above_prefix(engine, catalog, add_events):
+    event = add_events(1)[0]
+    event.title = 'Концертный зал'
+    db.session.flush()
+    index_events([event.id])
+    db.session.commit()
+    ranked = engine.rank('концерт')
+    assert [event_id for event_id, _ in ranked] == [catalog['concert'], event.id]
+    assert ranked[0][1] > ranked[1][1]
+
+
+def test_index_rebuilds_when_table_signature_changes(engine, catalog):
+    assert found(engine, 'балет') == []
+    with count_queries() as queries:
+        assert found(engine, 'футбол') == [catalog['match']]
+    # Сигнатура не изменилась: только её проверка, без перечитывания документов
+    assert queries.count == 1
+
+    event = db.session.get(Event, catalog['match'])
+    event.title = 'Балет Лебединое озеро'
+    db.session.flush()
+    index_events([event.id])
+    db.session.commit()
+    with count_queries() as queries:
+        assert found(engine, 'балет') == [catalog['match']]
+    assert queries.count == 2
+    assert found(engine, 'футбол') == []
@@ -0,0 +1,42 @@
+from database import db
+from models import User, UserRole
+from query_guard import count_queries
+from stats import rebuild_stats
+
+
+def user_stats(client, admin):
+    response = client.get('/api/admin/stats/users', headers=admin['headers'])
+    assert response.status_code == 200, response.json
+    return response.json
+
+
+def test_user_totals_follow_registration_role_change_and_delete(client, admin):
+    # Пользователь фикстуры создан без агрегатов: пересчёт, как после ручных правок
+    rebuild_stats()
+    for name in ('anna', 'boris', 'vera'):
+        response = client.post('/api/register', json={
+            'username': name, 'password': 'secret', 'email': f'{name}@example.com'
+        })
+        assert response.status_code in (200, 201), response.json
+    user_ids = dict(db.session.execute(db.select(User.username, User.id)).all())
+
+    response = client.put(f'/api/admin/users/{user_ids["anna"]}/role', json={'role': 'admin'},
+                          headers=admin['headers'])
+    assert response.status_code == 200, response.json
+    # Повторная смена на ту же роль не меняет счётчики
+    client.put(f'/api/admin/users/{user_ids["anna"]}/role', json={'role': 'admin'}, headers=admin['headers'])
+    response = client.delete(f'/api/admin/users/{user_ids["boris"]}', headers=admin['headers'])
+    assert response.status_code == 200, response.json
+
+    stats = user_stats(client, admin)
+    assert stats['total_users'] == db.session.query(User).count() == 3
+    assert stats['admin_count'] == db.session.query(User).filter_by(role=UserRole.admin).count() == 2
+    assert sum(stats['monthly_stats'].values()) == 3
+
+
+def test_user_stats_do_not_scan_users(client, admin):
+    rebuild_stats()
+    with count_queries() as queries:
+        user_stats(client, admin)
+    assert not any('FROM users' in statement and 'users.id IN' not in statement
+                   for statement in queries.shapes)
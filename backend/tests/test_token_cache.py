@@ -0,0 +1,24 @@
+from database import db
+from token_cache import revoke_user_tokens
+
+
+def notifications(client, user):
+    return client.get(f'/api/users/{user["id"]}/notifications', headers=user['headers'])
+
+
+def test_rolled_back_revocation_keeps_cached_token(client, buyer):
+    assert notifications(client, buyer).status_code == 200
+
+    revoke_user_tokens(buyer['id'])
+    db.session.rollback()
+
+    assert notifications(client, buyer).status_code == 200
+
+
+def test_role_change_revokes_cached_token_after_commit(client, buyer, admin):
+    assert notifications(client, buyer).status_code == 200
+
+    response = client.put(f'/api/admin/users/{buyer["id"]}/role', json={'role': 'admin'}, headers=admin['headers'])
+    assert response.status_code == 200
+
+    assert notifications(client, buyer).status_code == 401
@@ -0,0 +1,152 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from database import db
+from models import TokenRevocation
+from query_guard import outside_budget
+
+
+# Запас при синхронизации: отзыв, закоммиченный позже более нового, не будет пропущен
+REVOCATION_LOOKBACK = timedelta(seconds=60)
+
+
+class TokenRevoked(Exception):
+    """Токен выдан до отзыва токенов пользователя"""
+
+
+def _epoch(value):
+    return value.replace(tzinfo=timezone.utc).timestamp()
+
+
+class VerifiedTokenCache:
+    """LRU проверенных JWT: sha256(токен) -> (user_id, role, exp).
+
+    Запись живёт до exp токена. Отзыв токенов пользователя (смена роли,
+    удаление) сохраняется в token_revocations; каждый воркер подтягивает
+    новые отзывы не чаще раза в sync_interval секунд и сразу вытесняет
+    токены этих пользователей, а в своём процессе отзыв действует мгновенно.
+    """
+
+    def __init__(self, max_entries=10000, sync_interval=5):
+        self.max_entries = max_entries
+        self.sync_interval = sync_interval
+        self._entries = OrderedDict()
+        self._by_user = {}  # user_id -> set(digest)
+        self._revoked_before = {}  # user_id -> epoch
+        self._last_sync = 0.0
+        self._last_revocation = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def digest(token):
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token):
+        """(user_id, role) для ранее проверенного и не истёкшего токена"""
+        key = self.digest(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            user_id, role, exp = entry
+            if exp <= time.time():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return user_id, role
+
+    def put(self, token, payload):
+        """Сохранение декодированного токена; TokenRevoked, если он уже отозван"""
+        user_id = payload['user_id']
+        issued_at = float(payload.get('iat', 0))
+        key = self.digest(token)
+        with self._lock:
+            if issued_at < self._revoked_before.get(user_id, 0):
+                raise TokenRevoked(user_id)
+            if self.max_entries <= 0:
+                return
+            self._entries[key] = (user_id, payload['role'], float(payload['exp']))
+            self._entries.move_to_end(key)
+            self._by_user.setdefault(user_id, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def revoke_user(self, user_id, revoked_at):
+        """Вытеснение токенов пользователя, выданных до revoked_at"""
+        with self._lock:
+            self._revoked_before[user_id] = max(self._revoked_before.get(user_id, 0), _epoch(revoked_at))
+            for key in self._by_user.pop(user_id, ()):
+                self._entries.pop(key, None)
+
+    def sync(self):
+        """Загрузка отзывов, сделанных другими воркерами"""
+        now = time.monotonic()
+        if now - self._last_sync < self.sync_interval:
+            return
+        self._last_sync = now
+        query = select(TokenRevocation.user_id, TokenRevocation.revoked_at)
+        if self._last_revocation is not None:
+            query = query.where(TokenRevocation.revoked_at >= self._last_revocation - REVOCATION_LOOKBACK)
+        with outside_budget():
+            revocations = db.session.execute(query).all()
+        for user_id, revoked_at in revocations:
+            self.revoke_user(user_id, revoked_at)
+            if self._last_revocation is None or revoked_at > self._last_revocation:
+                self._last_revocation = revoked_at
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_user.clear()
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        keys = self._by_user.get(entry[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_user[entry[0]]
+
+
+token_cache = VerifiedTokenCache(
+    max_entries=int(os.getenv("TOKEN_CACHE_SIZE", "10000")),
+    sync_interval=float(os.getenv("TOKEN_REVOCATION_SYNC_INTERVAL", "5"))
+)
+
+
+def revoke_user_tokens(user_id):
+    """Отзыв всех выданных пользователю токенов (в текущей транзакции).
+
+    Локальный кэш сбрасывается после коммита: при откате токены остаются
+    действительными. Остальные воркеры увидят отзыв при синхронизации.
+    """
+    revoked_at = datetime.utcnow()
+    revocation = db.session.get(TokenRevocation, user_id)
+    if revocation is None:
+        db.session.add(TokenRevocation(user_id=user_id, revoked_at=revoked_at))
+    else:
+        revocation.revoked_at = revoked_at
+    db.session.info.setdefault('revoked_users', {})[user_id] = revoked_at
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_revocations(session):
+    for user_id, revoked_at in session.info.pop('revoked_users', {}).items():
+        token_cache.revoke_user(user_id, revoked_at)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_revocations(session, previous_transaction):
+    # Откат к точке сохранения не отменяет изменений внешней транзакции
+    if previous_transaction.nested:
+        return
+    session.info.pop('revoked_users', None)
@@ -20,7 +20,7 @@ const AdminEventsList = () => {
       try {
         // Загрузка данных о мероприятиях и площадках одновременно
         const [eventsResponse, venuesResponse] = await Promise.all([
-          apiService.getEvents(),
+          apiService.getAllEvents({ upcoming: false }),
           apiService.getVenues()
         ]);
 
@@ -54,7 +54,7 @@ const AdminEventsList = () => {
       
       if (response.success) {
         // Обновляем список мероприятий
-        const eventsResponse = await apiService.getEvents();
+        const eventsResponse = await apiService.getAllEvents({ upcoming: false });
         setEvents(eventsResponse);
         
         setShowForm(false);
@@ -17,59 +17,65 @@ const AdminNotificationsList = () => {
     user_id: '',
     notification_type: 'SYSTEM_MESSAGE'
   });
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   
-  // Загрузка пользователей и уведомлений
+  // Загрузка списка пользователей
   useEffect(() => {
-    const fetchData = async () => {
+    const fetchUsers = async () => {
       try {
-        // Загружаем список пользователей
         const usersResponse = await apiService.getAllUsers();
         setUsers(usersResponse);
-        
-        // Пробуем загрузить сохраненные уведомления из localStorage
-        const savedNotifications = JSON.parse(localStorage.getItem('adminNotifications') || '[]');
-        
-        if (savedNotifications.length > 0) {
-          setNotifications(savedNotifications);
-        } else {
-          // Если localStorage пуст, пытаемся получить данные с сервера
-          try {
-            const notificationsData = await apiService.getAllNotifications();
-            if (Array.isArray(notificationsData)) {
-              setNotifications(notificationsData);
-              localStorage.setItem('adminNotifications', JSON.stringify(notificationsData));
-            } else {
-              // Используем мок данные
-              setNotifications([/* ваши мок данные */]);
-            }
-          } catch (notifError) {
-            console.error('Ошибка при загрузке уведомлений:', notifError);
-            // Используем мок данные
-            setNotifications([/* ваши мок данные */]);
-          }
-        }
-        
-        setLoading(false);
       } catch (error) {
-        console.error('Ошибка при загрузке данных:', error);
+        console.error('Ошибка при загрузке пользователей:', error);
+      }
+    };
+    
+    fetchUsers();
+  }, []);
+  
+  // Параметры журнала: фильтр по пользователю выполняется на сервере
+  const buildParams = (cursor) => ({
+    limit: 50,
+    cursor,
+    user_id: selectedUser === 'all' ? undefined : selectedUser
+  });
+  
+  // Загрузка первой страницы уведомлений (и при смене пользователя)
+  useEffect(() => {
+    const fetchNotifications = async () => {
+      setLoading(true);
+      const response = await apiService.getAllNotifications(buildParams(null));
+      if (response.success) {
+        setNotifications(response.data.notifications);
+        setNextCursor(response.data.next_cursor);
+      } else {
         setError(t('admin.notifications.fetchError', 'Ошибка при загрузке данных'));
-        setLoading(false);
       }
+      setLoading(false);
     };
     
-    fetchData();
-  }, [t]);
+    fetchNotifications();
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [selectedUser, t]);
   
-  // Фильтрация уведомлений
+  // Следующая страница журнала
+  const handleLoadMore = async () => {
+    setLoadingMore(true);
+    const response = await apiService.getAllNotifications(buildParams(nextCursor));
+    if (response.success) {
+      setNotifications(prev => [...prev, ...response.data.notifications]);
+      setNextCursor(response.data.next_cursor);
+    } else {
+      setError(t('admin.notifications.fetchError', 'Ошибка при загрузке данных'));
+    }
+    setLoadingMore(false);
+  };
+  
+  // Фильтрация загруженных уведомлений по тексту
   const filteredNotifications = notifications.filter(notification => {
-    // Фильтр по пользователю
-    const userMatch = selectedUser === 'all' || notification.user_id.toString() === selectedUser;
-    
-    // Фильтр по тексту
-    const textMatch = notification.title.toLowerCase().includes(searchTerm.toLowerCase()) ||
-                    notification.message.toLowerCase().includes(searchTerm.toLowerCase());
-    
-    return userMatch && textMatch;
+    return notification.title.toLowerCase().includes(searchTerm.toLowerCase()) ||
+           notification.message.toLowerCase().includes(searchTerm.toLowerCase());
   });
   
   // Обработчик изменения полей формы создания нового уведомления
@@ -115,10 +121,6 @@ const AdminNotificationsList = () => {
           created_at: new Date().toISOString()
         };
         
-        // Сохраняем в localStorage
-        const savedNotifications = JSON.parse(localStorage.getItem('adminNotifications') || '[]');
-        localStorage.setItem('adminNotifications', JSON.stringify([newNotificationData, ...savedNotifications]));
-        
         setNotifications([newNotificationData, ...notifications]);
         setShowCreateModal(false);
         setNewNotification({
@@ -142,10 +144,6 @@ const AdminNotificationsList = () => {
           created_at: new Date().toISOString()
         };
         
-        // Сохраняем в localStorage
-        const savedNotifications = JSON.parse(localStorage.getItem('adminNotifications') || '[]');
-        localStorage.setItem('adminNotifications', JSON.stringify([mockNewNotification, ...savedNotifications]));
-        
         setNotifications([mockNewNotification, ...notifications]);
         setShowCreateModal(false);
         setNewNotification({
@@ -178,9 +176,6 @@ const AdminNotificationsList = () => {
         const updatedNotifications = notifications.filter(n => n.id !== notificationId);
         setNotifications(updatedNotifications);
         
-        // Обновляем localStorage
-        localStorage.setItem('adminNotifications', JSON.stringify(updatedNotifications));
-        
         if (!response.success) {
           console.warn('API удаления уведомлений не доступно, используется только локальное удаление');
         }
@@ -189,9 +184,6 @@ const AdminNotificationsList = () => {
         // Даже при ошибке удаляем локально
         const updatedNotifications = notifications.filter(n => n.id !== notificationId);
         setNotifications(updatedNotifications);
-        
-        // Обновляем localStorage
-        localStorage.setItem('adminNotifications', JSON.stringify(updatedNotifications));
       } finally {
         setLoading(false);
       }
@@ -214,7 +206,7 @@ const AdminNotificationsList = () => {
       'SYSTEM_MESSAGE': 'Системное сообщение'
     };
     
-    return types[type] || type;
+    return types[type.toUpperCase()] || type;
   };
   
   return (
@@ -328,6 +320,18 @@ const AdminNotificationsList = () => {
               </tbody>
             </table>
           )}
+          {nextCursor && (
+            <div className="admin-load-more">
+              <button
+                type="button"
+                className="admin-button secondary"
+                onClick={handleLoadMore}
+                disabled={loadingMore}
+              >
+                {loadingMore ? t('common.loading', 'Загрузка...') : t('events.loadMore', 'Показать ещё')}
+              </button>
+            </div>
+          )}
         </div>
       )}
 
@@ -23,6 +23,8 @@ const BookingForm = ({ event, onBookingSuccess }) => {
   // Состояние для модального окна оплаты
   const [showPaymentQRModal, setShowPaymentQRModal] = useState(false);
   const bookingProcessedRef = useRef(false);
+  // Удержание мест на время оплаты (id удержания на сервере)
+  const holdIdRef = useRef(null);
   const [qrImagePath, setQrImagePath] = useState('../../../public/kaspi_qr.jpeg');
 
   // Проверяем, является ли место проведения "Astana Arena"
@@ -87,6 +89,24 @@ const BookingForm = ({ event, onBookingSuccess }) => {
     // Сбрасываем флаг обработки при каждом бронировании
     bookingProcessedRef.current = false;
     
+    // Удерживаем места, пока пользователь оплачивает
+    setLoading(true);
+    const holdResponse = await apiService.createHold({
+      event_id: event.id,
+      seats: selectedSeats.length,
+      seat_numbers: selectedSeats
+    });
+    setLoading(false);
+    
+    if (!holdResponse.success) {
+      setStatus({
+        type: 'error',
+        message: holdResponse.message || t('bookingForm.errors.bookingError')
+      });
+      return;
+    }
+    holdIdRef.current = holdResponse.hold.id;
+    
     // Показываем модальное окно оплаты
     setShowPaymentQRModal(true);
   };
@@ -122,13 +142,9 @@ const BookingForm = ({ event, onBookingSuccess }) => {
     setLoading(true);
     
     try {
-      // Добавляем информацию о выбранных местах в запрос бронирования
-      const response = await apiService.createBooking({
-        user_id: user.id,
-        event_id: event.id,
-        seats: selectedSeats.length, // Количество выбранных мест
-        seat_numbers: selectedSeats // Сами выбранные места
-      });
+      // Подтверждаем удержание: удержанные места становятся бронированием
+      const response = await apiService.confirmHold(holdIdRef.current);
+      holdIdRef.current = null;
       
       if (response.success) {
         // Закрываем модальное окно оплаты
@@ -217,6 +233,12 @@ const BookingForm = ({ event, onBookingSuccess }) => {
   // Закрытие модального окна оплаты
   const closePaymentQRModal = () => {
     setShowPaymentQRModal(false);
+    
+    // Оплата не состоялась - сразу освобождаем удержанные места
+    if (holdIdRef.current && !bookingProcessedRef.current) {
+      apiService.releaseHold(holdIdRef.current);
+      holdIdRef.current = null;
+    }
   };
 
   // Функция переключения режима выбора мест
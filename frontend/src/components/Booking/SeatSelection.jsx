@@ -1,5 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import { useTranslation } from 'react-i18next';
+import { loadOccupiedSeats } from '../../services/seatMap';
 import '../../styles/SeatSelection.css'; // Создадим стили для компонента
 
 const SeatSelection = ({ event, selectedSeats, onSeatSelect }) => {
@@ -15,22 +16,11 @@ const SeatSelection = ({ event, selectedSeats, onSeatSelect }) => {
   }, [event]);
 
   // Генерируем схему расположения мест
-  const generateSeatsMap = () => {
+  const generateSeatsMap = async () => {
     setLoading(true);
-    
-    // Получаем сохраненные данные о занятых местах из localStorage
-    const venueKey = `venue_${event.venue_id}`;
-    const storedVenueData = localStorage.getItem(venueKey);
-    let occupiedSeats = [];
-    
-    if (storedVenueData) {
-      try {
-        const venueData = JSON.parse(storedVenueData);
-        occupiedSeats = venueData.occupiedSeats || [];
-      } catch (e) {
-        console.error('Ошибка при чтении данных о занятых местах:', e);
-      }
-    }
+
+    // Занятые места: с сервера, если у площадки есть схема, иначе из localStorage
+    const occupiedSeats = await loadOccupiedSeats(event);
 
     // Количество рядов и мест в ряду
     // Для простоты создадим схему места из 10 рядов по 10 мест
@@ -56,7 +46,7 @@ const SeatSelection = ({ event, selectedSeats, onSeatSelect }) => {
         const seatId = `${row}-${seat}`;
         
         // Проверяем, занято ли место
-        const isOccupied = occupiedSeats.includes(seatId);
+        const isOccupied = occupiedSeats.has(seatId);
         
         // Проверяем, выбрано ли место
         const isSelected = selectedSeats.includes(seatId);
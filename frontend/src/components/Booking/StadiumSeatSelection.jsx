@@ -1,5 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import { useTranslation } from 'react-i18next';
+import { loadOccupiedSeats } from '../../services/seatMap';
 import '../../styles/StadiumSeatSelection.css';
 
 const StadiumSeatSelection = ({ event, selectedSeats, onSeatSelect }) => {
@@ -17,23 +18,12 @@ const StadiumSeatSelection = ({ event, selectedSeats, onSeatSelect }) => {
   }, [event]);
 
   // Генерация схемы стадиона
-  const generateStadiumLayout = () => {
+  const generateStadiumLayout = async () => {
     setLoading(true);
-    
+
     try {
-      // Получаем сохраненные данные о занятых местах
-      const venueKey = `venue_${event.venue_id}`;
-      const storedVenueData = localStorage.getItem(venueKey);
-      let occupiedSeats = [];
-      
-      if (storedVenueData) {
-        try {
-          const venueData = JSON.parse(storedVenueData);
-          occupiedSeats = venueData.occupiedSeats || [];
-        } catch (e) {
-          console.error('Ошибка при чтении данных о занятых местах:', e);
-        }
-      }
+      // Занятые места по битовым картам секторов мероприятия
+      const occupiedSeats = await loadOccupiedSeats(event);
 
       // Определяем секторы для стадиона Astana Arena
       // A, B, C, D - основные секторы (трибуны)
@@ -68,7 +58,7 @@ const StadiumSeatSelection = ({ event, selectedSeats, onSeatSelect }) => {
               const seatId = `${subsectorId}-${row}-${seat}`;
               
               // Проверяем статус места
-              const isOccupied = occupiedSeats.includes(seatId);
+              const isOccupied = occupiedSeats.has(seatId);
               const isSelected = selectedSeats.includes(seatId);
               
               seatRow.push({
@@ -3,6 +3,7 @@ import { useNavigate } from 'react-router-dom';
 import { useTranslation } from 'react-i18next';
 import { AuthContext } from '../../contexts/AuthContext';
 import apiService from '../../services/api';
+import notificationStream from '../../services/notificationStream';
 import '../../styles/NotificationCenter.css';
 
 const NotificationCenter = () => {
@@ -38,8 +39,13 @@ const NotificationCenter = () => {
 
   useEffect(() => {
     fetchNotifications();
-    const interval = setInterval(fetchNotifications, 60000);
-    return () => clearInterval(interval);
+    if (!user) return;
+    // Обновляем список, когда сервер сообщает о новом уведомлении
+    return notificationStream.subscribe(user.id, (type) => {
+      if (type === 'notification') {
+        fetchNotifications();
+      }
+    });
   }, [user]);
 
   const goToNotifications = () => {
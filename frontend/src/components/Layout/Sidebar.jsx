@@ -4,6 +4,7 @@ import { useTranslation } from 'react-i18next';
 import { AuthContext } from '../../contexts/AuthContext';
 import { ThemeContext } from '../../contexts/ThemeContext';
 import apiService from '../../services/api';
+import notificationStream from '../../services/notificationStream';
 import '../../styles/Sidebar.css';
 
 const Sidebar = ({ menuOpen, toggleMenu, logoUrl }) => {
@@ -28,9 +29,12 @@ const Sidebar = ({ menuOpen, toggleMenu, logoUrl }) => {
       };
 
       fetchUnreadCount();
-      // Set up interval to refresh unread count every minute
-      const interval = setInterval(fetchUnreadCount, 60000);
-      return () => clearInterval(interval);
+      // Счётчик обновляется сервером через поток уведомлений
+      return notificationStream.subscribe(user.id, (type, data) => {
+        if (type === 'unread_count') {
+          setUnreadCount(data.count);
+        }
+      });
     }
   }, [user]);
 
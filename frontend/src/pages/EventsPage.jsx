@@ -7,6 +7,12 @@ import EventCard from '../components/Booking/EventCard';
 import '../styles/EventCard.css';
 import '../styles/FavoriteButton.css'; // Создадим такой файл отдельно
 
+// Типы мероприятий (совпадают с EventType на сервере)
+const EVENT_TYPES = ['sport', 'concert', 'theater', 'exhibition', 'workshop', 'other'];
+const PAGE_SIZE = 24;
+// Период обновления остатков мест на открытой странице
+const AVAILABILITY_POLL_MS = 15000;
+
 const EventsPage = () => {
   const { t } = useTranslation();
   const { user } = useContext(AuthContext);
@@ -16,39 +22,87 @@ const EventsPage = () => {
   const [filter, setFilter] = useState('all');
   const [search, setSearch] = useState('');
   const [favorites, setFavorites] = useState([]); // Список ID избранных мероприятий
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
+
+  // Фильтры применяются на сервере, страница запрашивается по курсору
+  const buildParams = (cursor) => ({
+    limit: PAGE_SIZE,
+    type: filter === 'all' ? undefined : filter,
+    search: search.trim() || undefined,
+    cursor
+  });
 
   useEffect(() => {
+    let cancelled = false;
+
     const fetchEvents = async () => {
+      setLoading(true);
       try {
-        const data = await apiService.getEvents();
-        setEvents(data);
-        setLoading(false);
+        const data = await apiService.getEvents(buildParams());
+        if (cancelled) return;
+        setEvents(data.events);
+        setNextCursor(data.next_cursor);
+        setError(null);
       } catch (err) {
-        setError(t('common.error'));
-        setLoading(false);
+        if (!cancelled) setError(t('common.error'));
+      } finally {
+        if (!cancelled) setLoading(false);
       }
     };
 
-    // Загружаем избранные из localStorage
-    const loadFavorites = () => {
-      const savedFavorites = JSON.parse(localStorage.getItem('favoriteEvents') || '[]');
-      setFavorites(savedFavorites);
+    // Небольшая задержка, чтобы не отправлять запрос на каждый символ поиска
+    const timer = setTimeout(fetchEvents, search ? 300 : 0);
+    return () => {
+      cancelled = true;
+      clearTimeout(timer);
     };
+  }, [t, filter, search]);
 
-    fetchEvents();
-    loadFavorites();
-  }, [t]);
+  // Остатки мест загруженных мероприятий одним лёгким запросом, пока вкладка видна
+  const eventIdsKey = events.map(event => event.id).join(',');
+  useEffect(() => {
+    if (!eventIdsKey) return undefined;
+    const eventIds = eventIdsKey.split(',').map(Number);
 
-  // Фильтрация событий
-  const filteredEvents = events.filter(event => {
-    const matchesFilter = filter === 'all' || event.type === filter;
-    const matchesSearch = event.title.toLowerCase().includes(search.toLowerCase()) || 
-                         event.venue_name.toLowerCase().includes(search.toLowerCase());
-    return matchesFilter && matchesSearch;
-  });
+    const refreshAvailability = async () => {
+      if (document.hidden) return;
+      try {
+        const availability = await apiService.getEventsAvailability(eventIds);
+        const byId = new Map(availability.map(item => [item.id, item]));
+        setEvents(prev => prev.map(event => {
+          const item = byId.get(event.id);
+          return item ? { ...event, available_seats: item.available_seats, status: item.status } : event;
+        }));
+      } catch (err) {
+        // Остатки обновятся при следующем опросе
+      }
+    };
 
-  // Получаем уникальные типы событий
-  const eventTypes = [...new Set(events.map(event => event.type))];
+    const timer = setInterval(refreshAvailability, AVAILABILITY_POLL_MS);
+    return () => clearInterval(timer);
+  }, [eventIdsKey]);
+
+  useEffect(() => {
+    // Загружаем избранные из localStorage
+    const savedFavorites = JSON.parse(localStorage.getItem('favoriteEvents') || '[]');
+    setFavorites(savedFavorites);
+  }, []);
+
+  // Загрузка следующей страницы
+  const loadMore = async () => {
+    if (!nextCursor) return;
+    setLoadingMore(true);
+    try {
+      const data = await apiService.getEvents(buildParams(nextCursor));
+      setEvents(prev => [...prev, ...data.events]);
+      setNextCursor(data.next_cursor);
+    } catch (err) {
+      setError(t('common.error'));
+    } finally {
+      setLoadingMore(false);
+    }
+  };
 
   // Добавление/удаление из избранных
   const toggleFavorite = (eventId) => {
@@ -105,7 +159,7 @@ const EventsPage = () => {
                   onChange={(e) => setFilter(e.target.value)}
                 >
                   <option value="all">{t('events.filter.allTypes')}</option>
-                  {eventTypes.map(type => (
+                  {EVENT_TYPES.map(type => (
                     <option key={type} value={type}>{type}</option>
                   ))}
                 </select>
@@ -115,27 +169,36 @@ const EventsPage = () => {
           
           {loading ? (
             <p className="text-center">{t('common.loading')}</p>
-          ) : filteredEvents.length === 0 ? (
+          ) : events.length === 0 ? (
             <div className="alert alert-warning">
               {t('events.noEvents')}
             </div>
           ) : (
-            <div className="grid grid-3">
-              {filteredEvents.map(event => (
-                <div key={event.id} className="event-card-container">
-                  <EventCard event={event} />
-                  {user && (
-                    <button 
-                      className={`favorite-button ${isFavorite(event.id) ? 'is-favorite' : ''}`}
-                      onClick={() => toggleFavorite(event.id)}
-                      title={isFavorite(event.id) ? "Удалить из избранного" : "Добавить в избранное"}
-                    >
-                      {isFavorite(event.id) ? '★' : '☆'}
-                    </button>
-                  )}
+            <>
+              <div className="grid grid-3">
+                {events.map(event => (
+                  <div key={event.id} className="event-card-container">
+                    <EventCard event={event} />
+                    {user && (
+                      <button 
+                        className={`favorite-button ${isFavorite(event.id) ? 'is-favorite' : ''}`}
+                        onClick={() => toggleFavorite(event.id)}
+                        title={isFavorite(event.id) ? "Удалить из избранного" : "Добавить в избранное"}
+                      >
+                        {isFavorite(event.id) ? '★' : '☆'}
+                      </button>
+                    )}
+                  </div>
+                ))}
+              </div>
+              {nextCursor && (
+                <div className="text-center mt-4">
+                  <button className="btn btn-primary" onClick={loadMore} disabled={loadingMore}>
+                    {loadingMore ? t('common.loading') : t('events.loadMore')}
+                  </button>
                 </div>
-              ))}
-            </div>
+              )}
+            </>
           )}
         </>
       )}
@@ -16,8 +16,8 @@ const HomePage = () => {
   useEffect(() => {
     const fetchRecentEvents = async () => {
       try {
-        const events = await apiService.getEvents();
-        setRecentEvents(events.slice(0, 3));
+        const data = await apiService.getEvents({ limit: 3 });
+        setRecentEvents(data.events);
         setLoading(false);
       } catch (err) {
         setError(t('common.error'));
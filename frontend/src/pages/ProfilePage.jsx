@@ -61,12 +61,13 @@ const ProfilePage = () => {
         const favoriteIds = JSON.parse(localStorage.getItem('favoriteEvents') || '[]');
         
         if (favoriteIds.length > 0) {
-          // Загружаем данные о всех мероприятиях
-          const allEvents = await apiService.getEvents();
-          
-          // Фильтруем только избранные
-          const favorites = allEvents.filter(event => favoriteIds.includes(event.id));
-          setFavoriteEvents(favorites);
+          // Загружаем только избранные мероприятия
+          const data = await apiService.getEvents({
+            ids: favoriteIds.join(','),
+            upcoming: false,
+            limit: 100
+          });
+          setFavoriteEvents(data.events);
         } else {
           setFavoriteEvents([]);
         }
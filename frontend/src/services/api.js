@@ -15,6 +15,32 @@ const handleResponse = async (response) => {
   return data;
 };
 
+// Ключ идемпотентности: повтор запроса с тем же ключом сервер не выполняет заново
+const newIdempotencyKey = () => (
+  window.crypto && window.crypto.randomUUID
+    ? window.crypto.randomUUID()
+    : `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`
+);
+
+const IDEMPOTENT_RETRIES = 2;
+
+// fetch с заголовком Idempotency-Key: при сетевой ошибке или таймауте запрос
+// повторяется с тем же ключом и не создаёт дубликат бронирования
+const idempotentFetch = async (url, options) => {
+  const headers = { ...options.headers, 'Idempotency-Key': newIdempotencyKey() };
+  for (let attempt = 0; ; attempt++) {
+    try {
+      // Повтор с тем же ключом сервер держит, пока не завершится первый запрос
+      return await fetch(url, { ...options, headers });
+    } catch (error) {
+      if (attempt >= IDEMPOTENT_RETRIES) {
+        throw error;
+      }
+      await new Promise(resolve => setTimeout(resolve, 500 * (attempt + 1)));
+    }
+  }
+};
+
 // Сервис для работы с API
 const apiService = {
   // Авторизация
@@ -37,17 +63,55 @@ const apiService = {
     return handleResponse(response);
   },
   
-  // Получение всех мероприятий
-  getEvents: async () => {
-    const response = await fetch(`${API_URL}/events`);
+  // Получение страницы мероприятий
+  // params: limit, cursor, type, status, search, featured, date_from, date_to, upcoming, ids,
+  // include ('description' - описание в карточках, по умолчанию не передаётся)
+  // Возвращает { events, next_cursor, limit }
+  getEvents: async (params = {}) => {
+    const query = new URLSearchParams(
+      Object.entries(params).filter(([, value]) => value !== undefined && value !== null && value !== '')
+    ).toString();
+    const response = await fetch(`${API_URL}/events${query ? `?${query}` : ''}`);
     return handleResponse(response);
   },
+
+  // Получение всех мероприятий постранично с описаниями (для формы редактирования в админ-панели)
+  getAllEvents: async (params = {}) => {
+    const events = [];
+    let cursor = null;
+    do {
+      const page = await apiService.getEvents({ limit: 100, include: 'description', ...params, cursor });
+      events.push(...page.events);
+      cursor = page.next_cursor;
+    } while (cursor);
+    return events;
+  },
   
+  // Остатки мест и статусы мероприятий: [{ id, available_seats, status }],
+  // не больше 100 ID на запрос к серверу
+  getEventsAvailability: async (eventIds) => {
+    const chunks = [];
+    for (let i = 0; i < eventIds.length; i += 100) {
+      chunks.push(eventIds.slice(i, i + 100));
+    }
+    const pages = await Promise.all(chunks.map(async (ids) => {
+      const response = await fetch(`${API_URL}/events/availability?ids=${ids.join(',')}`);
+      return handleResponse(response);
+    }));
+    return pages.flatMap(page => page.events);
+  },
+
   // Получение информации о конкретном мероприятии
   getEvent: async (eventId) => {
     const response = await fetch(`${API_URL}/events/${eventId}`);
     return handleResponse(response);
   },
+
+  // Схема секторов и битовые карты занятых мест мероприятия
+  getEventSeats: async (eventId) => {
+    const response = await fetch(`${API_URL}/events/${eventId}/seats`);
+    return handleResponse(response);
+  },
   
   // Создание мероприятия (требует прав администратора)
 // Создание мероприятия
@@ -110,7 +174,7 @@ createBooking: async (bookingData) => {
     }
     
     // Отправляем запрос с токеном в заголовке
-    const response = await fetch(`${API_URL}/bookings`, {
+    const response = await idempotentFetch(`${API_URL}/bookings`, {
       method: 'POST',
       headers: { 
         'Content-Type': 'application/json',
@@ -140,10 +204,12 @@ createBooking: async (bookingData) => {
     
     // Сохраняем информацию о забронированных местах в localStorage
     if (bookingData.seat_numbers && bookingData.seat_numbers.length > 0) {
-      // Ключ вида 'venue_123' (где 123 - ID места проведения)
-      const eventData = await fetch(`${API_URL}/events/${bookingData.event_id}`).then(res => res.json());
-      if (eventData && eventData.venue_id) {
-        const venueKey = `venue_${eventData.venue_id}`;
+      // Ключ вида 'venue_123' (где 123 - ID места проведения); мероприятие
+      // перечитывается, только если вызывающий код не передал venue_id
+      const venueId = bookingData.venue_id
+        || (await fetch(`${API_URL}/events/${bookingData.event_id}`).then(res => res.json())).venue_id;
+      if (venueId) {
+        const venueKey = `venue_${venueId}`;
         const storedVenueData = localStorage.getItem(venueKey);
         let venueData = { occupiedSeats: [] };
         
@@ -179,6 +245,57 @@ createBooking: async (bookingData) => {
   }
 },
 
+// Запросы удержания мест на время оплаты: { success, ...ответ сервера } или { success: false, message }
+holdRequest: async (url, method, body) => {
+  try {
+    const user = JSON.parse(localStorage.getItem('user') || '{}');
+    const token = localStorage.getItem('authToken') || (user && user.token);
+    if (!token) {
+      return {
+        success: false,
+        message: 'Необходима авторизация. Пожалуйста, войдите в систему снова.'
+      };
+    }
+
+    const send = method === 'POST' ? idempotentFetch : fetch;
+    const response = await send(`${API_URL}${url}`, {
+      method,
+      headers: {
+        'Content-Type': 'application/json',
+        'Authorization': `Bearer ${token}`
+      },
+      body: body ? JSON.stringify(body) : undefined
+    });
+    const data = await response.json();
+    if (response.status === 401) {
+      return {
+        success: false,
+        message: 'Ваша сессия истекла. Пожалуйста, войдите в систему снова.'
+      };
+    }
+    return { ...data, success: response.ok && data.success !== false };
+  } catch (error) {
+    console.error('Ошибка при удержании мест:', error);
+    return {
+      success: false,
+      message: 'Произошла ошибка при бронировании. Попробуйте позже.'
+    };
+  }
+},
+
+// Удержание мест до оплаты: { event_id, seats, seat_numbers } -> { hold: { id, expires_at, ttl } }
+createHold: (holdData) => apiService.holdRequest('/holds', 'POST', holdData),
+
+// Подтверждение удержания после оплаты -> { booking_id }
+confirmHold: (holdId) => apiService.holdRequest(`/holds/${holdId}/confirm`, 'POST'),
+
+// Отказ от удержания (окно оплаты закрыто без оплаты)
+releaseHold: (holdId) => apiService.holdRequest(`/holds/${holdId}`, 'DELETE'),
+
+// Пакетное бронирование нескольких мероприятий одной транзакцией:
+// items [{ event_id, seats }] -> { bookings } или { success: false, errors: [{ index, event_id, message }] }
+createBookingBatch: (items) => apiService.holdRequest('/bookings/batch', 'POST', { items }),
+
 // Получение всех бронирований пользователя
 getUserBookings: async (userId) => {
   try {
@@ -237,7 +354,7 @@ cancelBooking: async (bookingId, userId) => {
     }
     
     // Отправляем запрос с токеном в заголовке
-    const response = await fetch(`${API_URL}/bookings/${bookingId}/cancel`, {
+    const response = await idempotentFetch(`${API_URL}/bookings/${bookingId}/cancel`, {
       method: 'PUT',
       headers: { 
         'Content-Type': 'application/json',
@@ -338,8 +455,9 @@ sendNotification: async (notificationData) => {
   }
 },
 
-// Получение уведомлений пользователя
-getUserNotifications: async () => {
+// Получение уведомлений пользователя (первая страница, от новых к старым).
+// params: limit, cursor, unread_only
+getUserNotifications: async (userId, params = {}) => {
   try {
     // Получаем текущего пользователя из хранилища
     const user = JSON.parse(localStorage.getItem('user'));
@@ -351,7 +469,8 @@ getUserNotifications: async () => {
     const token = localStorage.getItem('authToken') || user.token;
     
     // Запрос с указанием ID пользователя
-    const response = await axios.get(`${API_URL}/users/${user.id}/notifications`, {
+    const response = await axios.get(`${API_URL}/users/${userId || user.id}/notifications`, {
+      params,
       headers: {
         'Authorization': `Bearer ${token}`
       }
@@ -372,12 +491,17 @@ getUserNotifications: async () => {
 },
 
 
-// Получение всех уведомлений (для админ-панели)
-getAllNotifications: async () => {
+// Получение страницы журнала уведомлений (для админ-панели).
+// params: limit, cursor, type, user_id, read, date_from, date_to;
+// data - { notifications, next_cursor, limit }
+getAllNotifications: async (params = {}) => {
   try {
     const token = localStorage.getItem('authToken') || (JSON.parse(localStorage.getItem('user')) || {}).token;
     
     const response = await axios.get(`${API_URL}/admin/notifications`, {
+      params: Object.fromEntries(
+        Object.entries(params).filter(([, value]) => value !== undefined && value !== null && value !== '')
+      ),
       headers: {
         'Authorization': `Bearer ${token}`
       }
@@ -0,0 +1,124 @@
+// Общий поток уведомлений (Server-Sent Events) для всех компонентов вкладки.
+// Одно соединение EventSource на пользователя вместо отдельного setInterval
+// в каждом компоненте; браузер сам переподключается с Last-Event-ID.
+import apiService from './api';
+
+const API_URL = '/api';
+// Если EventSource недоступен или сервер отклонил поток (лимит соединений
+// воркера - 503), опрашиваем счётчик непрочитанных
+const FALLBACK_POLL_INTERVAL = 60000;
+// Пока идёт опрос, поток открывается заново с экспоненциальной задержкой:
+// 5 с, 10 с, 20 с ... до 5 минут (со случайным разбросом, чтобы отклонённые
+// вместе клиенты не возвращались одновременно)
+const RECONNECT_BASE_DELAY = 5000;
+const RECONNECT_MAX_DELAY = 300000;
+
+let source = null;
+let pollTimer = null;
+let reconnectTimer = null;
+let reconnectAttempts = 0;
+let currentUserId = null;
+const listeners = new Set();
+
+const emit = (type, data) => {
+  listeners.forEach(listener => listener(type, data));
+};
+
+const getToken = () => {
+  const user = JSON.parse(localStorage.getItem('user') || '{}');
+  return localStorage.getItem('authToken') || (user && user.token);
+};
+
+const startPolling = (userId) => {
+  if (pollTimer) {
+    return;
+  }
+  const poll = async () => {
+    const response = await apiService.getUnreadNotificationsCount(userId);
+    if (response.success) {
+      emit('unread_count', { count: response.count });
+    }
+  };
+  poll();
+  pollTimer = setInterval(poll, FALLBACK_POLL_INTERVAL);
+};
+
+const stopPolling = () => {
+  if (pollTimer) {
+    clearInterval(pollTimer);
+    pollTimer = null;
+  }
+};
+
+const connect = (userId) => {
+  const token = encodeURIComponent(getToken() || '');
+  source = new EventSource(`${API_URL}/users/${userId}/notifications/stream?token=${token}`);
+  source.addEventListener('notification', (e) => emit('notification', JSON.parse(e.data)));
+  source.addEventListener('unread_count', (e) => emit('unread_count', JSON.parse(e.data)));
+  source.onopen = () => {
+    reconnectAttempts = 0;
+    stopPolling();
+  };
+  // После ответа с ошибкой браузер не переподключается сам: опрашиваем
+  // счётчик и повторяем попытку открыть поток позже
+  source.onerror = () => {
+    if (source && source.readyState === window.EventSource.CLOSED) {
+      source = null;
+      startPolling(userId);
+      scheduleReconnect(userId);
+    }
+  };
+};
+
+const scheduleReconnect = (userId) => {
+  const delay = Math.min(RECONNECT_BASE_DELAY * 2 ** reconnectAttempts, RECONNECT_MAX_DELAY);
+  reconnectAttempts += 1;
+  reconnectTimer = setTimeout(() => {
+    reconnectTimer = null;
+    connect(userId);
+  }, delay * (0.5 + Math.random() / 2));
+};
+
+const open = (userId) => {
+  currentUserId = userId;
+
+  if (typeof window.EventSource === 'undefined') {
+    startPolling(userId);
+    return;
+  }
+  connect(userId);
+};
+
+const close = () => {
+  if (source) {
+    source.close();
+    source = null;
+  }
+  if (reconnectTimer) {
+    clearTimeout(reconnectTimer);
+    reconnectTimer = null;
+  }
+  reconnectAttempts = 0;
+  stopPolling();
+  currentUserId = null;
+};
+
+// Подписка на события потока: listener(type, data), где type -
+// 'notification' (новое уведомление) или 'unread_count' ({ count }).
+// Возвращает функцию отписки.
+const subscribe = (userId, listener) => {
+  if (currentUserId !== userId) {
+    close();
+    open(userId);
+  }
+  listeners.add(listener);
+
+  return () => {
+    listeners.delete(listener);
+    if (listeners.size === 0) {
+      close();
+    }
+  };
+};
+
+export default { subscribe };
@@ -0,0 +1,61 @@
+// Занятость мест мероприятия по битовым картам секторов (GET /api/events/:id/seats).
+// Бит i байта i >> 3 - место с номером i = (ряд - 1) * мест_в_ряду + (место - 1),
+// недостающие в конце байты - свободные места.
+import apiService from './api';
+
+const decodeBitmap = (encoded) => {
+  const binary = atob(encoded || '');
+  const bytes = new Uint8Array(binary.length);
+  for (let i = 0; i < binary.length; i++) {
+    bytes[i] = binary.charCodeAt(i);
+  }
+  return bytes;
+};
+
+// Номера занятых мест в формате компонентов выбора мест:
+// 'A1-3-15' или '3-15' для площадки с одним сектором
+export const occupiedSeatIds = (sections) => {
+  const occupied = new Set();
+  const single = sections.length === 1;
+  sections.forEach(section => {
+    const bytes = decodeBitmap(section.taken);
+    for (let byte = 0; byte < bytes.length; byte++) {
+      if (!bytes[byte]) continue;
+      for (let bit = 0; bit < 8; bit++) {
+        if (bytes[byte] & (1 << bit)) {
+          const index = byte * 8 + bit;
+          const row = Math.floor(index / section.seats_per_row) + 1;
+          const seat = (index % section.seats_per_row) + 1;
+          occupied.add(single ? `${row}-${seat}` : `${section.code}-${row}-${seat}`);
+        }
+      }
+    }
+  });
+  return occupied;
+};
+
+// Ранее сохранённые в браузере занятые места (площадки без схемы секторов)
+const storedOccupiedSeats = (venueId) => {
+  try {
+    const venueData = JSON.parse(localStorage.getItem(`venue_${venueId}`) || '{}');
+    return new Set(venueData.occupiedSeats || []);
+  } catch (e) {
+    console.error('Ошибка при чтении данных о занятых местах:', e);
+    return new Set();
+  }
+};
+
+// Set занятых мест мероприятия: с сервера, если у площадки есть схема секторов
+export const loadOccupiedSeats = async (event) => {
+  try {
+    const response = await apiService.getEventSeats(event.id);
+    if (response.success && response.sections.length > 0) {
+      return occupiedSeatIds(response.sections);
+    }
+  } catch (e) {
+    console.error('Ошибка при загрузке схемы мест:', e);
+  }
+  return storedOccupiedSeats(event.venue_id);
+};
+
+export default { loadOccupiedSeats, occupiedSeatIds };